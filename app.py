@@ -1,139 +1,756 @@
-from flask import Flask, request, jsonify, render_template_string
+# First, so the import time reported on /ready covers everything below
+from readiness import LOADING, WARMING_UP, Readiness
+from flask import Flask, Response, request, jsonify, render_template_string, g, stream_with_context
 import pandas as pd
 import pickle
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.linear_model import LinearRegression
-from sklearn.tree import DecisionTreeRegressor
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+import json
 import os
+import threading
+import time
+import uuid
+import functools
+import gzip
+import hashlib
+from tree_engine import compile_model
+from dataset_cache import (DATASET_FILE, csv_fingerprint, extend_encoders, is_appended, label_encoder,
+                           load_training_data, read_appended_rows)
+from prediction_cache import PredictionCache
+from micro_batcher import MicroBatcher
+from job_store import JobStore
+from category_lookup import CategoryLookup
+from lookup_index import LookupIndex, frequent_combinations
+from metrics import CONTENT_TYPE, Counter, Registry, StageTimer
+from split_model import INFO_FILE, reconstruct_pickle_file
+from model_artifact import ARTIFACT_FILE, is_artifact_current, load_artifact, save_artifact
 
 app = Flask(__name__)
 
 # Load or train model
 MODEL_FILE = 'house_price_model.pkl'
+FEATURE_COLUMNS = ['property_type', 'location', 'city', 'baths', 'purpose', 'bedrooms', 'Area_in_Marla']
+CATEGORICAL_COLUMNS = ['property_type', 'location', 'city', 'purpose']
+NUMERIC_COLUMNS = ['baths', 'bedrooms', 'Area_in_Marla']
+MAX_BATCH_SIZE = 10000
+# Records scored per model call by /predict/stream; bounds its memory whatever the upload size
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 1000))
+
+# Serve tree models through the array-based engine; float32 nodes trade exact parity for memory
+USE_COMPILED_ENGINE = os.environ.get('USE_COMPILED_ENGINE', '1') == '1'
+COMPILED_ENGINE_DTYPE = np.float32 if os.environ.get('COMPILED_ENGINE_FLOAT32') == '1' else np.float64
+# Larger batches go to sklearn's predict when the sklearn model is loaded, its compiled walk wins past this size
+COMPILED_ENGINE_MAX_ROWS = int(os.environ.get('COMPILED_ENGINE_MAX_ROWS', 200))
+
+# Prefer the memory-mapped artifact over the pickle so workers share one copy of the trees
+USE_MODEL_ARTIFACT = os.environ.get('USE_MODEL_ARTIFACT', '1') == '1'
+
+# Fit candidates across a process pool (forest on all cores) and drop those over the budget in seconds
+TRAIN_PARALLEL = os.environ.get('TRAIN_PARALLEL') == '1'
+TRAIN_TIME_BUDGET = float(os.environ['TRAIN_TIME_BUDGET']) if os.environ.get('TRAIN_TIME_BUDGET') else None
+
+# Tune candidate hyperparameters by cross-validated successive halving before the final fit
+TRAIN_SEARCH = os.environ.get('TRAIN_SEARCH') == '1'
+TRAIN_SEARCH_CANDIDATES = int(os.environ.get('TRAIN_SEARCH_CANDIDATES', 60))
+TRAIN_SEARCH_FOLDS = int(os.environ.get('TRAIN_SEARCH_FOLDS', 5))
+TRAIN_SEARCH_FACTOR = int(os.environ.get('TRAIN_SEARCH_FACTOR', 3))
+TRAIN_SEARCH_JOBS = int(os.environ.get('TRAIN_SEARCH_JOBS', -1))
+
+# Compact the chosen tree model after selection: merge near-equal sibling leaves, drop dead branches, store
+# float32 nodes and optionally keep only the top-k trees; refused when holdout R2 drops by more than the bound
+COMPACT_FOREST = os.environ.get('COMPACT_FOREST') == '1'
+COMPACT_MERGE_TOLERANCE = float(os.environ.get('COMPACT_MERGE_TOLERANCE', 0.01))
+COMPACT_TOP_K = int(os.environ['COMPACT_TOP_K']) if os.environ.get('COMPACT_TOP_K') else None
+COMPACT_MAX_R2_LOSS = float(os.environ.get('COMPACT_MAX_R2_LOSS', 0.005))
+
+# Train from the CSV in chunks through disk-backed arrays, so memory stays flat however many rows there are
+OUT_OF_CORE_TRAINING = os.environ.get('OUT_OF_CORE_TRAINING') == '1'
+OUT_OF_CORE_CHUNK_ROWS = int(os.environ.get('OUT_OF_CORE_CHUNK_ROWS', 100000))
+OUT_OF_CORE_DIR = os.environ.get('OUT_OF_CORE_DIR', '.')
+
+# Reuse the typed columnar copy of the dataset instead of reparsing the CSV on every training
+USE_DATASET_CACHE = os.environ.get('USE_DATASET_CACHE', '1') == '1'
+
+# Bounded LRU cache of /predict results, 0 entries disables it
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 300))
+
+# Coalesce concurrent /predict calls into one encode + predict of up to MICRO_BATCH_MAX_SIZE rows
+USE_MICRO_BATCHING = os.environ.get('MICRO_BATCHING') == '1'
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64))
+MICRO_BATCH_MAX_WAIT = float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 2)) / 1000
+
+# Incremental retrains add at least this many trees, and fall back to a full retrain past the tree cap
+# or when R2 on the new rows drops more than the drift threshold below the model's holdout R2
+INCREMENTAL_MIN_TREES = int(os.environ.get('INCREMENTAL_MIN_TREES', 5))
+INCREMENTAL_MAX_TREES = int(os.environ.get('INCREMENTAL_MAX_TREES', 300))
+INCREMENTAL_DRIFT_THRESHOLD = float(os.environ.get('INCREMENTAL_DRIFT_THRESHOLD', 0.1))
+
+# Answer rows of the most frequent category combinations from precomputed per-cell tables
+USE_LOOKUP_INDEX = os.environ.get('LOOKUP_INDEX') == '1'
+LOOKUP_INDEX_MAX_MB = float(os.environ.get('LOOKUP_INDEX_MAX_MB', 32))
+LOOKUP_INDEX_COMBINATIONS = int(os.environ.get('LOOKUP_INDEX_COMBINATIONS', 50))
+
+# Serving budgets for model selection; over-budget trees are refitted smaller, anything else is rejected
+def _budget(name):
+    return float(os.environ[name]) if os.environ.get(name) else None
+
+SELECTION_BUDGETS = {
+    'max_size_mb': _budget('MAX_MODEL_SIZE_MB'),
+    'max_p99_predict_ms': _budget('MAX_PREDICT_P99_MS'),
+    'max_memory_mb': _budget('MAX_MODEL_MEMORY_MB')
+}
+
+def candidate_models(parallel=False):
+    """The unfitted in-memory candidate models"""
+    # Imported on call, like the rest of the training stack
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+    from sklearn.tree import DecisionTreeRegressor
+
+    return {
+        'RandomForest': RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1 if parallel else None),
+        'LinearRegression': LinearRegression(),
+        'DecisionTree': DecisionTreeRegressor(random_state=42)
+    }
 
-def load_and_train_model():
-    """Load dataset, train multiple models, and save the best one"""
-    # Load dataset
-    df = pd.read_csv('House_dataset.csv')
-
-    # Remove first column if it's unnamed index
-    if df.columns[0] in ['Unnamed: 0', '']:
-        df = df.drop(df.columns[0], axis=1)
+def load_and_train_model(progress=None, parallel=None, time_budget=None, search=None, out_of_core=None, save=True):
+    """Load dataset, train multiple models, and save the best one unless save is False"""
+    out_of_core = OUT_OF_CORE_TRAINING if out_of_core is None else out_of_core
+    if out_of_core:
+        return out_of_core_train_model(progress=progress, save=save)
+    parallel = TRAIN_PARALLEL if parallel is None else parallel
+    time_budget = TRAIN_TIME_BUDGET if time_budget is None else time_budget
+    search = TRAIN_SEARCH if search is None else search
+    training_started = time.perf_counter()
 
-    # Handle missing values
-    df = df.dropna()
+    # The training stack is only imported when a model is trained, never on the serving import path
+    from sklearn.model_selection import train_test_split
+    from training import apply_budgets, search_candidates, train_candidates
 
     # Prepare features and target
-    feature_columns = ['property_type', 'location', 'city', 'baths', 'purpose', 'bedrooms', 'Area_in_Marla']
-    X = df[feature_columns].copy()
-    y = df['price']
+    feature_columns = list(FEATURE_COLUMNS)
 
-    # Encode categorical variables
-    label_encoders = {}
-    categorical_columns = ['property_type', 'location', 'city', 'purpose']
+    # Remember exactly which bytes were trained on, so an incremental retrain can read only what follows
+    dataset_source = csv_fingerprint(DATASET_FILE)
 
-    for col in categorical_columns:
-        le = LabelEncoder()
-        X[col] = le.fit_transform(X[col].astype(str))
-        label_encoders[col] = le
+    # Load the cleaned, encoded dataset; the CSV is only reparsed when it changes
+    X, y, label_encoders = load_training_data(feature_columns, CATEGORICAL_COLUMNS, DATASET_FILE,
+                                              use_cache=USE_DATASET_CACHE)
 
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
     # Train multiple models
-    models = {
-        'RandomForest': RandomForestRegressor(n_estimators=100, random_state=42),
-        'LinearRegression': LinearRegression(),
-        'DecisionTree': DecisionTreeRegressor(random_state=42)
+    models = candidate_models(parallel)
+
+    search_reports = {}
+    if search:
+        print("Searching hyperparameters with successive halving...")
+        models, search_reports = search_candidates(models, X_train, y_train, n_candidates=TRAIN_SEARCH_CANDIDATES,
+                                                   folds=TRAIN_SEARCH_FOLDS, factor=TRAIN_SEARCH_FACTOR,
+                                                   n_jobs=TRAIN_SEARCH_JOBS, progress=progress)
+
+    print(f"Training and evaluating models{' in parallel' if parallel else ''}...")
+    results = train_candidates(models, X_train, y_train, X_test, y_test,
+                               parallel=parallel, time_budget=time_budget, progress=progress)
+    unconstrained_r2 = max(report['r2'] for model, report in results.values() if model is not None)
+
+    # Measure size, load memory and single-row latency, then hold every candidate to the budgets
+    results = apply_budgets(results, X_train, y_train, X_test, y_test, SELECTION_BUDGETS,
+                            compiled=USE_COMPILED_ENGINE, progress=progress)
+    best_name, best_model, best_score, candidates, selection = select_model(results, unconstrained_r2)
+
+    compaction = None
+    if COMPACT_FOREST:
+        best_model, compaction = compact_selected(best_model, X_test, y_test, progress=progress)
+        if compaction['accepted']:
+            # With top-k the trees were ranked on half of these rows, so this R2 is slightly optimistic
+            best_score = holdout_r2(best_model, X_test, y_test)
+
+    # Save best model and encoders
+    model_data = {
+        'model': best_model,
+        'label_encoders': label_encoders,
+        'feature_columns': feature_columns,
+        'model_name': best_name,
+        'r2_score': best_score,
+        'version': uuid.uuid4().hex[:12],
+        'candidates': candidates,
+        'selection': selection,
+        'training': {
+            'mode': 'full',
+            'parallel': parallel,
+            'time_budget': time_budget,
+            'search': bool(search),
+            'total_seconds': time.perf_counter() - training_started
+        },
+        'dataset': dict(dataset_source, rows=len(y)),
+        'incremental': [],
+        'search': search_reports,
+        'compaction': compaction,
+        'category_combinations': frequent_combinations(X, CATEGORICAL_COLUMNS, label_encoders)
     }
 
+    if save:
+        save_model_data(model_data)
+    return model_data
+
+def out_of_core_train_model(progress=None, save=True):
+    """Train the out-of-core candidates from the CSV in chunks, and save the best one unless save is False"""
+    training_started = time.perf_counter()
+    from out_of_core import train_out_of_core
+    from training import apply_budgets
+
+    feature_columns = list(FEATURE_COLUMNS)
+    dataset_source = csv_fingerprint(DATASET_FILE)
+
+    print(f"Training out of core in chunks of {OUT_OF_CORE_CHUNK_ROWS} rows...")
+    # The in-memory candidates fit on a bounded row sample and are scored on the same holdout rows,
+    # so the choice is made across both groups
+    results, details = train_out_of_core(DATASET_FILE, feature_columns, CATEGORICAL_COLUMNS,
+                                         work_dir=OUT_OF_CORE_DIR, chunk_rows=OUT_OF_CORE_CHUNK_ROWS,
+                                         progress=progress, sampled_models=candidate_models(TRAIN_PARALLEL))
+    unconstrained_r2 = max(report['r2'] for model, report in results.values())
+
+    # Serving cost is measured on a bounded sample of holdout rows; the sampled sklearn trees are refitted
+    # on their training sample when over budget
+    X_sample, y_sample = details['measure_X'], details['measure_y']
+    results = apply_budgets(results, details['fit_X'], details['fit_y'], X_sample, y_sample, SELECTION_BUDGETS,
+                            compiled=USE_COMPILED_ENGINE, progress=progress)
+    best_name, best_model, best_score, candidates, selection = select_model(results, unconstrained_r2)
+
+    model_data = {
+        'model': best_model,
+        'label_encoders': {col: label_encoder(classes) for col, classes in details['classes'].items()},
+        'feature_columns': feature_columns,
+        'model_name': best_name,
+        'r2_score': best_score,
+        'version': uuid.uuid4().hex[:12],
+        'candidates': candidates,
+        'selection': selection,
+        'training': {
+            'mode': 'out_of_core',
+            'out_of_core': details['report'],
+            'total_seconds': time.perf_counter() - training_started
+        },
+        'dataset': dict(dataset_source, rows=details['rows']),
+        'incremental': [],
+        'search': {},
+        'category_combinations': details['category_combinations']
+    }
+
+    if save:
+        save_model_data(model_data)
+    return model_data
+
+def compact_selected(model, X_test, y_test, progress=None):
+    """Compacted node arrays of the chosen tree model, or the model itself when compaction is refused"""
+    from compaction import compact_model
+
+    if progress:
+        progress('Compacting the selected model')
+    compacted, report = compact_model(model, X_test, y_test, tolerance=COMPACT_MERGE_TOLERANCE,
+                                      top_k=COMPACT_TOP_K, max_r2_loss=COMPACT_MAX_R2_LOSS)
+    if compacted is None:
+        print(f"Compaction refused: {report['reason']}")
+        return model, report
+
+    print(f"Compacted {report['trees_before']} trees with {report['nodes_before']} nodes to "
+          f"{report['trees_after']} trees with {report['nodes_after']} nodes: "
+          f"size={report['size_mb_before']:.1f}MB -> {report['size_mb_after']:.1f}MB, "
+          f"p99={report['p99_predict_ms_before']:.3f}ms -> {report['p99_predict_ms_after']:.3f}ms, "
+          f"R2={report['r2_before']:.4f} -> {report['r2_after']:.4f}")
+    return compacted, report
+
+def select_model(results, unconstrained_r2):
+    """Pick the candidate with the best holdout R2 among those within the serving budgets"""
     best_model = None
     best_score = float('-inf')
     best_name = ''
 
-    print("Training and evaluating models...")
-    for name, model in models.items():
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
-        r2 = r2_score(y_test, y_pred)
-        mae = mean_absolute_error(y_test, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-
-        print(f"{name}: R2={r2:.4f}, MAE={mae:.2f}, RMSE={rmse:.2f}")
+    candidates = {}
+    for name, (model, report) in results.items():
+        candidates[name] = report
+        if report['status'] == 'dropped':
+            print(f"{name}: dropped ({report['reason']})")
+            continue
+        if model is None:
+            print(f"{name}: rejected ({'; '.join(report['violations'])})")
+            continue
+
+        r2 = report['r2']
+        print(f"{name}: R2={r2:.4f}, MAE={report['mae']:.2f}, RMSE={report['rmse']:.2f}, "
+              f"fit={report['fit_seconds']:.2f}s, predict={report['predict_seconds']:.3f}s, "
+              f"size={report['size_mb']:.1f}MB, p99={report['p99_predict_ms']:.3f}ms, "
+              f"memory={report['memory_mb']:.1f}MB")
 
         if r2 > best_score:
             best_score = r2
             best_model = model
             best_name = name
 
+    if best_model is None:
+        raise RuntimeError(f"No candidate model fits the serving budgets {SELECTION_BUDGETS}")
+
     print(f"Best model: {best_name} with R2 score: {best_score:.4f}")
 
-    # Save best model and encoders
-    model_data = {
-        'model': best_model,
-        'label_encoders': label_encoders,
-        'feature_columns': feature_columns,
-        'model_name': best_name,
-        'r2_score': best_score
+    chosen = candidates[best_name]
+    selection = {
+        'criterion': 'r2',
+        'budgets': dict(SELECTION_BUDGETS),
+        'chosen': best_name,
+        'constrained': chosen['status'] == 'constrained',
+        'rejected': [name for name, report in candidates.items() if report['status'] == 'rejected'],
+        'r2_cost': unconstrained_r2 - best_score,
+        'size_mb': chosen['size_mb'],
+        'p99_predict_ms': chosen['p99_predict_ms'],
+        'memory_mb': chosen['memory_mb']
     }
-
-    with open(MODEL_FILE, 'wb') as f:
+    return best_name, best_model, best_score, candidates, selection
+
+def save_model_data(model_data, model_file=None, artifact_file=None):
+    """Write the model pickle and its memory-mapped artifact, by default to the files that are served"""
+    model_file = model_file or MODEL_FILE
+    # Write to a temporary file and rename so concurrent readers never see a partial pickle
+    tmp_path = f'{model_file}.tmp{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
         pickle.dump(model_data, f)
+    os.replace(tmp_path, model_file)
+
+    print(f"Model saved to {model_file}")
+    export_artifact(model_data, artifact_file or ARTIFACT_FILE)
+
+def staged_model_files():
+    """Where a retrained model is written and checked before it replaces the served files"""
+    return f'{MODEL_FILE}.staged', f'{ARTIFACT_FILE}.staged'
+
+def publish_model_files(model_file, artifact_file):
+    """Move a checked model into place; the artifact goes first, so it is never older than the pickle"""
+    if os.path.exists(artifact_file):
+        os.replace(artifact_file, ARTIFACT_FILE)
+    elif os.path.exists(ARTIFACT_FILE):
+        os.remove(ARTIFACT_FILE)
+    os.replace(model_file, MODEL_FILE)
+    print(f"Model published to {MODEL_FILE}")
+
+def discard_model_files(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+def load_incremental_base():
+    """The saved model data to grow, or the reason it cannot be grown on the current dataset"""
+    try:
+        with open(MODEL_FILE, 'rb') as f:
+            base = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None, 'no saved model to extend'
+
+    from sklearn.ensemble import RandomForestRegressor
+
+    if base.get('dataset') is None:
+        return base, 'saved model does not record its training data'
+    if (base.get('compaction') or {}).get('accepted'):
+        return base, 'a compacted forest cannot be grown incrementally'
+    if not isinstance(base['model'], RandomForestRegressor):
+        return base, f"{base['model_name']} cannot be grown incrementally"
+    if not is_appended(DATASET_FILE, base['dataset']):
+        return base, 'dataset was modified, not only appended to'
+    return base, None
+
+def holdout_r2(model, X, y):
+    from sklearn.metrics import r2_score
+    return float(r2_score(y, model.predict(X))) if len(y) > 1 else None
+
+def incremental_train_model(progress=None, save=True):
+    """Grow the saved forest with trees fitted on rows appended to the dataset since it was trained"""
+    progress = progress or (lambda message: None)
+    started = time.perf_counter()
+
+    def full_retrain(reason):
+        print(f"Incremental retrain not possible ({reason}), retraining from scratch")
+        progress(f"Full retrain: {reason}")
+        model_data = load_and_train_model(progress=progress, save=save)
+        model_data['training']['incremental_fallback'] = reason
+        return model_data
+
+    base, reason = load_incremental_base()
+    if reason:
+        return full_retrain(reason)
+    source = base['dataset']
+
+    from sklearn.model_selection import train_test_split
+    from training import grow_forest
+
+    progress('Reading appended rows')
+    current_source = csv_fingerprint(DATASET_FILE)
+    X_new, y_new = read_appended_rows(DATASET_FILE, source['size'], base['feature_columns'], CATEGORICAL_COLUMNS)
+    if len(y_new) == 0:
+        print("No new rows since the last training, keeping the current model")
+        return base
+
+    # Existing codes never change, so trees already in the forest keep their meaning
+    X_new, label_encoders = extend_encoders(X_new, base['label_encoders'], CATEGORICAL_COLUMNS)
+    X_new = X_new[base['feature_columns']]
+
+    forest = base['model']
+    trained_rows = source.get('rows', len(y_new))
+    n_new_trees = max(INCREMENTAL_MIN_TREES, round(len(forest.estimators_) * len(y_new) / trained_rows))
+    if len(forest.estimators_) + n_new_trees > INCREMENTAL_MAX_TREES:
+        return full_retrain(f'forest would exceed {INCREMENTAL_MAX_TREES} trees')
+
+    # Hold back part of the new rows to check the forest on data none of its trees have seen
+    if len(y_new) >= 10:
+        X_fit, X_check, y_fit, y_check = train_test_split(X_new, y_new, test_size=0.2, random_state=42)
+    else:
+        X_fit, X_check, y_fit, y_check = X_new, X_new, y_new, y_new
+
+    # Too large a drop on the new rows means the data moved on and old trees should not be kept
+    r2_before = holdout_r2(forest, X_check, y_check)
+    if r2_before is not None and base['r2_score'] - r2_before > INCREMENTAL_DRIFT_THRESHOLD:
+        return full_retrain(f'R2 on new rows fell to {r2_before:.3f} from {base["r2_score"]:.3f}')
+
+    progress(f'Fitting {n_new_trees} new trees on {len(y_fit)} new rows')
+    fit_seconds = grow_forest(forest, X_fit, y_fit, n_new_trees)
+    r2_after = holdout_r2(forest, X_check, y_check)
+
+    update = {
+        'rows': len(y_new),
+        'new_trees': n_new_trees,
+        'total_trees': len(forest.estimators_),
+        'new_categories': {col: len(label_encoders[col].classes_) - len(base['label_encoders'][col].classes_)
+                           for col in CATEGORICAL_COLUMNS},
+        'r2_new_rows_before': r2_before,
+        'r2_new_rows_after': r2_after,
+        'fit_seconds': fit_seconds,
+        'total_seconds': time.perf_counter() - started
+    }
+    print(f"Added {n_new_trees} trees on {len(y_new)} new rows in {update['total_seconds']:.2f}s "
+          f"(R2 on new rows {r2_before} -> {r2_after})")
 
-    print(f"Model saved to {MODEL_FILE}")
+    model_data = dict(base)
+    model_data.update({
+        'model': forest,
+        'label_encoders': label_encoders,
+        'version': uuid.uuid4().hex[:12],
+        'training': dict(base.get('training', {}), mode='incremental', total_seconds=update['total_seconds']),
+        'dataset': dict(current_source, rows=trained_rows + len(y_new)),
+        'incremental': list(base.get('incremental', [])) + [update]
+    })
+
+    if save:
+        save_model_data(model_data)
     return model_data
 
+def export_artifact(model_data, path=None):
+    """Write the memory-mapped artifact for tree models, or remove a stale one"""
+    path = path or ARTIFACT_FILE
+    if not USE_MODEL_ARTIFACT:
+        return
+    if save_artifact(model_data, path):
+        print(f"Model artifact saved to {path}")
+    elif os.path.exists(path):
+        os.remove(path)
+
 def reconstruct_model_if_needed():
     """Reconstruct model from parts if main file doesn't exist"""
-    if not os.path.exists(MODEL_FILE) and os.path.exists('model_parts.info'):
+    if not os.path.exists(MODEL_FILE) and os.path.exists(INFO_FILE):
         print("Model file not found, reconstructing from parts...")
 
-        # Read info
-        with open('model_parts.info', 'rb') as f:
-            info = pickle.load(f)
-
-        total_parts = info['total_parts']
-
-        # Check if all parts exist
-        all_parts_exist = True
-        for i in range(1, total_parts + 1):
-            part_filename = f'house_price_model.pkl.part{i:02d}'
-            if not os.path.exists(part_filename):
-                all_parts_exist = False
-                break
-
-        if all_parts_exist:
-            # Reconstruct file
-            with open(MODEL_FILE, 'wb') as outfile:
-                for i in range(1, total_parts + 1):
-                    part_filename = f'house_price_model.pkl.part{i:02d}'
-                    with open(part_filename, 'rb') as infile:
-                        outfile.write(infile.read())
-            print(f"Model reconstructed successfully from {total_parts} parts")
-        else:
-            print("Some model parts are missing, will train new model")
+        # Streams the parts and verifies their checksums before the model file appears
+        if not reconstruct_pickle_file(INFO_FILE):
+            print("Some model parts are missing or corrupted, will train new model")
 
 def load_model():
     """Load trained model or train new one if not exists"""
-    # First try to reconstruct from parts if needed
+    started = time.perf_counter()
+    try:
+        return load_saved_model(MODEL_FILE, ARTIFACT_FILE, started)
+    except FileNotFoundError:
+        pass
+
+    # Otherwise try to reconstruct from parts if needed
     reconstruct_model_if_needed()
 
     if os.path.exists(MODEL_FILE):
-        with open(MODEL_FILE, 'rb') as f:
-            return pickle.load(f)
+        return load_saved_model(MODEL_FILE, ARTIFACT_FILE, started)
     else:
-        return load_and_train_model()
+        return prepare_model(load_and_train_model(), started)
+
+def load_saved_model(model_file, artifact_file, started=None):
+    """Load a saved model, raises FileNotFoundError when neither a current artifact nor the pickle exists"""
+    started = time.perf_counter() if started is None else started
+
+    # The memory-mapped artifact loads almost instantly and is shared between processes
+    if USE_MODEL_ARTIFACT and is_artifact_current(artifact_file, model_file):
+        try:
+            return prepare_model(load_artifact(artifact_file), started)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load model artifact, falling back to pickle: {e}")
+
+    with open(model_file, 'rb') as f:
+        model_data = pickle.load(f)
+    export_artifact(model_data, artifact_file)
+    return prepare_model(model_data, started)
+
+def prepare_model(model_data, load_started=None):
+    """Attach serving-only state to freshly loaded model data"""
+    if not model_data.get('version'):
+        model_data['version'] = uuid.uuid4().hex[:12]
+    model_data['engine'] = None
+    if USE_COMPILED_ENGINE:
+        model_data['engine'] = compile_model(model_data['model'], dtype=COMPILED_ENGINE_DTYPE)
+    model_data['category_lookup'] = CategoryLookup(model_data['label_encoders'])
+    model_data['lookup_index'] = None
+    if USE_LOOKUP_INDEX and model_data['engine'] is not None:
+        model_data['lookup_index'] = build_lookup_index(model_data)
+    if load_started is not None:
+        model_data['load_seconds'] = time.perf_counter() - load_started
+    return model_data
 
-# Load model on startup
-model_data = load_model()
+def build_lookup_index(model_data):
+    """Precompute prediction tables for the category combinations seen most in training"""
+    feature_columns = model_data['feature_columns']
+    columns = [col for col in CATEGORICAL_COLUMNS if col in feature_columns]
+    tables = model_data['category_lookup'].tables
+
+    combinations = []
+    for combination in (model_data.get('category_combinations') or [])[:LOOKUP_INDEX_COMBINATIONS]:
+        values = dict(zip(columns, combination['values']))
+        if all(values.get(col) in tables[col] for col in columns):
+            combinations.append([tables[col][values[col]] for col in columns])
+
+    index = LookupIndex.build(model_data['engine'], [feature_columns.index(col) for col in columns],
+                              combinations, int(LOOKUP_INDEX_MAX_MB * 1024 * 1024))
+    stats = index.stats()
+    print(f"Lookup index: {stats['combinations']} combinations, {stats['cells']} cells, "
+          f"{stats['size_mb']:.1f}MB in {stats['build_seconds']:.2f}s ({stats['skipped']} over the memory cap)")
+    return index
+
+def predict_frame(model_data, input_data):
+    """Predict encoded feature rows from the lookup index or the compiled engine when available"""
+    features = input_data[model_data['feature_columns']]
+    engine = model_data.get('engine')
+    if engine is None:
+        return model_data['model'].predict(features)
+    model = model_data['model']
+
+    def score(X):
+        # Models loaded from the artifact are the engine itself and have no sklearn predict to hand over to
+        if len(X) > COMPILED_ENGINE_MAX_ROWS and model is not engine:
+            return model.predict(pd.DataFrame(X, columns=features.columns))
+        return engine.predict(X)
+
+    index = model_data.get('lookup_index')
+    if index is not None:
+        return index.predict(features.to_numpy(dtype=np.float32), score)
+    return score(features.to_numpy(dtype=np.float32))
+
+def encode_categoricals(input_data, label_encoders, lookup=None):
+    """Encode categorical columns of a frame in place, through the model's lookup tables when built"""
+    for col in CATEGORICAL_COLUMNS:
+        if col in label_encoders:
+            if lookup is not None:
+                # Dict lookups; unseen locations resolve to the nearest known location
+                input_data[col] = lookup.encode(col, input_data[col].to_numpy())
+                continue
+            classes = label_encoders[col].classes_
+            values = input_data[col].astype(str).to_numpy()
+            # Incremental retrains append new classes, so classes_ is not necessarily sorted
+            order = np.argsort(classes)
+            positions = np.minimum(np.searchsorted(classes, values, sorter=order), len(classes) - 1)
+            codes = order[positions]
+            known = classes[codes] == values
+            # Handle unknown categories the same way as a single prediction: use classes_[0]
+            input_data[col] = np.where(known, codes, 0)
+    return input_data
+
+def location_match(current, record):
+    """Which known location a record's location was scored as, and how it was matched"""
+    lookup = current.get('category_lookup')
+    if lookup is None or 'location' not in lookup.tables or record.get('location') is None:
+        return {}
+    _, matched, kind = lookup.lookup('location', record['location'])
+    return {'matched_location': matched, 'location_match': kind}
+
+# Serving metrics, exposed in Prometheus text format on /metrics
+metrics_registry = Registry()
+request_counter = metrics_registry.counter(
+    'house_price_requests_total', 'Prediction requests handled', ['endpoint'])
+error_counter = metrics_registry.counter(
+    'house_price_request_errors_total', 'Prediction requests that failed', ['endpoint'])
+request_latency = metrics_registry.histogram(
+    'house_price_request_seconds', 'End-to-end prediction request latency in seconds', ['endpoint'])
+stage_latency = metrics_registry.histogram(
+    'house_price_stage_seconds', 'Time spent in each stage of a prediction request', ['endpoint', 'stage'])
+model_info = metrics_registry.gauge(
+    'house_price_model_info', 'Model currently being served', ['model_name', 'version'])
+model_load_seconds = metrics_registry.gauge(
+    'house_price_model_load_seconds', 'Time taken to load the model currently being served')
+micro_batch_size = metrics_registry.histogram(
+    'house_price_micro_batch_size', 'Rows scored per micro-batched model call',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
+micro_batch_wait = metrics_registry.histogram(
+    'house_price_micro_batch_wait_seconds', 'Time a /predict call waited for its micro-batch to run')
+import_seconds = metrics_registry.gauge(
+    'house_price_import_seconds', 'Time taken to import the serving application')
+time_to_ready_seconds = metrics_registry.gauge(
+    'house_price_time_to_ready_seconds', 'Time from importing the application until it was ready to serve')
+ready_gauge = metrics_registry.gauge(
+    'house_price_ready', 'Whether the model has loaded and passed its warm-up prediction')
+
+def publish_model_metrics(current):
+    """Point the model gauges at the model that is now serving"""
+    model_info.clear()
+    model_info.set(1, (current['model_name'], current['version']))
+    model_load_seconds.set(current.get('load_seconds', 0.0))
+
+def instrumented(endpoint):
+    """Count requests, errors and end-to-end latency; the view marks its stages on g.timer"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            timer = g.timer = StageTimer(stage_latency, endpoint)
+
+            def finish(status):
+                request_counter.inc((endpoint,))
+                request_latency.observe(timer.elapsed(), (endpoint,))
+                if timer.error or status >= 400:
+                    error_counter.inc((endpoint,))
+
+            try:
+                response = view(*args, **kwargs)
+            except Exception:
+                timer.error = True
+                finish(500)
+                raise
+
+            status = response[1] if isinstance(response, tuple) else response.status_code
+            if isinstance(response, Response) and response.is_streamed:
+                # A streamed body is read and scored while it is sent, so it is counted once it has been sent
+                response.call_on_close(lambda: finish(status))
+            else:
+                finish(status)
+            return response
+        return wrapper
+    return decorator
+
+def requires_model(view):
+    """Answer 503 until the model has loaded and passed its warm-up prediction"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if model_data is None:
+            return jsonify({
+                'success': False,
+                'error': f'Model is not ready yet ({startup.stage})'
+            }), 503
+        return view(*args, **kwargs)
+    return wrapper
+
+# The model loads on a background thread so the server binds its port first; /ready reports when it serves
+model_data = None
+startup = Readiness()
+prediction_cache = PredictionCache(maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+
+def load_and_warm_up():
+    """Load the model, run a warm-up prediction through it and start serving it"""
+    global model_data
+    try:
+        stage_start = time.perf_counter()
+        loaded = load_model()
+        startup.mark('load_seconds', time.perf_counter() - stage_start)
+
+        startup.enter('warming_up')
+        stage_start = time.perf_counter()
+        smoke_test_model(loaded)
+        startup.mark('warm_up_seconds', time.perf_counter() - stage_start)
+
+        model_data = loaded
+        publish_model_metrics(loaded)
+        mark_ready()
+        print(f"Serving {loaded['model_name']}, ready {startup.timings['time_to_ready_seconds']:.2f}s after import")
+    except Exception as e:
+        startup.fail(e)
+        print(f"Model failed to load: {e}")
+
+def mark_ready():
+    """Report the process ready, after the startup load or a retrain that replaced a model that failed to load"""
+    startup.set_ready()
+    ready_gauge.set(1)
+    time_to_ready_seconds.set(startup.timings['time_to_ready_seconds'])
+
+def load_model_in_background():
+    """Start loading the model on a daemon thread, unless this process or the one it was forked from did"""
+    if startup.begin():
+        threading.Thread(target=load_and_warm_up, name='model-loader', daemon=True).start()
+
+def ensure_model_loaded(timeout=None):
+    """Start loading the model if nothing has, wait until it serves and return its model data"""
+    load_model_in_background()
+    if not startup.wait(timeout):
+        raise RuntimeError(f"Model is not ready ({startup.stage}): {startup.error}")
+    return model_data
 
-@app.route('/')
-def home():
-    """Serve the main HTML page"""
+@app.before_request
+def start_model_load():
+    # Servers that only import the app, without calling load_model_in_background(), load on the first request
+    load_model_in_background()
+
+def collect_cache_metrics():
+    """Prediction cache counters, read at scrape time"""
+    stats = prediction_cache.stats()
+    families = []
+    for key in ['hits', 'misses', 'evictions', 'expirations']:
+        family = Counter(f'house_price_prediction_cache_{key}_total', f'Prediction cache {key}')
+        family.inc(amount=stats[key])
+        families.append(family)
+    return families
+
+metrics_registry.add_collector(collect_cache_metrics)
+
+# Set by serve.py so /metrics on any worker sums the counters and histograms of all of them
+metrics_store = None
+
+def predict_micro_batch(items):
+    """Score (model data, validated row) pairs queued by concurrent /predict calls, one model call per model"""
+    predictions = [None] * len(items)
+    groups = {}
+    for i, (current, _) in enumerate(items):
+        # A retrain can swap the model while calls are queued; each is scored by the model it started with
+        groups.setdefault(id(current), (current, []))[1].append(i)
+
+    for current, indexes in groups.values():
+        input_data = pd.DataFrame.from_records([items[i][1] for i in indexes], columns=current['feature_columns'])
+        encode_categoricals(input_data, current['label_encoders'], current.get('category_lookup'))
+        for i, prediction in zip(indexes, predict_frame(current, input_data)):
+            predictions[i] = float(prediction)
+    return predictions
+
+def observe_micro_batch(size, waits):
+    micro_batch_size.observe(size)
+    for wait in waits:
+        micro_batch_wait.observe(wait)
+
+micro_batcher = MicroBatcher(predict_micro_batch, max_batch_size=MICRO_BATCH_MAX_SIZE,
+                             max_wait=MICRO_BATCH_MAX_WAIT, observer=observe_micro_batch)
+
+# Called with the new model data after a retrain swaps it into this process
+model_swap_hooks = []
+
+# Retraining jobs are kept in a file next to the model, so every process serving the app sees them,
+# and a lock file held by the training process allows one job at a time across processes
+MAX_RETRAIN_JOBS = 20
+RETRAIN_JOBS_FILE = os.environ.get('RETRAIN_JOBS_FILE', 'retrain_jobs.json')
+retrain_jobs = JobStore(RETRAIN_JOBS_FILE, max_jobs=MAX_RETRAIN_JOBS)
+
+def start_retrain_thread(job):
+    threading.Thread(target=run_retrain_job, args=(job,), daemon=True).start()
+
+# Starts a queued job; serve.py leaves it to the master, which runs jobs in a process of their own
+retrain_launcher = start_retrain_thread
+
+def render_home_page(current):
+    """Render the main HTML page, with dropdown options taken from the model's encoders"""
     html_template = """
     <!DOCTYPE html>
     <html lang="en">
@@ -292,10 +909,7 @@ def home():
                             <label for="property_type">Property Type:</label>
                             <select id="property_type" name="property_type" required>
                                 <option value="">Select Type</option>
-                                <option value="House">House</option>
-                                <option value="Flat">Flat</option>
-                                <option value="Penthouse">Penthouse</option>
-                                <option value="Studio">Studio</option>
+                                {% for value in options.property_type %}<option value="{{ value }}">{{ value }}</option>{% endfor %}
                             </select>
                         </div>
 
@@ -303,10 +917,7 @@ def home():
                             <label for="city">City:</label>
                             <select id="city" name="city" required>
                                 <option value="">Select City</option>
-                                <option value="Islamabad">Islamabad</option>
-                                <option value="Rawalpindi">Rawalpindi</option>
-                                <option value="Lahore">Lahore</option>
-                                <option value="Karachi">Karachi</option>
+                                {% for value in options.city %}<option value="{{ value }}">{{ value }}</option>{% endfor %}
                             </select>
                         </div>
                     </div>
@@ -338,8 +949,7 @@ def home():
                             <label for="purpose">Purpose:</label>
                             <select id="purpose" name="purpose" required>
                                 <option value="">Select Purpose</option>
-                                <option value="For Sale">For Sale</option>
-                                <option value="For Rent">For Rent</option>
+                                {% for value in options.purpose %}<option value="{{ value }}">{{ value }}</option>{% endfor %}
                             </select>
                         </div>
                     </div>
@@ -398,7 +1008,61 @@ def home():
     </body>
     </html>
     """
-    return render_template_string(html_template)
+    encoders = current['label_encoders']
+    options = {col: [str(value) for value in encoders[col].classes_] if col in encoders else []
+               for col in ['property_type', 'city', 'purpose']}
+    return render_template_string(html_template, options=options)
+
+# Rendered home page of the serving model, identity and gzip bodies; rebuilt when the model version changes
+home_page_cache = {}
+home_page_lock = threading.Lock()
+
+def cached_home_page(current):
+    """The home page for a model, rendered and compressed once per model version"""
+    page = home_page_cache.get('page')
+    if page is not None and page['version'] == current['version']:
+        return page
+
+    with home_page_lock:
+        page = home_page_cache.get('page')
+        if page is None or page['version'] != current['version']:
+            body = render_home_page(current).encode('utf-8')
+            digest = hashlib.sha256(body).hexdigest()[:16]
+            page = {
+                'version': current['version'],
+                'identity': body,
+                'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+                'etag': digest,
+                'gzip_etag': f'{digest}-gzip'
+            }
+            home_page_cache['page'] = page
+    return page
+
+@app.route('/')
+@requires_model
+def home():
+    """Serve the main HTML page from memory, revalidated by ETag"""
+    page = cached_home_page(model_data)
+    use_gzip = 'gzip' in request.accept_encodings
+    etag = page['gzip_etag'] if use_gzip else page['etag']
+
+    if request.if_none_match.contains(page['etag']) or request.if_none_match.contains(page['gzip_etag']):
+        response = Response(status=304)
+    else:
+        response = Response(page['gzip'] if use_gzip else page['identity'], mimetype='text/html')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+
+    response.set_etag(etag)
+    # Browsers may keep the page but must revalidate, so a retrained model's options show up at once
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def search_summary(current):
+    """Best parameters and search effort per candidate, without the per-configuration trace"""
+    return {name: {key: value for key, value in report.items() if key != 'trace'}
+            for name, report in (current.get('search') or {}).items()}
 
 @app.route('/health')
 def health():
@@ -407,12 +1071,52 @@ def health():
         'status': 'healthy',
         'timestamp': pd.Timestamp.now().isoformat(),
         'model_loaded': model_data is not None,
-        'model_name': model_data.get('model_name', 'Unknown') if model_data else 'None'
+        'startup': startup.report(),
+        'model_name': model_data.get('model_name', 'Unknown') if model_data else 'None',
+        'retraining': retrain_jobs.active() is not None,
+        'prediction_cache': prediction_cache.stats(),
+        'selection': model_data.get('selection') if model_data else None,
+        'candidates': model_data.get('candidates') if model_data else None,
+        'search': search_summary(model_data) if model_data else None,
+        'compaction': model_data.get('compaction') if model_data else None,
+        'lookup_index': model_data['lookup_index'].stats() if model_data and model_data.get('lookup_index') else None
+    })
+
+@app.route('/model/search')
+@requires_model
+def model_search():
+    """Full hyperparameter search trace of the serving model, one entry per configuration and round"""
+    current = model_data
+    if not current.get('search'):
+        return jsonify({
+            'success': False,
+            'error': 'The serving model was trained without hyperparameter search'
+        }), 404
+    return jsonify({
+        'success': True,
+        'model_name': current['model_name'],
+        'version': current['version'],
+        'search': current['search']
     })
 
+@app.route('/ready')
+def ready():
+    """Readiness probe: 200 once the model has loaded and a warm-up prediction succeeded, 503 until then"""
+    current = model_data
+    report = startup.report()
+    if current is None:
+        return jsonify(dict(report, ready=False)), 503
+    return jsonify(dict(report, ready=True, model_name=current['model_name'], version=current['version']))
+
 @app.route('/predict', methods=['POST'])
+@instrumented('predict')
+@requires_model
 def predict():
     """Handle prediction requests"""
+    # Take one reference so a concurrent retrain cannot swap the model mid-request
+    current = model_data
+    timer = g.timer
+
     try:
         # Validate JSON
         if not request.is_json:
@@ -422,6 +1126,7 @@ def predict():
             }), 400
 
         data = request.get_json()
+        timer.mark('parse')
 
         if data is None:
             return jsonify({
@@ -429,54 +1134,406 @@ def predict():
                 'error': 'Invalid JSON data'
             }), 400
 
+        if USE_MICRO_BATCHING:
+            return predict_batched(current, data, timer)
+
         # Create input dataframe
         input_data = pd.DataFrame([data])
+        timer.mark('frame')
 
         # Encode categorical variables
-        for col in ['property_type', 'location', 'city', 'purpose']:
-            if col in model_data['label_encoders']:
-                le = model_data['label_encoders'][col]
-                try:
-                    input_data[col] = le.transform([str(data[col])])
-                except ValueError:
-                    # Handle unknown categories by using the most frequent one
-                    input_data[col] = le.transform([le.classes_[0]])
+        encode_categoricals(input_data, current['label_encoders'], current.get('category_lookup'))
+        timer.mark('encode')
+
+        # Make prediction, reusing the result for a repeated listing
+        cache_key = None
+        if prediction_cache.enabled:
+            features = input_data[current['feature_columns']].iloc[0]
+            cache_key = (current['version'],) + tuple(float(value) for value in features)
+            prediction = prediction_cache.get(cache_key)
+        if cache_key is None or prediction is None:
+            prediction = predict_frame(current, input_data)[0]
+            if cache_key is not None:
+                prediction_cache.put(cache_key, prediction)
+        timer.mark('predict')
+
+        response = jsonify({
+            'success': True,
+            'predicted_price': float(prediction),
+            'model_name': current['model_name'],
+            'model_accuracy': float(current['r2_score']),
+            **location_match(current, data)
+        })
+        timer.mark('serialize')
+        return response
 
-        # Make prediction
-        prediction = model_data['model'].predict(input_data[model_data['feature_columns']])[0]
+    except Exception as e:
+        timer.error = True
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
 
+def predict_batched(current, data, timer):
+    """Answer one /predict call through the micro-batcher, sharing a model call with concurrent requests"""
+    results, valid_rows, _ = validate_records([data], current['feature_columns'])
+    timer.mark('validate')
+    if not valid_rows:
+        timer.error = True
         return jsonify({
+            'success': False,
+            'error': results[0]['error']
+        })
+
+    row = valid_rows[0]
+    cache_key = None
+    prediction = None
+    if prediction_cache.enabled:
+        # Raw rather than encoded values: encoding happens later, once per micro-batch
+        cache_key = (current['version'],) + tuple(row[col] for col in current['feature_columns'])
+        prediction = prediction_cache.get(cache_key)
+    if prediction is None:
+        prediction = micro_batcher.submit((current, row))
+        if cache_key is not None:
+            prediction_cache.put(cache_key, prediction)
+    timer.mark('predict')
+
+    response = jsonify({
+        'success': True,
+        'predicted_price': float(prediction),
+        'model_name': current['model_name'],
+        'model_accuracy': float(current['r2_score']),
+        **location_match(current, row)
+    })
+    timer.mark('serialize')
+    return response
+
+@app.route('/predict/batch', methods=['POST'])
+@instrumented('predict_batch')
+@requires_model
+def predict_batch():
+    """Handle prediction requests for many records with a single model call"""
+    # Take one reference so a concurrent retrain cannot swap the model mid-request
+    current = model_data
+    timer = g.timer
+
+    try:
+        if not request.is_json:
+            return jsonify({
+                'success': False,
+                'error': 'Content-Type must be application/json'
+            }), 400
+
+        data = request.get_json(silent=True)
+        records = data.get('records') if isinstance(data, dict) else data
+        timer.mark('parse')
+
+        if not isinstance(records, list):
+            return jsonify({
+                'success': False,
+                'error': 'Request body must be a JSON array of records or {"records": [...]}'
+            }), 400
+
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'Batch size {len(records)} exceeds the maximum of {MAX_BATCH_SIZE}'
+            }), 400
+
+        results, predicted = score_records(current, records, timer)
+
+        response = jsonify({
             'success': True,
-            'predicted_price': float(prediction),
-            'model_name': model_data['model_name'],
-            'model_accuracy': float(model_data['r2_score'])
+            'count': len(records),
+            'predicted': predicted,
+            'results': results,
+            'model_name': current['model_name'],
+            'model_accuracy': float(current['r2_score'])
         })
+        timer.mark('serialize')
+        return response
 
     except Exception as e:
+        timer.error = True
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+def score_records(current, records, timer):
+    """Validate, encode and predict a list of records with one model call, returns (results, predicted)"""
+    results, valid_rows, valid_index = validate_records(records, current['feature_columns'])
+    timer.mark('validate')
+
+    if valid_rows:
+        input_data = pd.DataFrame.from_records(valid_rows, columns=current['feature_columns'])
+        timer.mark('frame')
+        encode_categoricals(input_data, current['label_encoders'], current.get('category_lookup'))
+        timer.mark('encode')
+        predictions = predict_frame(current, input_data)
+        timer.mark('predict')
+
+        for i, prediction in zip(valid_index, predictions):
+            results[i] = {'index': i, 'success': True, 'predicted_price': float(prediction),
+                          **location_match(current, records[i])}
+
+    return results, len(valid_rows)
+
+@app.route('/predict/stream', methods=['POST'])
+@instrumented('predict_stream')
+@requires_model
+def predict_stream():
+    """Score a newline-delimited JSON upload in micro-batches, streaming NDJSON results back"""
+    # Take one reference so a concurrent retrain cannot swap the model mid-stream
+    current = model_data
+    timer = g.timer
+    lines = iter(request.stream)
+
+    def generate():
+        totals = {'count': 0, 'predicted': 0}
+        batch, line_numbers, errors = [], [], []
+
+        def flush():
+            # Results go out in input order, so parse errors wait for the batch they fall in
+            results, predicted = score_records(current, batch, timer) if batch else ([], 0)
+            by_line = {line: {'line': line, **{k: v for k, v in result.items() if k != 'index'}}
+                       for line, result in zip(line_numbers, results)}
+            by_line.update(errors)
+            totals['predicted'] += predicted
+            chunk = ''.join(json.dumps(by_line[line]) + '\n' for line in sorted(by_line))
+            timer.mark('serialize')
+            batch.clear()
+            line_numbers.clear()
+            errors.clear()
+            return chunk
+
+        try:
+            for number, raw in enumerate(lines, start=1):
+                if not raw.strip():
+                    continue
+                totals['count'] += 1
+                try:
+                    batch.append(json.loads(raw))
+                    line_numbers.append(number)
+                except ValueError as e:
+                    errors.append((number, {'line': number, 'success': False, 'error': f'Invalid JSON: {e}'}))
+                timer.mark('parse')
+
+                if len(batch) + len(errors) >= STREAM_BATCH_SIZE:
+                    yield flush()
+
+            yield flush()
+            yield json.dumps({'done': True, 'model_name': current['model_name'], **totals}) + '\n'
+        except Exception as e:
+            timer.error = True
+            yield json.dumps({'done': False, 'success': False, 'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def validate_records(records, feature_columns):
+    """Split records into rows ready for prediction and per-record error results"""
+    results = [None] * len(records)
+    valid_rows = []
+    valid_index = []
+
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            results[i] = {'index': i, 'success': False, 'error': 'Record must be a JSON object'}
+            continue
+
+        missing = [col for col in feature_columns if record.get(col) is None]
+        if missing:
+            results[i] = {'index': i, 'success': False, 'error': f"Missing fields: {', '.join(missing)}"}
+            continue
+
+        row = dict(record)
+        try:
+            for col in NUMERIC_COLUMNS:
+                row[col] = float(row[col])
+        except (TypeError, ValueError):
+            results[i] = {'index': i, 'success': False, 'error': f'Invalid numeric value for {col}'}
+            continue
+
+        valid_rows.append({col: row[col] for col in feature_columns})
+        valid_index.append(i)
+
+    return results, valid_rows, valid_index
+
+@app.route('/metrics')
+def metrics():
+    """Expose serving metrics in Prometheus text format"""
+    body = metrics_store.render(metrics_registry) if metrics_store else metrics_registry.render()
+    return body, 200, {'Content-Type': CONTENT_TYPE}
+
 @app.route('/retrain', methods=['POST'])
 def retrain():
-    """Retrain the model with fresh data"""
+    """Start retraining the model with fresh data in the background"""
+    # Not gated on a loaded model: retraining is how a missing or corrupt model is repaired
+    if startup.stage in (LOADING, WARMING_UP):
+        return jsonify({
+            'success': False,
+            'error': f'Model is still loading ({startup.stage})'
+        }), 503
+
     try:
-        global model_data
-        model_data = load_and_train_model()
+        options = request.get_json(silent=True) or {}
+        mode = request.args.get('mode') or (options.get('mode') if isinstance(options, dict) else None) or 'full'
+        if mode not in ('full', 'incremental', 'search', 'out_of_core'):
+            return jsonify({
+                'success': False,
+                'error': f"Unknown retrain mode {mode!r}, expected 'full', 'incremental', 'search' or 'out_of_core'"
+            }), 400
+
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'mode': mode,
+            'status': 'queued',
+            'stage': 'queued',
+            'message': 'Waiting to start',
+            'created_at': pd.Timestamp.now().isoformat(),
+            'timings': {}
+        }
+        running = retrain_jobs.create(job)
+        if running is not None:
+            return jsonify({
+                'success': False,
+                'error': 'Retraining already in progress',
+                'job_id': running['job_id']
+            }), 409
+
+        retrain_launcher(job)
+
         return jsonify({
             'success': True,
-            'message': 'Model retrained successfully',
-            'model_name': model_data['model_name'],
-            'accuracy': float(model_data['r2_score'])
-        })
+            'message': 'Retraining started',
+            'job_id': job['job_id'],
+            'status_url': f"/retrain/{job['job_id']}"
+        }), 202
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+@app.route('/retrain/<job_id>')
+def retrain_status(job_id):
+    """Report the progress and timings of a retraining job"""
+    job = retrain_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown retraining job {job_id}'
+        }), 404
+
+    return jsonify(dict(job, success=True))
+
+def run_retrain_job(job):
+    """Train, reload and smoke-test a new model, then publish it to disk and swap it in for serving"""
+    global model_data
+    started = time.perf_counter()
+    staged = staged_model_files()
+
+    def update(**fields):
+        job.update(fields)
+        retrain_jobs.save(job)
+
+    def enter_stage(stage, message):
+        update(stage=stage, message=message)
+        return time.perf_counter()
+
+    # Held until the job's record is final, so no other process starts a job meanwhile
+    run_lock = retrain_jobs.claim()
+    if run_lock is None:
+        update(status='failed', stage='failed', error='Another retraining job is running')
+        return
+
+    try:
+        update(status='running', started_at=pd.Timestamp.now().isoformat())
+
+        # Nothing is written to the served files until the new model passed its smoke prediction
+        stage_start = time.perf_counter()
+        trained = train_for_job(job, enter_stage, lambda message: update(message=message))
+        job['timings']['training_seconds'] = time.perf_counter() - stage_start
+
+        # Serve what was written to disk, so every worker that reloads gets the same model
+        stage_start = enter_stage('loading', 'Saving and loading the new model')
+        save_model_data(trained, *staged)
+        new_model_data = load_saved_model(*staged)
+        job['timings']['loading_seconds'] = time.perf_counter() - stage_start
+
+        stage_start = enter_stage('smoke_test', 'Running a smoke prediction')
+        smoke_test_model(new_model_data)
+        job['timings']['smoke_test_seconds'] = time.perf_counter() - stage_start
+
+        # Renames keep any open memory maps valid, and the artifact is now found under the served name
+        publish_model_files(*staged)
+        if new_model_data.get('artifact'):
+            new_model_data['artifact'] = ARTIFACT_FILE
+
+        # A single reference assignment, requests already in flight keep the old model
+        model_data = new_model_data
+        prediction_cache.clear()
+        publish_model_metrics(new_model_data)
+        if not startup.ready:
+            mark_ready()
+        for hook in model_swap_hooks:
+            hook(new_model_data)
+
+        job['model_name'] = trained['model_name']
+        job['accuracy'] = float(trained['r2_score'])
+        job['status'] = 'completed'
+        job.update(stage='completed', message='Model retrained successfully')
+    except Exception as e:
+        discard_model_files(*staged)
+        job['status'] = 'failed'
+        job['error'] = str(e)
+        job.update(stage='failed', message='Retraining failed, the previous model is still serving')
+    finally:
+        job['timings']['total_seconds'] = time.perf_counter() - started
+        job['finished_at'] = pd.Timestamp.now().isoformat()
+        retrain_jobs.save(job)
+        retrain_jobs.release(run_lock)
+
+def train_for_job(job, enter_stage, progress):
+    """Train the model a retraining job's mode asks for, without saving it, recording mode details on the job"""
+    if job.get('mode') == 'incremental':
+        enter_stage('training', 'Growing the model on appended rows')
+        trained = incremental_train_model(progress=progress, save=False)
+        # Unchanged version: there were no new rows and the serving model was kept
+        updated = not model_data or trained['version'] != model_data.get('version')
+        job['incremental'] = trained['incremental'][-1] if updated and trained.get('incremental') else None
+        job['training_mode'] = trained.get('training', {}).get('mode')
+    elif job.get('mode') == 'search':
+        enter_stage('training', 'Searching hyperparameters and training candidate models')
+        trained = load_and_train_model(progress=progress, search=True, save=False)
+        job['search'] = search_summary(trained)
+    elif job.get('mode') == 'out_of_core':
+        enter_stage('training', 'Training candidate models from the dataset in chunks')
+        trained = load_and_train_model(progress=progress, out_of_core=True, save=False)
+        job['out_of_core'] = trained['training']['out_of_core']
+    else:
+        enter_stage('training', 'Training candidate models')
+        trained = load_and_train_model(progress=progress, save=False)
+    return trained
+
+def smoke_test_model(candidate):
+    """Predict one synthetic record and check the result is a finite number"""
+    record = {col: candidate['label_encoders'][col].classes_[0] for col in CATEGORICAL_COLUMNS
+              if col in candidate['label_encoders']}
+    record.update({col: 1.0 for col in NUMERIC_COLUMNS})
+
+    input_data = pd.DataFrame([record], columns=candidate['feature_columns'])
+    encode_categoricals(input_data, candidate['label_encoders'], candidate.get('category_lookup'))
+    prediction = predict_frame(candidate, input_data)[0]
+
+    if not np.isfinite(prediction):
+        raise ValueError(f'Smoke prediction returned {prediction}')
+
+startup.mark('import_seconds', time.perf_counter() - startup.started)
+import_seconds.set(startup.timings['import_seconds'])
+
 if __name__ == '__main__':
     print("Starting House Price Prediction App...")
     print("Visit http://localhost:5000 to use the application")
+    load_model_in_background()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for training, model loading and inference.
+
+Measures cold-start model load in fresh processes, part reconstruction,
+single-row /predict latency percentiles and /predict/batch throughput through
+the Flask test client, per-candidate training time and peak RSS. Results are
+written as JSON and can be compared against a stored baseline:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --output bench.json --baseline baseline.json --threshold 0.10
+
+The comparison exits with status 1 when any metric regressed by more than the
+threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Metrics where a larger value is an improvement; every other metric is a duration or a size
+HIGHER_IS_BETTER_SUFFIXES = ('_per_second',)
+
+COLD_START_SCRIPT = """
+import json, resource, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.ensure_model_loaded()
+ready = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'load_model_seconds': app.startup.timings['load_seconds'],
+    'time_to_ready_seconds': ready - started,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}))
+"""
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_cold_start(repeats):
+    """Import app and wait until it is ready in fresh processes, with and without the memory-mapped artifact"""
+    results = {}
+    for variant, use_artifact in [('artifact', '1'), ('pickle', '0')]:
+        env = dict(os.environ, USE_MODEL_ARTIFACT=use_artifact)
+        runs = []
+        for _ in range(repeats):
+            output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], env=env, check=True,
+                                    capture_output=True, text=True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+        results[f'load.{variant}.import_seconds'] = min(run['import_seconds'] for run in runs)
+        results[f'load.{variant}.load_model_seconds'] = min(run['load_model_seconds'] for run in runs)
+        results[f'load.{variant}.time_to_ready_seconds'] = min(run['time_to_ready_seconds'] for run in runs)
+        results[f'load.{variant}.peak_rss_mb'] = max(run['peak_rss_mb'] for run in runs)
+    return results
+
+
+def bench_reconstruct(model_file):
+    """Split a copy of the model and time reconstruct_pickle_file() on it"""
+    from split_model import reconstruct_pickle_file, split_pickle_file
+
+    if not os.path.exists(model_file):
+        return {}
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        copy = os.path.join(tmpdir, os.path.basename(model_file))
+        info_file = os.path.join(tmpdir, 'model_parts.info')
+        shutil.copyfile(model_file, copy)
+
+        split_pickle_file(copy, info_file=info_file)
+        os.remove(copy)
+
+        started = time.perf_counter()
+        if reconstruct_pickle_file(info_file):
+            results['reconstruct.seconds'] = time.perf_counter() - started
+    return results
+
+
+def sample_records(model_data, count, seed):
+    """Random but reproducible /predict payloads drawn from the model's known categories"""
+    rng = np.random.RandomState(seed)
+    encoders = model_data['label_encoders']
+    records = []
+    for _ in range(count):
+        record = {col: str(rng.choice(le.classes_)) for col, le in encoders.items()}
+        record.update({
+            'baths': int(rng.randint(1, 7)),
+            'bedrooms': int(rng.randint(1, 8)),
+            'Area_in_Marla': round(float(rng.uniform(2, 40)), 1)
+        })
+        records.append(record)
+    return records
+
+
+def bench_single_predict(client, records, warmup_records):
+    """p50/p99 latency of one /predict request per record"""
+    for record in warmup_records:
+        client.post('/predict', json=record)
+
+    latencies = []
+    for record in records:
+        started = time.perf_counter()
+        response = client.post('/predict', json=record)
+        latencies.append(time.perf_counter() - started)
+        if not response.get_json().get('success'):
+            raise RuntimeError(f"Prediction failed: {response.get_json()}")
+
+    total = sum(latencies)
+    return {
+        'predict.single.p50_ms': percentile_ms(latencies, 50),
+        'predict.single.p99_ms': percentile_ms(latencies, 99),
+        'predict.single.requests_per_second': len(latencies) / total
+    }
+
+
+def bench_batch_predict(client, records, batch_sizes, repeats):
+    """Rows per second through /predict/batch at several batch sizes"""
+    results = {}
+    for size in batch_sizes:
+        batch = (records * (size // len(records) + 1))[:size]
+        client.post('/predict/batch', json=batch)
+
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            client.post('/predict/batch', json=batch)
+            timings.append(time.perf_counter() - started)
+
+        best = min(timings)
+        results[f'predict.batch.{size}.seconds'] = best
+        results[f'predict.batch.{size}.rows_per_second'] = size / best
+    return results
+
+
+def bench_training():
+    """Per-candidate fit and predict time on the cached training data, without touching the model files"""
+    from sklearn.model_selection import train_test_split
+
+    import app
+    from dataset_cache import load_training_data
+    from training import train_candidates
+
+    started = time.perf_counter()
+    X, y, _ = load_training_data(app.FEATURE_COLUMNS, app.CATEGORICAL_COLUMNS, use_cache=False)
+    results = {'train.read_csv_seconds': time.perf_counter() - started}
+
+    started = time.perf_counter()
+    load_training_data(app.FEATURE_COLUMNS, app.CATEGORICAL_COLUMNS)
+    load_training_data(app.FEATURE_COLUMNS, app.CATEGORICAL_COLUMNS)
+    results['train.cached_load_seconds'] = (time.perf_counter() - started) / 2
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # The candidates training fits, so the benchmark follows any change to them
+    models = app.candidate_models()
+    for name, (_, report) in train_candidates(models, X_train, y_train, X_test, y_test).items():
+        results[f'train.{name}.fit_seconds'] = report['fit_seconds']
+        results[f'train.{name}.predict_seconds'] = report['predict_seconds']
+    return results
+
+
+def run_benchmarks(args):
+    results = {}
+
+    if not args.skip_cold_start:
+        print("Measuring cold-start model load...")
+        results.update(bench_cold_start(args.cold_start_repeats))
+
+    import app
+    app.ensure_model_loaded()
+
+    if not args.skip_reconstruct:
+        print("Measuring part reconstruction...")
+        results.update(bench_reconstruct(app.MODEL_FILE))
+
+    client = app.app.test_client()
+    records = sample_records(app.model_data, args.requests, args.seed)
+
+    print(f"Measuring single-row latency over {args.requests} requests...")
+    # Warm up on different records so the timed requests are not prediction cache hits
+    warmup_records = sample_records(app.model_data, args.warmup, args.seed + 1)
+    results.update(bench_single_predict(client, records, warmup_records))
+
+    print(f"Measuring batch throughput at sizes {args.batch_sizes}...")
+    results.update(bench_batch_predict(client, records, args.batch_sizes, args.batch_repeats))
+
+    if not args.skip_training:
+        print("Measuring training time per candidate...")
+        results.update(bench_training())
+
+    results['memory.peak_rss_mb'] = peak_rss_mb()
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'model_name': app.model_data['model_name'],
+            'model_version': app.model_data.get('version'),
+            'seed': args.seed,
+            'requests': args.requests
+        },
+        'results': results
+    }
+
+
+def higher_is_better(name):
+    return name.endswith(HIGHER_IS_BETTER_SUFFIXES)
+
+
+def compare(current, baseline, threshold):
+    """Compare two result sets, returns (rows, regressions) where rows are (name, baseline, current, change)"""
+    rows = []
+    regressions = []
+    for name in sorted(set(current) & set(baseline)):
+        old, new = baseline[name], current[name]
+        if not old:
+            continue
+
+        change = (new - old) / old
+        rows.append((name, old, new, change))
+
+        worse = -change if higher_is_better(name) else change
+        if worse > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the results JSON')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative regression that fails the comparison (default 0.10)')
+    parser.add_argument('--requests', type=int, default=500, help='single-row requests to time')
+    parser.add_argument('--warmup', type=int, default=50, help='untimed requests before measuring')
+    parser.add_argument('--batch-sizes', type=lambda s: [int(v) for v in s.split(',')], default=[1, 10, 100, 1000])
+    parser.add_argument('--batch-repeats', type=int, default=5)
+    parser.add_argument('--cold-start-repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-cold-start', action='store_true')
+    parser.add_argument('--skip-reconstruct', action='store_true')
+    parser.add_argument('--skip-training', action='store_true')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    for name, value in sorted(report['results'].items()):
+        print(f"{name:50s} {value:14.4f}")
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+        rows, regressions = compare(report['results'], baseline, args.threshold)
+        print(f"\nComparison against {args.baseline} (threshold {args.threshold:.0%}):")
+        for name, old, new, change in rows:
+            flag = '  REGRESSION' if name in regressions else ''
+            print(f"{name:50s} {old:14.4f} -> {new:14.4f} ({change:+.1%}){flag}")
+
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
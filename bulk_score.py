@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scoring of large CSV files.
+
+Loads the serving model once, reads the input in chunks of only the feature
+columns, plus any columns asked to be kept such as a listing ID, and scores the chunks across a pool of forked worker processes that
+share the loaded model. Encoding, the unknown-category fallback and the
+prediction path are the ones /predict uses. At most a few chunks are in flight
+at a time, so files far larger than RAM stream through in bounded memory.
+
+    python -m bulk_score score listings.csv priced.csv
+    python -m bulk_score score listings.csv priced.ndjson --workers 4 --chunk-size 50000
+    python -m bulk_score score listings.csv priced.csv --keep-columns listing_id
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 100_000
+PREDICTION_COLUMN = 'predicted_price'
+
+# Set in the parent before forking so workers inherit the model instead of unpickling it
+_model_data = None
+
+
+def load_model_data(path=None):
+    """The model app.py serves, or the pickle or artifact at path"""
+    import app
+
+    if path is None:
+        return app.ensure_model_loaded()
+
+    if path.endswith('.bin'):
+        from model_artifact import load_artifact
+        model_data = load_artifact(path)
+    else:
+        with open(path, 'rb') as f:
+            model_data = pickle.load(f)
+    return app.prepare_model(model_data)
+
+
+def score_chunk(model_data, chunk):
+    """Predictions for one chunk of raw feature rows, NaN where a row cannot be scored"""
+    from app import CATEGORICAL_COLUMNS, encode_categoricals, predict_frame
+
+    features = chunk[model_data['feature_columns']].copy()
+    for col in features.columns:
+        if col not in CATEGORICAL_COLUMNS:
+            features[col] = pd.to_numeric(features[col], errors='coerce')
+
+    # Same rule as /predict/batch: every feature must be present and numeric columns must parse
+    valid = features.notna().all(axis=1).to_numpy()
+    predictions = np.full(len(features), np.nan)
+    if valid.any():
+        rows = features[valid].reset_index(drop=True)
+        encode_categoricals(rows, model_data['label_encoders'], model_data.get('category_lookup'))
+        predictions[valid] = predict_frame(model_data, rows)
+    return predictions
+
+
+def _score_in_worker(chunk):
+    return score_chunk(_model_data, chunk)
+
+
+def _init_worker(model_data):
+    global _model_data
+    _model_data = model_data
+
+
+def read_chunks(path, feature_columns, chunk_size, keep_columns=()):
+    """Iterate over the input CSV in chunks of the feature columns followed by keep_columns"""
+    columns = list(feature_columns) + [col for col in keep_columns if col not in feature_columns]
+    for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_size, dtype=str, keep_default_na=True):
+        yield chunk[columns]
+
+
+def write_chunk(f, chunk, fmt, first):
+    if fmt == 'ndjson':
+        # to_json writes NaN as null, so rows that could not be scored stay explicit
+        f.write(chunk.to_json(orient='records', lines=True))
+    else:
+        chunk.to_csv(f, header=first, index=False)
+
+
+def output_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def _scored(chunks, workers):
+    """Yield (chunk, predictions) in input order with at most 2 * workers chunks in flight"""
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, score_chunk(_model_data, chunk)
+        return
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Freeze the loaded model out of the collector so forked workers do not dirty its pages
+        gc.freeze()
+        pool = multiprocessing.get_context('fork').Pool(workers)
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(_model_data,))
+
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append((chunk, pool.apply_async(_score_in_worker, (chunk,))))
+            if len(pending) >= 2 * workers:
+                done, result = pending.popleft()
+                yield done, result.get()
+        while pending:
+            done, result = pending.popleft()
+            yield done, result.get()
+    finally:
+        pool.terminate()
+        pool.join()
+        gc.unfreeze()
+
+
+def score_file(input_path, output_path, model_data, chunk_size=DEFAULT_CHUNK_SIZE, workers=None,
+               fmt=None, progress=True, keep_columns=()):
+    """Score every row of input_path into output_path, returns (rows, scored) counts
+
+    keep_columns, such as an ID, are copied from the input next to the prediction.
+    """
+    global _model_data
+    _model_data = model_data
+    workers = workers or os.cpu_count() or 1
+    fmt = output_format(output_path, fmt)
+
+    rows = scored = 0
+    started = time.perf_counter()
+    chunks = read_chunks(input_path, model_data['feature_columns'], chunk_size, keep_columns)
+
+    with open(output_path, 'w', newline='') as f:
+        for chunk, predictions in _scored(chunks, workers):
+            chunk[PREDICTION_COLUMN] = predictions
+            write_chunk(f, chunk, fmt, first=(rows == 0))
+
+            rows += len(chunk)
+            scored += int(np.count_nonzero(~np.isnan(predictions)))
+            if progress:
+                elapsed = time.perf_counter() - started
+                print(f"{rows:,} rows scored ({rows / max(elapsed, 1e-9):,.0f} rows/sec)", file=sys.stderr)
+
+    return rows, scored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    score = commands.add_parser('score', help='score a CSV of listings')
+    score.add_argument('input', help='CSV with the model feature columns')
+    score.add_argument('output', help='where to write the scored rows')
+    score.add_argument('--format', choices=['csv', 'ndjson'],
+                       help='output format (default: from the output extension, else csv)')
+    score.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows read per chunk')
+    score.add_argument('--workers', type=int, default=os.cpu_count(), help='scoring processes (default: all cores)')
+    score.add_argument('--keep-columns', default='',
+                       help='comma-separated input columns, such as an ID, to write next to the prediction')
+    score.add_argument('--model', help='model pickle or .bin artifact (default: the model app.py serves)')
+    score.add_argument('--quiet', action='store_true', help='do not report progress')
+    args = parser.parse_args(argv)
+
+    model_data = load_model_data(args.model)
+    started = time.perf_counter()
+    rows, scored = score_file(args.input, args.output, model_data, chunk_size=args.chunk_size,
+                              workers=args.workers, fmt=args.format, progress=not args.quiet,
+                              keep_columns=[col for col in args.keep_columns.split(',') if col])
+    elapsed = time.perf_counter() - started
+    print(f"Scored {scored} of {rows} rows with {model_data['model_name']} into {args.output} "
+          f"in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
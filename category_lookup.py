@@ -0,0 +1,127 @@
+"""
+Constant-time category encoding with nearest-match resolution for locations.
+
+Built once per loaded model from its label encoders: a dict from every known
+category to its code, and for high-cardinality columns a normalized-name
+table plus a character trigram index. A location the model has never seen
+exactly ("dha  defence", "Bahria Twn") resolves to the closest known
+location instead of the alphabetically first class.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+NGRAM_SIZE = 3
+# Dice similarity of trigram sets below which a location is not matched to anything
+MIN_SIMILARITY = 0.5
+# Resolved unknown spellings kept per index, clients tend to repeat the same variants
+RESOLVE_CACHE_SIZE = 10000
+
+EXACT = 'exact'
+NORMALIZED = 'normalized'
+NEAREST = 'nearest'
+FALLBACK = 'fallback'
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(value):
+    """Lowercase, with every run of punctuation or whitespace collapsed to one space"""
+    return _NON_ALNUM.sub(' ', str(value).lower()).strip()
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    padded = f' {text} '
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+class NearestMatchIndex:
+    """Normalized-name table and trigram inverted index over the classes of one column"""
+
+    def __init__(self, classes, min_similarity=MIN_SIMILARITY):
+        self.classes = [str(value) for value in classes]
+        self.min_similarity = min_similarity
+        self.normalized = {}
+        postings = {}
+        self.gram_counts = np.zeros(len(self.classes), dtype=np.int32)
+
+        for code, value in enumerate(self.classes):
+            key = normalize(value)
+            self.normalized.setdefault(key, code)
+            grams = ngrams(key)
+            self.gram_counts[code] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(code)
+
+        self.postings = {gram: np.array(codes, dtype=np.int32) for gram, codes in postings.items()}
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def resolve(self, value):
+        """(code, kind) of the known class closest to an unknown value, code None when nothing is close"""
+        with self._cache_lock:
+            cached = self._cache.get(value)
+            if cached is not None:
+                # Least recently used first, so the spellings clients keep sending stay cached
+                self._cache.move_to_end(value)
+                return cached
+
+        key = normalize(value)
+        if key in self.normalized:
+            result = (self.normalized[key], NORMALIZED)
+        else:
+            result = self._nearest(key)
+
+        # Resolved outside the lock; a value two threads miss at once is only computed twice
+        with self._cache_lock:
+            self._cache[value] = result
+            if len(self._cache) > RESOLVE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    def _nearest(self, key):
+        grams = ngrams(key)
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return None, FALLBACK
+
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.classes))
+        similarity = 2.0 * shared / (len(grams) + self.gram_counts)
+        code = int(np.argmax(similarity))
+        if similarity[code] < self.min_similarity:
+            return None, FALLBACK
+        return code, NEAREST
+
+
+class CategoryLookup:
+    """Per-column dict encoders, with nearest-match resolution for the fuzzy columns"""
+
+    def __init__(self, label_encoders, fuzzy_columns=('location',)):
+        self.tables = {col: {str(value): code for code, value in enumerate(le.classes_)}
+                       for col, le in label_encoders.items()}
+        self.classes = {col: [str(value) for value in le.classes_] for col, le in label_encoders.items()}
+        self.indexes = {col: NearestMatchIndex(label_encoders[col].classes_)
+                        for col in fuzzy_columns if col in label_encoders}
+
+    def lookup(self, col, value):
+        """(code, matched class, kind) for one raw value; unmatched values fall back to code 0"""
+        value = str(value)
+        code = self.tables[col].get(value)
+        if code is not None:
+            return code, value, EXACT
+
+        kind = FALLBACK
+        if col in self.indexes:
+            code, kind = self.indexes[col].resolve(value)
+        if code is None:
+            code = 0
+        return code, self.classes[col][code], kind
+
+    def encode(self, col, values):
+        """Codes for a sequence of raw values"""
+        table = self.tables[col]
+        if col not in self.indexes:
+            return np.fromiter((table.get(str(value), 0) for value in values), dtype=np.int64, count=len(values))
+        return np.fromiter((self.lookup(col, value)[0] for value in values), dtype=np.int64, count=len(values))
@@ -0,0 +1,260 @@
+"""
+Post-training compaction of tree ensembles.
+
+Works on the compiled node arrays of a fitted forest or tree, one tree at a
+time:
+
+- Thresholds are rounded down to float32. Inputs are compared as float32, and
+  for a float32 x, x <= t exactly when x <= the largest float32 not above t,
+  so this step changes no prediction.
+- Splits whose outcome is already fixed by the thresholds above them are
+  bypassed, and the branch no row can reach is dropped.
+- Sibling leaves whose values differ by at most the tolerance are merged
+  bottom-up into their parent, which takes the mean of the two, so no row
+  moves by more than half the tolerance per merge. Internal node values are
+  never read: sklearn stores the mean of the rows under the node there, but
+  the boosted trees of out_of_core store 0.0. Merges cascade towards the root.
+- Optionally only the top-k trees are kept, ranked by how much the holdout
+  error grows when each one is left out of the average.
+- Leaf values are stored as float32 and feature indexes as uint8.
+
+Half of the holdout rows rank the trees and the other half measure the R2 the
+compaction costs, so the tree choice is not scored on the rows it was made on.
+Compactions that lose more R2 than the bound are refused.
+"""
+import time
+
+import numpy as np
+
+from tree_engine import CompiledForest, compile_model
+
+NODE_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+# Trees whose leaf predictions are held at once while ranking, bounds the (rows x trees) matrix
+RANK_BLOCK_TREES = 32
+
+
+def floor_float32(values):
+    """Largest float32 not above each value"""
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def split_trees(engine):
+    """Per-tree node arrays with tree-local child indexes"""
+    ends = np.append(engine.roots[1:], engine.n_nodes)
+    trees = []
+    for start, end in zip(engine.roots.tolist(), ends.tolist()):
+        trees.append({
+            'feature': np.asarray(engine.feature[start:end], dtype=np.int64),
+            'threshold': floor_float32(engine.threshold[start:end]).astype(np.float64),
+            'left': np.asarray(engine.left[start:end], dtype=np.int64) - start,
+            'right': np.asarray(engine.right[start:end], dtype=np.int64) - start,
+            'value': np.asarray(engine.value[start:end], dtype=np.float64)
+        })
+    return trees
+
+
+def _levels(tree, root=0):
+    """Node ids reachable from the root, one array per depth"""
+    levels = []
+    frontier = np.array([root])
+    while len(frontier):
+        levels.append(frontier)
+        internal = frontier[tree['left'][frontier] != frontier]
+        frontier = np.concatenate([tree['left'][internal], tree['right'][internal]])
+    return levels
+
+
+def bypass_dead_splits(tree, n_features):
+    """Point parents past splits their ancestors already decide, returns (new root, splits bypassed)"""
+    left, right, feature, threshold = tree['left'], tree['right'], tree['feature'], tree['threshold']
+    taken = np.full(len(left), -1)
+
+    frontier = np.array([0])
+    lower = np.full((1, n_features), -np.inf)
+    upper = np.full((1, n_features), np.inf)
+    while len(frontier):
+        internal = left[frontier] != frontier
+        frontier, lower, upper = frontier[internal], lower[internal], upper[internal]
+        rows = np.arange(len(frontier))
+        f, t = feature[frontier], threshold[frontier]
+
+        # Rows here satisfy lower < x <= upper on every feature
+        always_left = t >= upper[rows, f]
+        always_right = ~always_left & (t <= lower[rows, f])
+        taken[frontier[always_left]] = left[frontier[always_left]]
+        taken[frontier[always_right]] = right[frontier[always_right]]
+
+        live = ~(always_left | always_right)
+        live_rows = np.arange(live.sum())
+        left_upper = upper[live].copy()
+        left_upper[live_rows, f[live]] = t[live]
+        right_lower = lower[live].copy()
+        right_lower[live_rows, f[live]] = t[live]
+
+        frontier = np.concatenate([left[frontier[live]], right[frontier[live]],
+                                   left[frontier[always_left]], right[frontier[always_right]]])
+        lower = np.concatenate([lower[live], right_lower, lower[always_left], lower[always_right]])
+        upper = np.concatenate([left_upper, upper[live], upper[always_left], upper[always_right]])
+
+    # Children follow their parents in node order, so resolving from the back follows whole chains
+    resolved = np.arange(len(left))
+    bypassed = np.flatnonzero(taken >= 0)
+    for node in bypassed[::-1].tolist():
+        resolved[node] = resolved[taken[node]]
+    tree['left'], tree['right'] = resolved[left], resolved[right]
+    return int(resolved[0]), len(bypassed)
+
+
+def merge_leaves(tree, root, tolerance):
+    """Turn splits whose two leaves differ by at most tolerance into leaves, deepest first, returns merges"""
+    left, right, value = tree['left'], tree['right'], tree['value']
+    merged = 0
+    for level in reversed(_levels(tree, root)):
+        nodes = level[left[level] != level]
+        children_left, children_right = left[nodes], right[nodes]
+        both_leaves = (left[children_left] == children_left) & (left[children_right] == children_right)
+        close = both_leaves & (np.abs(value[children_left] - value[children_right]) <= tolerance)
+        merge = nodes[close]
+        value[merge] = (value[children_left[close]] + value[children_right[close]]) / 2
+        left[merge] = merge
+        right[merge] = merge
+        merged += len(merge)
+    return merged
+
+
+def renumber(tree, root):
+    """Reachable nodes only, in breadth-first order, returns (arrays, depth)"""
+    levels = _levels(tree, root)
+    order = np.concatenate(levels)
+    new_id = np.full(len(tree['left']), -1)
+    new_id[order] = np.arange(len(order))
+    is_leaf = tree['left'][order] == order
+    return {
+        'feature': np.where(is_leaf, 0, tree['feature'][order]),
+        'threshold': np.where(is_leaf, 0.0, tree['threshold'][order]),
+        'left': new_id[tree['left'][order]],
+        'right': new_id[tree['right'][order]],
+        'value': tree['value'][order]
+    }, len(levels) - 1
+
+
+def join_trees(trees, depths, n_features, dtype=np.float32):
+    """One CompiledForest from tree-local arrays, with float32 nodes and the smallest feature index type"""
+    offsets = np.cumsum([0] + [len(tree['left']) for tree in trees[:-1]])
+    feature_dtype = np.uint8 if n_features <= 256 else np.int32
+    return CompiledForest(
+        feature=np.concatenate([tree['feature'] for tree in trees]).astype(feature_dtype),
+        threshold=np.concatenate([tree['threshold'] for tree in trees]).astype(dtype),
+        left=np.concatenate([tree['left'] + offset for tree, offset in zip(trees, offsets)]).astype(np.int32),
+        right=np.concatenate([tree['right'] + offset for tree, offset in zip(trees, offsets)]).astype(np.int32),
+        value=np.concatenate([tree['value'] for tree in trees]).astype(dtype),
+        roots=np.asarray(offsets, dtype=np.int32),
+        max_depth=max(depths),
+        n_features=n_features
+    )
+
+
+def rank_trees(engine, X, y):
+    """Tree indexes ordered by how much the holdout squared error grows without each tree, most first"""
+    y = np.asarray(y, dtype=np.float64)
+    leaves = engine.apply(X)
+    total = engine.value[leaves].sum(axis=1, dtype=np.float64)
+    n_trees = engine.n_trees
+    base_error = np.mean(np.square(total / n_trees - y))
+
+    growth = np.empty(n_trees)
+    for start in range(0, n_trees, RANK_BLOCK_TREES):
+        block = engine.value[leaves[:, start:start + RANK_BLOCK_TREES]].astype(np.float64)
+        without = (total[:, None] - block) / max(n_trees - 1, 1)
+        growth[start:start + block.shape[1]] = np.mean(np.square(without - y[:, None]), axis=0) - base_error
+    return np.argsort(-growth, kind='stable')
+
+
+def compact_engine(engine, tolerance=0.0, top_k=None, X_rank=None, y_rank=None):
+    """Compacted copy of a compiled forest, returns (CompiledForest, counts of what was removed)"""
+    trees, depths = [], []
+    bypassed = merged = 0
+    for tree in split_trees(engine):
+        root, n_bypassed = bypass_dead_splits(tree, engine.n_features)
+        merged += merge_leaves(tree, root, tolerance)
+        tree, depth = renumber(tree, root)
+        trees.append(tree)
+        depths.append(depth)
+        bypassed += n_bypassed
+
+    if top_k is not None and top_k < len(trees):
+        full = join_trees(trees, depths, engine.n_features, dtype=np.float64)
+        keep = np.sort(rank_trees(full, X_rank, y_rank)[:top_k])
+        trees, depths = [trees[i] for i in keep], [depths[i] for i in keep]
+
+    return join_trees(trees, depths, engine.n_features), {'bypassed_splits': bypassed, 'merged_leaves': merged}
+
+
+def engine_nbytes(engine):
+    """Bytes of node arrays, what the memory-mapped artifact stores per model"""
+    return sum(np.asarray(getattr(engine, name)).nbytes for name in NODE_ARRAYS)
+
+
+def _r2(y, predictions):
+    y = np.asarray(y, dtype=np.float64)
+    total = np.sum(np.square(y - y.mean()))
+    return float(1.0 - np.sum(np.square(y - predictions)) / total) if total > 0 else float('nan')
+
+
+def compact_model(model, X_holdout, y_holdout, tolerance=0.01, top_k=None, max_r2_loss=0.005):
+    """Compact a fitted tree model, returns (CompiledForest or None when refused or unsupported, report)
+
+    tolerance is a fraction of the holdout target's standard deviation.
+    """
+    from training import measure_candidate
+
+    started = time.perf_counter()
+    engine = compile_model(model)
+    if engine is None:
+        return None, {'accepted': False, 'reason': f'{type(model).__name__} is not a tree model'}
+
+    X_holdout = np.asarray(X_holdout, dtype=np.float32)
+    y_holdout = np.asarray(y_holdout, dtype=np.float64)
+    X_rank, y_rank = X_holdout[0::2], y_holdout[0::2]
+    X_eval, y_eval = X_holdout[1::2], y_holdout[1::2]
+    absolute_tolerance = tolerance * float(np.std(y_holdout))
+
+    compacted, removed = compact_engine(engine, absolute_tolerance, top_k, X_rank, y_rank)
+    before = measure_candidate(model, X_holdout)
+    after = measure_candidate(compacted, X_holdout)
+    r2_before = _r2(y_eval, engine.predict(X_eval))
+    r2_after = _r2(y_eval, compacted.predict(X_eval))
+
+    report = dict(
+        removed,
+        tolerance=tolerance,
+        absolute_tolerance=absolute_tolerance,
+        top_k=top_k,
+        trees_before=engine.n_trees,
+        trees_after=compacted.n_trees,
+        nodes_before=engine.n_nodes,
+        nodes_after=compacted.n_nodes,
+        artifact_mb_before=engine_nbytes(engine) / (1024 * 1024),
+        artifact_mb_after=engine_nbytes(compacted) / (1024 * 1024),
+        size_mb_before=before['size_mb'],
+        size_mb_after=after['size_mb'],
+        memory_mb_before=before['memory_mb'],
+        memory_mb_after=after['memory_mb'],
+        p99_predict_ms_before=before['p99_predict_ms'],
+        p99_predict_ms_after=after['p99_predict_ms'],
+        evaluation_rows=len(y_eval),
+        r2_before=r2_before,
+        r2_after=r2_after,
+        r2_loss=r2_before - r2_after,
+        max_r2_loss=max_r2_loss,
+        accepted=True,
+        reason=None
+    )
+    if not r2_before - r2_after <= max_r2_loss:
+        report.update(accepted=False, reason=f'R2 loss {r2_before - r2_after:.4f} exceeds the bound {max_r2_loss}')
+    report['compaction_seconds'] = time.perf_counter() - started
+    return (compacted if report['accepted'] else None), report
@@ -0,0 +1,213 @@
+"""
+Typed columnar cache for House_dataset.csv.
+
+The CSV is parsed once with explicit dtypes, reading only the model's feature
+columns and the price. The cleaned, label-encoded result is stored as one .npy
+file per column plus a JSON manifest keyed by the CSV's size, mtime and SHA-256,
+so later trainings load a few binary arrays instead of reparsing the CSV.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+DATASET_FILE = 'House_dataset.csv'
+CACHE_DIR = os.environ.get('DATASET_CACHE_DIR', '.dataset_cache')
+MANIFEST_FILE = 'manifest.json'
+TARGET_COLUMN = 'price'
+CACHE_VERSION = 1
+
+
+def csv_fingerprint(csv_path, with_hash=True):
+    """Size, mtime and (optionally) content hash identifying a CSV file"""
+    stat = os.stat(csv_path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(csv_path, 'rb') as f:
+            for buf in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(buf)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+
+def prefix_sha256(csv_path, size):
+    """SHA-256 of the first size bytes of a file"""
+    digest = hashlib.sha256()
+    remaining = size
+    with open(csv_path, 'rb') as f:
+        while remaining > 0:
+            buf = f.read(min(1024 * 1024, remaining))
+            if not buf:
+                break
+            digest.update(buf)
+            remaining -= len(buf)
+    return digest.hexdigest()
+
+
+def is_appended(csv_path, source):
+    """Check the CSV still starts with the exact bytes it had when source was fingerprinted"""
+    if not os.path.exists(csv_path) or os.path.getsize(csv_path) < source['size']:
+        return False
+    with open(csv_path, 'rb') as f:
+        # New rows can only be split off cleanly if the old content ended on a line boundary
+        f.seek(source['size'] - 1)
+        if f.read(1) != b'\n':
+            return False
+    return prefix_sha256(csv_path, source['size']) == source['sha256']
+
+
+def read_appended_rows(csv_path, offset, feature_columns, categorical_columns):
+    """Parse only the rows after byte offset, reusing the header line at the top of the file"""
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        f.seek(offset)
+        appended = f.read()
+    return read_dataset(io.BytesIO(header + appended), feature_columns, categorical_columns)
+
+
+def read_dataset(csv_path, feature_columns, categorical_columns):
+    """Parse only the needed columns with explicit dtypes, then drop incomplete rows"""
+    dtypes = {col: ('category' if col in categorical_columns else 'float64') for col in feature_columns}
+    dtypes[TARGET_COLUMN] = 'float64'
+
+    df = pd.read_csv(csv_path, usecols=list(dtypes), dtype=dtypes)
+    df = df.dropna().reset_index(drop=True)
+    return df[feature_columns], df[TARGET_COLUMN]
+
+
+def label_encoder(classes):
+    """A fitted LabelEncoder with the given classes"""
+    # Imported here so serving processes that never train do not pay for loading sklearn
+    from sklearn.preprocessing import LabelEncoder
+    le = LabelEncoder()
+    le.classes_ = classes
+    return le
+
+
+def encode_dataset(X, categorical_columns):
+    """Label-encode categorical columns, matching LabelEncoder's sorted class order"""
+    X = X.copy()
+    label_encoders = {}
+    for col in categorical_columns:
+        values = X[col].astype(str)
+        classes = np.array(sorted(values.unique()), dtype=object)
+        X[col] = pd.Categorical(values, categories=classes).codes.astype(np.int32)
+
+        label_encoders[col] = label_encoder(classes)
+    return X, label_encoders
+
+
+def extend_encoders(X, label_encoders, categorical_columns):
+    """Encode new rows with existing codes unchanged, appending unseen categories as new codes"""
+    X = X.copy()
+    extended = {}
+    for col in categorical_columns:
+        old_classes = np.asarray(label_encoders[col].classes_, dtype=object)
+        codes = {str(value): code for code, value in enumerate(old_classes)}
+        values = X[col].astype(str)
+
+        new_classes = sorted(set(values.unique()) - set(codes))
+        for value in new_classes:
+            codes[value] = len(codes)
+        X[col] = values.map(codes).to_numpy(dtype=np.int32)
+
+        extended[col] = label_encoder(np.concatenate([old_classes, np.array(new_classes, dtype=object)]))
+    return X, extended
+
+
+def _manifest_path(cache_dir):
+    return os.path.join(cache_dir, MANIFEST_FILE)
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(_manifest_path(cache_dir)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == CACHE_VERSION else None
+
+
+def _cache_matches(manifest, csv_path, feature_columns):
+    """Check a manifest describes this CSV, hashing only when size matches but mtime does not"""
+    if manifest is None or manifest['feature_columns'] != list(feature_columns):
+        return False
+
+    source = manifest['source']
+    current = csv_fingerprint(csv_path, with_hash=False)
+    if current['size'] != source['size']:
+        return False
+    if current['mtime_ns'] == source['mtime_ns']:
+        return True
+    return csv_fingerprint(csv_path)['sha256'] == source['sha256']
+
+
+def save_cache(cache_dir, csv_path, X, y, label_encoders):
+    """Write one .npy per column into a versioned directory, then publish the manifest"""
+    source = csv_fingerprint(csv_path)
+    data_dir = source['sha256'][:16]
+    os.makedirs(os.path.join(cache_dir, data_dir), exist_ok=True)
+
+    columns = {}
+    for col in list(X.columns) + [TARGET_COLUMN]:
+        values = y.to_numpy() if col == TARGET_COLUMN else X[col].to_numpy()
+        filename = os.path.join(data_dir, f'{col}.npy')
+        np.save(os.path.join(cache_dir, filename), values)
+        columns[col] = filename
+
+    manifest = {
+        'version': CACHE_VERSION,
+        'source': source,
+        'rows': len(y),
+        'feature_columns': list(X.columns),
+        'columns': columns,
+        'classes': {col: [str(c) for c in le.classes_] for col, le in label_encoders.items()}
+    }
+
+    tmp_path = f'{_manifest_path(cache_dir)}.tmp{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, _manifest_path(cache_dir))
+
+    # Remove data directories left behind by earlier versions of the CSV
+    for entry in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, entry)
+        if entry != data_dir and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_cache(cache_dir, manifest):
+    """Rebuild the encoded features, target and encoders from a cache manifest"""
+    arrays = {col: np.load(os.path.join(cache_dir, filename)) for col, filename in manifest['columns'].items()}
+    X = pd.DataFrame({col: arrays[col] for col in manifest['feature_columns']})
+    y = pd.Series(arrays[TARGET_COLUMN], name=TARGET_COLUMN)
+
+    label_encoders = {}
+    for col, classes in manifest['classes'].items():
+        label_encoders[col] = label_encoder(np.array(classes, dtype=object))
+    return X, y, label_encoders
+
+
+def load_training_data(feature_columns, categorical_columns, csv_path=DATASET_FILE, cache_dir=CACHE_DIR,
+                       use_cache=True):
+    """Return encoded features, target and label encoders, reusing the columnar cache when valid"""
+    if use_cache and os.path.exists(csv_path):
+        manifest = _read_manifest(cache_dir)
+        if _cache_matches(manifest, csv_path, feature_columns):
+            print(f"Loaded {manifest['rows']} rows from dataset cache {cache_dir}")
+            return load_cache(cache_dir, manifest)
+
+    X, y = read_dataset(csv_path, feature_columns, categorical_columns)
+    X, label_encoders = encode_dataset(X, categorical_columns)
+
+    if use_cache:
+        try:
+            save_cache(cache_dir, csv_path, X, y, label_encoders)
+        except OSError as e:
+            print(f"Could not write dataset cache: {e}")
+    return X, y, label_encoders
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Synthetic House_dataset.csv generator for scale testing.
+
+Writes rows matching the real schema (property_type, location, city, baths,
+purpose, bedrooms, Area_in_Marla, price), optionally with the unnamed index
+column and a sprinkling of missing values. Locations follow a Zipf
+distribution over a configurable number of names, each tied to one city, and
+prices are derived from area, location, city, type and rooms so trained models
+have signal to find. Rows are produced in fixed-size chunks, so memory stays
+bounded at any row count, and the output is fully determined by the seed.
+
+    python generate_dataset.py --rows 1000000 --output House_dataset.csv
+    python generate_dataset.py --rows 10000000 --format columnar --output house_columns
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['property_type', 'location', 'city', 'baths', 'purpose', 'bedrooms', 'Area_in_Marla', 'price']
+
+CITIES = ['Islamabad', 'Lahore', 'Karachi', 'Rawalpindi', 'Faisalabad']
+CITY_WEIGHTS = [0.25, 0.3, 0.3, 0.1, 0.05]
+# Price per marla for sale in each city, in PKR
+CITY_RATES = {'Islamabad': 4.5e6, 'Lahore': 3.5e6, 'Karachi': 3.8e6, 'Rawalpindi': 2.5e6, 'Faisalabad': 1.8e6}
+
+PROPERTY_TYPES = ['House', 'Flat', 'Upper Portion', 'Lower Portion', 'Penthouse', 'Farm House', 'Room']
+PROPERTY_WEIGHTS = [0.6, 0.2, 0.07, 0.06, 0.03, 0.02, 0.02]
+PROPERTY_FACTORS = [1.0, 1.3, 0.7, 0.75, 1.6, 0.6, 0.9]
+
+PURPOSES = ['For Sale', 'For Rent']
+PURPOSE_WEIGHTS = [0.75, 0.25]
+# Monthly rent as a fraction of the sale price
+RENT_RATIO = 0.004
+
+# The most popular locations carry real names, the long tail is numbered
+NAMED_LOCATIONS = ['DHA Defence', 'G-10', 'Bahria Town', 'Gulberg', 'F-7', 'Clifton', 'Johar Town', 'E-11',
+                   'Model Town', 'Askari', 'Gulshan-e-Iqbal', 'Saddar', 'Wapda Town', 'I-8', 'Cantt']
+LOCATION_PREFIXES = ['Sector', 'Block', 'Phase', 'Town', 'Colony', 'Scheme', 'Garden', 'Enclave']
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def location_names(count):
+    """Deterministic location names, most popular first"""
+    names = NAMED_LOCATIONS[:count]
+    for k in range(count - len(names)):
+        names.append(f"{LOCATION_PREFIXES[k % len(LOCATION_PREFIXES)]} {k // len(LOCATION_PREFIXES) + 1}")
+    return np.array(names, dtype=object)
+
+
+class LocationTable:
+    """Location names with Zipf popularity, their city and a price multiplier"""
+
+    def __init__(self, count, zipf_a, rng):
+        self.names = location_names(count)
+        ranks = np.arange(1, count + 1, dtype=np.float64)
+        weights = ranks ** -zipf_a
+        self.cumulative = np.cumsum(weights / weights.sum())
+        self.city = rng.choice(len(CITIES), size=count, p=CITY_WEIGHTS)
+        self.multiplier = rng.lognormal(mean=0.0, sigma=0.4, size=count)
+
+    def sample(self, rng, size):
+        index = np.searchsorted(self.cumulative, rng.random(size), side='right')
+        return np.minimum(index, len(self.names) - 1)
+
+
+def generate_chunk(rng, locations, size, nan_fraction):
+    """One DataFrame chunk of synthetic listings"""
+    location = locations.sample(rng, size)
+    city = locations.city[location]
+    property_type = rng.choice(len(PROPERTY_TYPES), size=size, p=PROPERTY_WEIGHTS)
+    purpose = rng.choice(len(PURPOSES), size=size, p=PURPOSE_WEIGHTS)
+
+    area = np.round(rng.gamma(shape=2.5, scale=4.0, size=size) + 2.0, 1)
+    bedrooms = np.clip(np.round(area / 3 + rng.normal(0, 1, size)), 1, 10)
+    baths = np.clip(bedrooms + rng.integers(-1, 2, size), 1, 10)
+
+    rate = np.array([CITY_RATES[c] for c in CITIES])[city]
+    price = (area * rate * locations.multiplier[location] * np.array(PROPERTY_FACTORS)[property_type]
+             * (1 + 0.04 * bedrooms) * rng.lognormal(0.0, 0.15, size))
+    price = np.where(purpose == 1, price * RENT_RATIO, price).round(-3)
+
+    chunk = pd.DataFrame({
+        'property_type': np.array(PROPERTY_TYPES, dtype=object)[property_type],
+        'location': locations.names[location],
+        'city': np.array(CITIES, dtype=object)[city],
+        'baths': baths,
+        'purpose': np.array(PURPOSES, dtype=object)[purpose],
+        'bedrooms': bedrooms,
+        'Area_in_Marla': area,
+        'price': price
+    }, columns=COLUMNS)
+
+    if nan_fraction > 0:
+        for col in ['location', 'baths', 'bedrooms', 'Area_in_Marla']:
+            missing = rng.random(size) < nan_fraction
+            chunk.loc[missing, col] = np.nan
+    return chunk
+
+
+def iter_chunks(rows, seed=42, locations=5000, zipf_a=1.1, nan_fraction=0.01, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (start_row, DataFrame) chunks; each chunk has its own seeded generator"""
+    table = LocationTable(locations, zipf_a, np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0,))))
+
+    for index, start in enumerate(range(0, rows, chunk_size)):
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(1, index)))
+        yield start, generate_chunk(rng, table, min(chunk_size, rows - start), nan_fraction)
+
+
+def write_csv(path, chunks, index_column=True):
+    """Append chunks to a CSV, optionally with the unnamed pandas index column"""
+    rows = 0
+    with open(path, 'w', newline='') as f:
+        for start, chunk in chunks:
+            if index_column:
+                chunk.index = pd.RangeIndex(start, start + len(chunk))
+            chunk.to_csv(f, header=(start == 0), index=index_column)
+            rows += len(chunk)
+    return rows
+
+
+def write_columnar(path, chunks, rows):
+    """Write one preallocated .npy file per column plus a manifest"""
+    os.makedirs(path, exist_ok=True)
+    string_width = {'property_type': max(map(len, PROPERTY_TYPES)), 'city': max(map(len, CITIES)),
+                    'purpose': max(map(len, PURPOSES)), 'location': 32}
+
+    columns = {}
+    for col in COLUMNS:
+        dtype = f'<U{string_width[col]}' if col in string_width else np.float64
+        columns[col] = np.lib.format.open_memmap(os.path.join(path, f'{col}.npy'), mode='w+',
+                                                 dtype=dtype, shape=(rows,))
+
+    for start, chunk in chunks:
+        for col, array in columns.items():
+            values = chunk[col]
+            # Missing strings are stored as empty strings, missing numbers as NaN
+            array[start:start + len(chunk)] = values.fillna('').to_numpy() if col in string_width else values
+    for array in columns.values():
+        array.flush()
+
+    manifest = {'rows': rows, 'columns': {col: {'file': f'{col}.npy', 'dtype': str(array.dtype)}
+                                          for col, array in columns.items()}}
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return rows
+
+
+def generate_dataset(output, rows, fmt='csv', seed=42, locations=5000, zipf_a=1.1, nan_fraction=0.01,
+                     index_column=True, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Generate a synthetic dataset at output, returns the number of rows written"""
+    chunks = iter_chunks(rows, seed=seed, locations=locations, zipf_a=zipf_a,
+                         nan_fraction=nan_fraction, chunk_size=chunk_size)
+    if fmt == 'csv':
+        return write_csv(output, chunks, index_column=index_column)
+    if fmt == 'columnar':
+        return write_columnar(output, chunks, rows)
+    raise ValueError(f"Unknown format {fmt!r}, expected 'csv' or 'columnar'")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--output', default='House_dataset.csv')
+    parser.add_argument('--format', choices=['csv', 'columnar'], default='csv')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--locations', type=int, default=5000, help='number of distinct locations')
+    parser.add_argument('--zipf-a', type=float, default=1.1, help='Zipf exponent of location popularity')
+    parser.add_argument('--nan-fraction', type=float, default=0.01, help='fraction of missing values per column')
+    parser.add_argument('--no-index-column', action='store_true', help='omit the unnamed index column')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    rows = generate_dataset(args.output, args.rows, fmt=args.format, seed=args.seed, locations=args.locations,
+                            zipf_a=args.zipf_a, nan_fraction=args.nan_fraction,
+                            index_column=not args.no_index_column, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {rows} rows to {args.output} in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
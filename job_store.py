@@ -0,0 +1,154 @@
+"""
+Retraining job records shared by every process serving the app.
+
+Jobs are kept in one JSON file next to the model, so each worker of a
+pre-fork server reports the same jobs, and a record outlives the process that
+ran it. Every change is a read-modify-write under an exclusive flock on a
+companion .lock file, and the file is replaced by a rename so readers never
+see it half written.
+
+The process running a job holds a flock on a second file, .running, for as
+long as it runs. That is what allows one job at a time across processes, and
+since the kernel drops the lock when its holder exits, a job left 'running'
+by a process that died is recognised and reported as failed.
+"""
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: the locks only hold between threads of one process
+    fcntl = None
+
+ACTIVE_STATUSES = ('queued', 'running')
+# A queued job is picked up at once; one still queued after this long lost the process meant to run it
+QUEUED_TIMEOUT = 60.0
+
+_thread_locks = {}
+
+
+def try_lock(path, blocking=False):
+    """Take an exclusive lock on path, returns a handle for unlock or None when someone else holds it"""
+    if fcntl is None:
+        lock = _thread_locks.setdefault(path, threading.Lock())
+        return lock if lock.acquire(blocking) else None
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def unlock(handle):
+    if fcntl is None:
+        handle.release()
+    else:
+        os.close(handle)
+
+
+def is_locked(path):
+    """Whether any process, this one included, holds the lock on path"""
+    handle = try_lock(path)
+    if handle is None:
+        return True
+    unlock(handle)
+    return False
+
+
+def _json_default(value):
+    # NumPy scalars from training reports
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class JobStore:
+    """Retraining jobs in a JSON file, oldest first and bounded to max_jobs"""
+
+    def __init__(self, path, max_jobs=20, queued_timeout=QUEUED_TIMEOUT):
+        self.path = path
+        self.max_jobs = max_jobs
+        self.queued_timeout = queued_timeout
+
+    @property
+    def lock_file(self):
+        return f'{self.path}.lock'
+
+    @property
+    def run_lock_file(self):
+        return f'{self.path}.running'
+
+    def jobs(self):
+        return list(self._read().values())
+
+    def get(self, job_id):
+        return self._read().get(job_id)
+
+    def active(self):
+        """The queued or running job, or None"""
+        return next((job for job in self.jobs() if job['status'] in ACTIVE_STATUSES), None)
+
+    def create(self, job):
+        """Add a queued job unless another is queued or running, returns that other job or None"""
+        handle = try_lock(self.lock_file, blocking=True)
+        try:
+            jobs = self._read()
+            running = next((other for other in jobs.values() if other['status'] in ACTIVE_STATUSES), None)
+            if running is not None:
+                return running
+
+            job['queued_at'] = time.time()
+            jobs[job['job_id']] = job
+            finished = [job_id for job_id, other in jobs.items() if other['status'] not in ACTIVE_STATUSES]
+            for job_id in finished[:max(len(jobs) - self.max_jobs, 0)]:
+                del jobs[job_id]
+            self._write(jobs)
+            return None
+        finally:
+            unlock(handle)
+
+    def save(self, job):
+        """Write a job's current record"""
+        handle = try_lock(self.lock_file, blocking=True)
+        try:
+            jobs = self._read()
+            jobs[job['job_id']] = job
+            self._write(jobs)
+        finally:
+            unlock(handle)
+
+    def claim(self):
+        """Take the lock held while a job runs, returns a handle for release or None if a job is running"""
+        return try_lock(self.run_lock_file)
+
+    def release(self, handle):
+        unlock(handle)
+
+    def _abandoned(self, job):
+        if job['status'] == 'running':
+            return not is_locked(self.run_lock_file)
+        return time.time() - job.get('queued_at', 0) > self.queued_timeout
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                jobs = json.load(f)
+        except FileNotFoundError:
+            return {}
+
+        for job in jobs.values():
+            if job['status'] in ACTIVE_STATUSES and self._abandoned(job):
+                job.update(status='failed', stage='failed',
+                           error='The process running this job exited before it finished')
+        return jobs
+
+    def _write(self, jobs):
+        tmp = f'{self.path}.tmp{os.getpid()}'
+        with open(tmp, 'w') as f:
+            json.dump(jobs, f, default=_json_default)
+        os.replace(tmp, self.path)
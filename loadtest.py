@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator and request replay tool.
+
+Replays a JSONL file of /predict payloads, or generates them from the
+synthetic dataset schema, against a running server or the in-process Flask
+test client. Load is either closed-loop (a fixed number of concurrent
+clients) or open-loop (a target request rate, so a slow server builds up a
+queue instead of silently slowing the clients down). Open-loop latency runs
+from when a request was due, not when it was sent, so time a request spent
+waiting behind a backlog, or behind the in-flight cap, is counted instead of
+omitted; the time from send to response is reported separately as service
+time. Reports throughput, latency percentiles, error rates and a per-interval
+latency series:
+
+    python loadtest.py --url http://localhost:5000 --concurrency 16 --duration 30
+    python loadtest.py --url http://localhost:5000 --rate 200 --requests 5000 --payloads payloads.jsonl
+    python loadtest.py --in-process --concurrency 4 --requests 1000 --output load.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Open-loop runs stop issuing new requests once this many are outstanding
+DEFAULT_MAX_IN_FLIGHT = 1000
+
+
+def load_payloads(path):
+    """Read one JSON payload per non-empty line"""
+    payloads = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                payloads.append(json.loads(line))
+    if not payloads:
+        raise ValueError(f"No payloads in {path}")
+    return payloads
+
+
+def synthetic_payloads(count, seed=42, locations=5000):
+    """Complete /predict payloads drawn from the synthetic dataset generator"""
+    from generate_dataset import iter_chunks
+
+    payloads = []
+    for _, chunk in iter_chunks(count, seed=seed, locations=locations, nan_fraction=0.0, chunk_size=count):
+        payloads.extend(chunk.drop(columns=['price']).to_dict(orient='records'))
+    return payloads
+
+
+class HTTPConnection:
+    """Minimal keep-alive HTTP/1.1 client over asyncio streams"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=b'', headers=None):
+        """Send one request, returns (status, body); retried once on a new connection if a reused one was closed"""
+        reused = self.writer is not None
+        if not reused:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        try:
+            self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+            await self.writer.drain()
+            status_line = await self.reader.readline()
+        except ConnectionError:
+            status_line = b''
+        if not status_line:
+            # An idle keep-alive connection the server closed fails before any status line; nothing was processed
+            await self.close()
+            if reused:
+                return await self.request(method, path, body, headers)
+            raise ConnectionError('Server closed the connection')
+        return await self._read_response(status_line)
+
+    async def _read_response(self, status_line):
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            data = await self._read_chunked()
+        elif 'content-length' in response_headers:
+            data = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            data = await self.reader.read()
+
+        if version == 'HTTP/1.0' or response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return int(status), data
+
+    async def _read_chunked(self):
+        data = bytearray()
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await self.reader.readline()
+                return bytes(data)
+            data += await self.reader.readexactly(size)
+            await self.reader.readline()
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+class HTTPTarget:
+    """Sends payloads to a running server, one keep-alive connection per client"""
+
+    def __init__(self, url, endpoint='/predict'):
+        parts = urlsplit(url)
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 80
+        self.path = (parts.path.rstrip('/') or '') + endpoint
+        self._idle = []
+
+    async def send(self, payload):
+        connection = self._idle.pop() if self._idle else HTTPConnection(self.host, self.port)
+        try:
+            status, body = await connection.request('POST', self.path, json.dumps(payload).encode('utf-8'),
+                                                    {'Content-Type': 'application/json'})
+        except Exception:
+            await connection.close()
+            raise
+        self._idle.append(connection)
+        return status, body
+
+    async def close(self):
+        for connection in self._idle:
+            await connection.close()
+        self._idle = []
+
+
+class InProcessTarget:
+    """Sends payloads through the in-process Flask test client on worker threads"""
+
+    def __init__(self, flask_app, endpoint='/predict'):
+        self.app = flask_app
+        self.endpoint = endpoint
+
+    def _post(self, payload):
+        response = self.app.test_client().post(self.endpoint, json=payload)
+        return response.status_code, response.get_data()
+
+    async def send(self, payload):
+        return await asyncio.to_thread(self._post, payload)
+
+    async def close(self):
+        pass
+
+
+def _succeeded(status, body):
+    if status >= 400:
+        return False
+    try:
+        return bool(json.loads(body).get('success', True))
+    except (ValueError, AttributeError):
+        return False
+
+
+class LoadRun:
+    """Collects (start offset, latency, service time, status, success) samples of one run"""
+
+    def __init__(self, target, payloads):
+        self.target = target
+        self.payloads = itertools.cycle(payloads)
+        self.samples = []
+        self.started = None
+
+    async def one(self, due=None):
+        """Send the next payload; latency runs from due when it is scheduled, else from the send"""
+        payload = next(self.payloads)
+        started = time.perf_counter()
+        due = started if due is None else due
+        try:
+            status, body = await self.target.send(payload)
+            ok = _succeeded(status, body)
+        except Exception as e:
+            status, ok = type(e).__name__, False
+        finished = time.perf_counter()
+        self.samples.append((due - self.started, finished - due, finished - started, status, ok))
+
+    async def closed_loop(self, concurrency, requests=None, duration=None):
+        """concurrency clients each sending their next request as soon as the last one returns"""
+        counter = itertools.count()
+        deadline = None if duration is None else self.started + duration
+
+        async def client():
+            while (requests is None or next(counter) < requests) and \
+                    (deadline is None or time.perf_counter() < deadline):
+                await self.one()
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    async def open_loop(self, rate, requests=None, duration=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """Start requests on a fixed schedule regardless of how quickly earlier ones complete"""
+        in_flight = set()
+        interval = 1.0 / rate
+        for sent in itertools.count():
+            if requests is not None and sent >= requests:
+                break
+            due = self.started + sent * interval
+            if duration is not None and due >= self.started + duration:
+                break
+
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(in_flight) >= max_in_flight:
+                await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+            task = asyncio.ensure_future(self.one(due))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+    async def run(self, concurrency=1, rate=None, requests=None, duration=None):
+        self.started = time.perf_counter()
+        try:
+            if rate:
+                await self.open_loop(rate, requests, duration)
+            else:
+                await self.closed_loop(concurrency, requests, duration)
+        finally:
+            await self.target.close()
+        return time.perf_counter() - self.started
+
+
+def latency_summary(latencies):
+    if not len(latencies):
+        return {'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'max_ms': None}
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+    return {'p50_ms': float(p50), 'p90_ms': float(p90), 'p99_ms': float(p99),
+            'max_ms': float(np.max(latencies) * 1000)}
+
+
+def summarize(samples, elapsed, interval=1.0):
+    """Throughput, latency percentiles, errors and a per-interval series from the raw samples"""
+    latencies = np.array([latency for _, latency, _, _, _ in samples])
+    service_times = np.array([service for _, _, service, _, _ in samples])
+    errors = sum(1 for *_, ok in samples if not ok)
+
+    statuses = {}
+    for *_, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    series = []
+    buckets = {}
+    for offset, latency, _, _, ok in samples:
+        buckets.setdefault(int(offset // interval), []).append((latency, ok))
+    for index in sorted(buckets):
+        bucket = buckets[index]
+        series.append(dict(latency_summary(np.array([latency for latency, _ in bucket])),
+                           start_seconds=index * interval,
+                           requests=len(bucket),
+                           errors=sum(1 for _, ok in bucket if not ok)))
+
+    return dict(latency_summary(latencies),
+                requests=len(samples),
+                errors=errors,
+                error_rate=errors / len(samples) if samples else 0.0,
+                elapsed_seconds=elapsed,
+                requests_per_second=len(samples) / elapsed if elapsed else 0.0,
+                statuses=statuses,
+                service=latency_summary(service_times),
+                series=series)
+
+
+def run_load(target, payloads, concurrency=1, rate=None, requests=None, duration=None, interval=1.0):
+    """Drive target with the payloads and return the summary report"""
+    if requests is None and duration is None:
+        raise ValueError('Either requests or duration must be set')
+    load = LoadRun(target, payloads)
+    elapsed = asyncio.run(load.run(concurrency=concurrency, rate=rate, requests=requests, duration=duration))
+    return summarize(load.samples, elapsed, interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='base URL of a running server, e.g. http://localhost:5000')
+    target.add_argument('--in-process', action='store_true', help='drive app.py through the Flask test client')
+    parser.add_argument('--endpoint', default='/predict')
+    parser.add_argument('--payloads', help='JSONL file with one payload per line (default: synthetic payloads)')
+    parser.add_argument('--synthetic-count', type=int, default=10000, help='distinct synthetic payloads')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients (closed loop)')
+    parser.add_argument('--rate', type=float, help='target requests per second (open loop, overrides --concurrency)')
+    parser.add_argument('--requests', type=int, help='total requests to send')
+    parser.add_argument('--duration', type=float, help='seconds to run for')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds per point of the latency series')
+    parser.add_argument('--output', help='write the full report as JSON')
+    args = parser.parse_args(argv)
+
+    if args.requests is None and args.duration is None:
+        args.duration = 10.0
+
+    payloads = load_payloads(args.payloads) if args.payloads else synthetic_payloads(args.synthetic_count, args.seed)
+
+    if args.in_process:
+        from app import app, ensure_model_loaded
+        ensure_model_loaded()
+        driver = InProcessTarget(app, args.endpoint)
+    else:
+        driver = HTTPTarget(args.url, args.endpoint)
+
+    mode = f'{args.rate:g} req/s' if args.rate else f'concurrency {args.concurrency}'
+    print(f"Sending {len(payloads)} distinct payloads to {args.url or 'test client'}{args.endpoint} at {mode}...")
+    report = run_load(driver, payloads, concurrency=args.concurrency, rate=args.rate,
+                      requests=args.requests, duration=args.duration, interval=args.interval)
+
+    print(f"{report['requests']} requests in {report['elapsed_seconds']:.1f}s: "
+          f"{report['requests_per_second']:.1f} req/s, {report['error_rate']:.2%} errors {report['statuses']}")
+    if report['requests']:
+        print(f"latency p50={report['p50_ms']:.2f}ms p90={report['p90_ms']:.2f}ms "
+              f"p99={report['p99_ms']:.2f}ms max={report['max_ms']:.2f}ms")
+        if args.rate:
+            print(f"service time p50={report['service']['p50_ms']:.2f}ms p99={report['service']['p99_ms']:.2f}ms "
+                  f"(latency counts from when each request was due)")
+    for point in report['series']:
+        print(f"  t={point['start_seconds']:6.1f}s {point['requests']:6d} req {point['errors']:4d} err "
+              f"p50={point['p50_ms']:.2f}ms p99={point['p99_ms']:.2f}ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 1 if report['requests'] and report['errors'] == report['requests'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
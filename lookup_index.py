@@ -0,0 +1,225 @@
+"""
+Precomputed prediction tables for tree ensembles.
+
+A fitted forest is piecewise constant: with the categorical codes fixed, its
+output only depends on which interval between consecutive split thresholds
+each numeric feature falls into. For the most frequent category combinations
+the index collects the thresholds reachable under those codes, derives the
+leaf every tree reaches in every threshold cell from the leaf bounds, and
+stores the averaged prediction per cell. Answering a row is then a bisect per
+numeric feature and one table read; rows of other combinations, or with NaN
+values, go to the model.
+
+Cell values are averaged by the same CompiledForest.predict_leaves call that
+serves live requests, so a table hit equals the engine's prediction exactly.
+"""
+import bisect
+import time
+
+import numpy as np
+
+# Leaf indexes held at once while a table is filled, (cells x trees) int32
+BUILD_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def frequent_combinations(X, categorical_columns, label_encoders, limit=100):
+    """The most common category combinations of an encoded frame, as raw values with their row counts"""
+    counts = X.groupby(list(categorical_columns)).size().sort_values(ascending=False, kind='stable')
+    combinations = []
+    for codes, rows in counts.head(limit).items():
+        codes = codes if isinstance(codes, tuple) else (codes,)
+        values = [str(label_encoders[col].classes_[int(code)]) for col, code in zip(categorical_columns, codes)]
+        combinations.append({'values': values, 'rows': int(rows)})
+    return combinations
+
+
+class CombinationTable:
+    """Threshold lists and the cell prediction table of one category combination"""
+
+    def __init__(self, positions, thresholds, values):
+        self.positions = positions
+        # Plain float lists, bisect on them is faster than numpy for one value
+        self.thresholds = [t.tolist() for t in thresholds]
+        self.strides = [int(np.prod([len(t) + 1 for t in thresholds[i + 1:]])) for i in range(len(thresholds))]
+        self.values = values
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + sum(8 * len(t) for t in self.thresholds)
+
+    def lookup(self, row):
+        cell = 0
+        for position, thresholds, stride in zip(self.positions, self.thresholds, self.strides):
+            x = row[position]
+            if x != x:
+                return None
+            cell += bisect.bisect_left(thresholds, x) * stride
+        return self.values[cell]
+
+
+class LookupIndex:
+    """Prediction tables for a compiled forest, keyed by the codes of the categorical features"""
+
+    def __init__(self, engine, categorical_positions, max_bytes):
+        self.engine = engine
+        self.categorical_positions = list(categorical_positions)
+        self.numeric_positions = [i for i in range(engine.n_features) if i not in self.categorical_positions]
+        self.max_bytes = max_bytes
+        self.tables = {}
+        self.nbytes = 0
+        self.skipped = 0
+        self.build_seconds = 0.0
+        self.hits = 0
+        self.misses = 0
+
+        n_nodes = engine.n_nodes
+        self._is_leaf = engine.left == np.arange(n_nodes)
+        self._is_categorical = np.isin(engine.feature, self.categorical_positions) & ~self._is_leaf
+        self._tree_of = np.repeat(np.arange(engine.n_trees), np.diff(np.append(engine.roots, n_nodes)))
+
+    @classmethod
+    def build(cls, engine, categorical_positions, combinations, max_bytes):
+        """Index the given code tuples in order, skipping any table that would exceed max_bytes"""
+        index = cls(engine, categorical_positions, max_bytes)
+        for codes in combinations:
+            index.add(codes)
+        return index
+
+    def add(self, codes):
+        """Precompute the table for one tuple of categorical codes, returns False when over the memory cap"""
+        started = time.perf_counter()
+        key = tuple(float(code) for code in codes)
+        if key in self.tables:
+            return True
+
+        x = np.zeros(self.engine.n_features)
+        x[self.categorical_positions] = key
+        leaves, lower, upper, splits = self._leaf_bounds(x)
+
+        thresholds = [np.unique(self.engine.threshold[splits[self.engine.feature[splits] == position]])
+                      for position in self.numeric_positions]
+        # The axis with the most cells goes first, so filling in blocks along it touches each leaf few times
+        order = sorted(range(len(thresholds)), key=lambda axis: -len(thresholds[axis]))
+        thresholds = [thresholds[axis] for axis in order]
+        lower, upper = lower[:, order], upper[:, order]
+        shape = tuple(len(t) + 1 for t in thresholds)
+
+        cells = int(np.prod(shape))
+        needed = cells * 8 + sum(8 * len(t) for t in thresholds)
+        if self.nbytes + needed > self.max_bytes:
+            self.skipped += 1
+            return False
+
+        # Threshold bounds of every leaf become [first, last) cell ranges along each axis
+        first = np.empty(lower.shape, dtype=np.int64)
+        last = np.empty(upper.shape, dtype=np.int64)
+        for axis, t in enumerate(thresholds):
+            edges = np.append(t, np.inf).astype(np.float64)
+            first[:, axis] = np.searchsorted(edges, lower[:, axis], side='right')
+            last[:, axis] = np.searchsorted(edges, upper[:, axis], side='right')
+
+        table = CombinationTable([self.numeric_positions[axis] for axis in order], thresholds,
+                                 self._fill(shape, leaves, first, last))
+        self.tables[key] = table
+        self.nbytes += table.nbytes
+        self.build_seconds += time.perf_counter() - started
+        return True
+
+    def _leaf_bounds(self, x):
+        """Leaves reachable with the categorical values of x, their numeric threshold bounds and the splits passed"""
+        engine = self.engine
+        axis_of = np.full(engine.n_features, -1)
+        axis_of[self.numeric_positions] = np.arange(len(self.numeric_positions))
+        n_axes = len(self.numeric_positions)
+
+        nodes = engine.roots.astype(np.int64)
+        lower = np.full((len(nodes), n_axes), -np.inf)
+        upper = np.full((len(nodes), n_axes), np.inf)
+        leaves, leaf_lower, leaf_upper, splits = [], [], [], []
+
+        while len(nodes):
+            is_leaf = self._is_leaf[nodes]
+            leaves.append(nodes[is_leaf])
+            leaf_lower.append(lower[is_leaf])
+            leaf_upper.append(upper[is_leaf])
+            nodes, lower, upper = nodes[~is_leaf], lower[~is_leaf], upper[~is_leaf]
+
+            # Categorical splits follow the one branch the fixed codes take
+            categorical = self._is_categorical[nodes]
+            fixed = nodes[categorical]
+            go_left = x[engine.feature[fixed]] <= engine.threshold[fixed]
+            fixed_next = np.where(go_left, engine.left[fixed], engine.right[fixed])
+
+            # Numeric splits keep both branches, narrowing the bound on their feature
+            numeric = nodes[~categorical]
+            splits.append(numeric)
+            rows = np.arange(len(numeric))
+            axes = axis_of[engine.feature[numeric]]
+            threshold = engine.threshold[numeric].astype(np.float64)
+            left_upper = upper[~categorical].copy()
+            left_upper[rows, axes] = np.minimum(left_upper[rows, axes], threshold)
+            right_lower = lower[~categorical].copy()
+            right_lower[rows, axes] = np.maximum(right_lower[rows, axes], threshold)
+
+            nodes = np.concatenate([fixed_next, engine.left[numeric], engine.right[numeric]])
+            lower = np.concatenate([lower[categorical], lower[~categorical], right_lower])
+            upper = np.concatenate([upper[categorical], left_upper, upper[~categorical]])
+
+        return (np.concatenate(leaves), np.concatenate(leaf_lower), np.concatenate(leaf_upper),
+                np.concatenate(splits))
+
+    def _fill(self, shape, leaves, first, last):
+        """Cell predictions from leaf cell ranges, in blocks along the first axis to bound memory"""
+        n_trees = self.engine.n_trees
+        values = np.empty(int(np.prod(shape)), dtype=np.float64)
+        slab_cells = max(int(np.prod(shape[1:])), 1)
+        block = max(BUILD_BLOCK_BYTES // (slab_cells * n_trees * 4), 1)
+        trees = self._tree_of[leaves]
+
+        for start in range(0, shape[0], block):
+            stop = min(start + block, shape[0])
+            grid = np.empty((n_trees, stop - start) + tuple(shape[1:]), dtype=np.int32)
+            overlapping = np.flatnonzero((first[:, 0] < stop) & (last[:, 0] > start))
+            for i in overlapping.tolist():
+                box = (trees[i], slice(max(first[i, 0], start) - start, min(last[i, 0], stop) - start))
+                box += tuple(slice(a, b) for a, b in zip(first[i, 1:].tolist(), last[i, 1:].tolist()))
+                grid[box] = leaves[i]
+            matrix = np.ascontiguousarray(grid.reshape(n_trees, -1).T)
+            values[start * slab_cells:stop * slab_cells] = self.engine.predict_leaves(matrix)
+        return values
+
+    def lookup(self, row):
+        """Precomputed prediction for one feature row (a list of floats), None when it is not indexed"""
+        table = self.tables.get(tuple(row[p] for p in self.categorical_positions))
+        if table is None:
+            return None
+        return table.lookup(row)
+
+    def predict(self, X, fallback):
+        """Predict float32 rows from the tables, passing rows that are not indexed to fallback together"""
+        X = np.asarray(X, dtype=np.float32)
+        predictions = np.empty(len(X), dtype=np.float64)
+        missed = []
+        for i, row in enumerate(X.tolist()):
+            value = self.lookup(row)
+            if value is None:
+                missed.append(i)
+            else:
+                predictions[i] = value
+        if missed:
+            predictions[missed] = fallback(X[missed])
+        self.hits += len(X) - len(missed)
+        self.misses += len(missed)
+        return predictions
+
+    def stats(self):
+        return {
+            'combinations': len(self.tables),
+            'skipped': self.skipped,
+            'cells': sum(len(table.values) for table in self.tables.values()),
+            'size_mb': self.nbytes / (1024 * 1024),
+            'max_size_mb': self.max_bytes / (1024 * 1024),
+            'build_seconds': self.build_seconds,
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,304 @@
+"""
+Minimal Prometheus metrics for the serving path.
+
+Counters, gauges and fixed-bucket histograms with labels, rendered in the
+Prometheus text exposition format. Observations are a bisect and a few integer
+additions under a lock, cheap enough to leave on in production.
+
+Under a pre-fork server every worker has its own registry, and a scrape
+reaches whichever worker accepts it. MultiprocessStore makes each scrape
+report the whole server: workers write snapshots of their registry to a
+shared directory, and the worker that answers sums its own live counters and
+histograms with the other snapshots and those of workers that already exited.
+Gauges describe the process that answers.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from job_store import try_lock, unlock
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, labels, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Family:
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def items(self):
+        """(labels, value) pairs, copied under the lock"""
+        with self._lock:
+            return [(labels, self._copy(value)) for labels, value in self._values.items()]
+
+    def merge(self, labels, value):
+        """Fold in another process's value for a label set"""
+        with self._lock:
+            self._values[labels] = value
+
+    def _copy(self, value):
+        return value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+                for labels, value in items]
+
+
+class Counter(_Family):
+    """Monotonically increasing count per label set"""
+    metric_type = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def merge(self, labels, value):
+        self.inc(labels, value)
+
+
+class Gauge(_Family):
+    """Value that can be set to anything per label set"""
+    metric_type = 'gauge'
+
+    def set(self, value, labels=()):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Family):
+    """Fixed-bucket histogram per label set"""
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # One slot per bucket plus the +Inf overflow, then sum and count
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def merge(self, labels, value):
+        counts, total, count = value
+        with self._lock:
+            state = self._values.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            state[0] = [a + b for a, b in zip(state[0], counts)]
+            state[1] += total
+            state[2] += count
+
+    def _copy(self, value):
+        return [list(value[0]), value[1], value[2]]
+
+    def snapshot(self, labels=()):
+        """(cumulative bucket counts, sum, count) for one label set"""
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                return [0] * (len(self.buckets) + 1), 0.0, 0
+            counts, total, count = list(state[0]), state[1], state[2]
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, count
+
+    def _render_samples(self, items):
+        lines = []
+        for labels, (counts, total, count) in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float('inf'),), counts):
+                running += c
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {running}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Registry:
+    """Collection of metric families rendered together"""
+
+    def __init__(self):
+        self._families = []
+        self._collectors = []
+
+    def register(self, family):
+        self._families.append(family)
+        return family
+
+    def add_collector(self, collector):
+        """Register a callable returning families built fresh at every scrape"""
+        self._collectors.append(collector)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def families(self):
+        """Registered families followed by those the collectors build now"""
+        families = list(self._families)
+        for collector in self._collectors:
+            families.extend(collector())
+        return families
+
+    def render(self, families=None):
+        lines = []
+        for family in self.families() if families is None else families:
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+
+FAMILY_TYPES = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}
+
+
+def snapshot_families(families):
+    """JSON-serializable form of metric families"""
+    return [{'name': family.name, 'type': family.metric_type, 'documentation': family.documentation,
+             'labelnames': list(family.labelnames), 'buckets': list(getattr(family, 'buckets', ())),
+             'values': [[list(labels), value] for labels, value in family.items()]}
+            for family in families]
+
+
+def merge_snapshots(families, snapshots, gauges=True):
+    """Fold snapshots into families by name, adding families they lack; gauges are skipped unless gauges"""
+    by_name = {family.name: family for family in families}
+    for snapshot in snapshots:
+        for entry in snapshot:
+            if entry['type'] == 'gauge' and not gauges:
+                continue
+            family = by_name.get(entry['name'])
+            if family is None:
+                kwargs = {'buckets': entry['buckets']} if entry['type'] == 'histogram' else {}
+                family = FAMILY_TYPES[entry['type']](entry['name'], entry['documentation'], entry['labelnames'],
+                                                     **kwargs)
+                by_name[family.name] = family
+                families.append(family)
+            for labels, value in entry['values']:
+                family.merge(tuple(labels), value)
+    return families
+
+
+class MultiprocessStore:
+    """Directory of per-process registry snapshots that a scrape of any worker sums up"""
+
+    ARCHIVE = 'exited.json'
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read(self, name):
+        try:
+            with open(self._path(name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _write(self, name, snapshot):
+        tmp = self._path(f'{name}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self._path(name))
+
+    def write(self, registry, pid=None):
+        """Save this process's current values for the other workers to read"""
+        self._write(f'{pid or os.getpid()}.json', snapshot_families(registry.families()))
+
+    def retire(self, pid):
+        """Fold an exited process's counters and histograms into the archive and drop its snapshot"""
+        handle = try_lock(self._path('.lock'), blocking=True)
+        try:
+            snapshot = self._read(f'{pid}.json')
+            if snapshot:
+                archive = merge_snapshots([], [self._read(self.ARCHIVE), snapshot], gauges=False)
+                self._write(self.ARCHIVE, snapshot_families(archive))
+            if os.path.exists(self._path(f'{pid}.json')):
+                os.remove(self._path(f'{pid}.json'))
+        finally:
+            unlock(handle)
+
+    def render(self, registry):
+        """This process's live values plus every other process's snapshot, in text format"""
+        own = f'{os.getpid()}.json'
+        handle = try_lock(self._path('.lock'), blocking=True)
+        try:
+            others = [self._read(name) for name in sorted(os.listdir(self.directory))
+                      if name.endswith('.json') and name != own]
+        finally:
+            unlock(handle)
+        # Snapshot copies, so merging never adds to the live families
+        families = merge_snapshots([], [snapshot_families(registry.families())])
+        return registry.render(merge_snapshots(families, others, gauges=False))
+
+
+class StageTimer:
+    """Times consecutive stages of one request into a per-stage histogram"""
+
+    def __init__(self, histogram, endpoint):
+        self.histogram = histogram
+        self.endpoint = endpoint
+        self.started = self.last = time.perf_counter()
+        self.error = False
+
+    def mark(self, stage):
+        """Record the time since the previous mark as the given stage"""
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, (self.endpoint, stage))
+        self.last = now
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
@@ -0,0 +1,78 @@
+"""
+Dynamic micro-batching of concurrent single predictions.
+
+Request threads submit one item each and block on a future. A background
+thread collects items until the batch is full or the oldest item has waited
+max_wait seconds, runs them through one call of the handler and hands every
+caller its own result. Under concurrency this replaces many one-row model
+calls with one vectorized call; with a single client it only adds up to
+max_wait of latency.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Groups concurrent submit() calls into batched calls of handler(items) -> results"""
+
+    def __init__(self, handler, max_batch_size=64, max_wait=0.002, observer=None):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        # Called with (batch size, per-item queue wait in seconds) after every batch
+        self.observer = observer
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so a forked worker starts its own collector
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                thread = threading.Thread(target=self._run, args=(self._queue,), name='micro-batcher', daemon=True)
+                thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, item, timeout=None):
+        """Queue one item and wait for its result; exceptions from the handler are re-raised"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result(timeout)
+
+    def _collect(self, pending):
+        first = pending.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, pending):
+        while True:
+            batch = self._collect(pending)
+            started = time.perf_counter()
+            try:
+                results = self.handler([item for item, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+
+            if self.observer is not None:
+                try:
+                    self.observer(len(batch), [started - enqueued for _, _, enqueued in batch])
+                except Exception as e:
+                    print(f"Micro-batch observer failed: {e}")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Memory-mappable model artifact.
+
+Stores the compiled tree ensemble and the label encoder class tables as raw,
+64-byte aligned arrays behind a small JSON header. Loading maps the arrays with
+numpy.memmap, so every worker process on a host shares the same page-cache
+pages instead of unpickling a private copy of every tree.
+
+File layout:
+    8 bytes   magic (b'HPMART01')
+    8 bytes   little-endian header length
+    N bytes   UTF-8 JSON header (metadata + array offsets, dtypes and shapes)
+    ...       arrays, each starting on an ALIGNMENT boundary
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+from tree_engine import CompiledForest, compile_model
+
+ARTIFACT_FILE = 'house_price_model.bin'
+MAGIC = b'HPMART01'
+ALIGNMENT = 64
+FORMAT_VERSION = 1
+
+NODE_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+
+
+class ClassTable:
+    """Stands in for a fitted LabelEncoder: classes_ plus transform and inverse_transform"""
+
+    def __init__(self, classes):
+        self.classes_ = classes
+
+    def transform(self, values):
+        # A lookup rather than a binary search, since incremental retrains append classes out of order
+        codes = {value: code for code, value in enumerate(self.classes_.tolist())}
+        try:
+            return np.array([codes[value] for value in values], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f'y contains previously unseen labels: {e}') from None
+
+    def inverse_transform(self, codes):
+        return np.asarray(self.classes_)[np.asarray(codes, dtype=np.intp)]
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_artifact(model_data, path=ARTIFACT_FILE):
+    """Write model data as a memory-mappable artifact, returns False for non-tree models"""
+    engine = model_data.get('engine') or compile_model(model_data['model'])
+    if engine is None:
+        return False
+
+    arrays = {name: np.ascontiguousarray(getattr(engine, name)) for name in NODE_ARRAYS}
+    for col, le in model_data['label_encoders'].items():
+        arrays[f'classes/{col}'] = np.asarray(le.classes_).astype(str)
+
+    metadata = {
+        'model_name': model_data['model_name'],
+        'r2_score': float(model_data['r2_score']),
+        'version': model_data.get('version'),
+        'feature_columns': list(model_data['feature_columns']),
+        'label_encoders': list(model_data['label_encoders']),
+        'max_depth': engine.max_depth,
+        'n_features': engine.n_features,
+        'candidates': model_data.get('candidates'),
+        'selection': model_data.get('selection'),
+        'training': model_data.get('training'),
+        'search': model_data.get('search'),
+        'compaction': model_data.get('compaction'),
+        'category_combinations': model_data.get('category_combinations')
+    }
+
+    # Lay out the arrays after a header whose size does not depend on the offsets
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    header = {'version': FORMAT_VERSION, 'metadata': metadata, 'arrays': layout}
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    # Write to a temporary file and rename so concurrent readers never see a partial artifact
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return True
+
+
+def read_header(path=ARTIFACT_FILE):
+    """Read and validate the artifact header, returns (header, data_start)"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model artifact")
+        (header_length,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact version: {header.get('version')}")
+    return header, _align(len(MAGIC) + 8 + header_length)
+
+
+def load_artifact(path=ARTIFACT_FILE):
+    """Map an artifact into memory and rebuild the model data dictionary"""
+    header, data_start = read_header(path)
+    metadata = header['metadata']
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        shape = tuple(spec['shape'])
+        if np.prod(shape) == 0:
+            arrays[name] = np.empty(shape, dtype=spec['dtype'])
+        else:
+            arrays[name] = np.memmap(path, dtype=spec['dtype'], mode='r',
+                                     offset=data_start + spec['offset'], shape=shape)
+
+    engine = CompiledForest(
+        max_depth=metadata['max_depth'],
+        n_features=metadata['n_features'],
+        **{name: arrays[name] for name in NODE_ARRAYS}
+    )
+
+    # No LabelEncoder, so serving from the artifact never imports sklearn
+    label_encoders = {col: ClassTable(arrays[f'classes/{col}']) for col in metadata['label_encoders']}
+
+    return {
+        'model': engine,
+        'engine': engine,
+        'label_encoders': label_encoders,
+        'feature_columns': metadata['feature_columns'],
+        'model_name': metadata['model_name'],
+        'r2_score': metadata['r2_score'],
+        'version': metadata.get('version'),
+        'candidates': metadata.get('candidates'),
+        'selection': metadata.get('selection'),
+        'training': metadata.get('training'),
+        'search': metadata.get('search'),
+        'compaction': metadata.get('compaction'),
+        'category_combinations': metadata.get('category_combinations'),
+        'artifact': path
+    }
+
+
+def is_artifact_current(path=ARTIFACT_FILE, pickle_file='house_price_model.pkl'):
+    """Check the artifact exists and is not older than the pickle it was built from"""
+    if not os.path.exists(path):
+        return False
+    if os.path.exists(pickle_file):
+        return os.path.getmtime(path) >= os.path.getmtime(pickle_file)
+    return True
+
+
+if __name__ == "__main__":
+    import pickle
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 'house_price_model.pkl'
+    target = sys.argv[2] if len(sys.argv) > 2 else ARTIFACT_FILE
+
+    with open(source, 'rb') as f:
+        data = pickle.load(f)
+
+    if save_artifact(data, target):
+        print(f"Artifact written to {target}: {os.path.getsize(target) / (1024*1024):.1f}MB")
+    else:
+        print(f"Model {data['model_name']} is not a tree model, no artifact written")
@@ -0,0 +1,525 @@
+"""
+Out-of-core training for datasets larger than memory.
+
+The CSV is never loaded whole. A first pass streams it in chunks to collect
+the category vocabularies, row counts and category combinations. A second
+pass encodes every chunk with those vocabularies and spills it to disk-backed
+arrays, routing each row to the training or holdout file by a hash of its
+position in the CSV. Candidates then train from the memory-mapped arrays in
+fixed-size row blocks, and are scored on the holdout file block by block
+with running sums, so peak memory depends on the chunk and block sizes and
+the vocabularies, not on the number of rows.
+
+Two candidates are trained this way:
+
+- SGDLinear: a linear model fitted by SGDRegressor.partial_fit over a few
+  shuffled epochs of blocks, on features and a target standardized from a
+  row sample; the scaling is folded back into its coefficients afterwards.
+- BinnedBoosting: least-squares gradient boosting of depth-limited trees,
+  grown level by level from gradient histograms over a uint8 matrix of
+  feature bins. Its trees compile to the same CompiledForest node arrays as
+  a random forest, so it is served by the compiled engine, saved as a
+  memory-mapped artifact and can back the lookup index.
+
+Callers may pass in-memory candidates as well. They are fitted on a bounded
+sample of the spilled training rows and scored on the same holdout file, so
+the winner is chosen across both groups.
+"""
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from tree_engine import CompiledForest
+
+TARGET_COLUMN = 'price'
+# CSV rows parsed per chunk, and spilled rows processed per block while training and scoring
+CHUNK_ROWS = 100000
+BLOCK_ROWS = 65536
+# Rows sampled from the training file for bin edges, feature scaling and serving measurements
+SAMPLE_ROWS = 100000
+MEASURE_ROWS = 1000
+# Training rows the in-memory candidates are fitted on
+SAMPLED_FIT_ROWS = 100000
+MAX_BINS = 256
+
+
+def iter_csv_chunks(csv_path, feature_columns, categorical_columns, chunk_rows=CHUNK_ROWS):
+    """Yield (features, target, CSV row positions) for the complete rows of every chunk"""
+    # Categories are read as strings and encoded later against the vocabulary of the whole file
+    dtypes = {col: (str if col in categorical_columns else 'float64') for col in feature_columns}
+    dtypes[TARGET_COLUMN] = 'float64'
+
+    start = 0
+    for chunk in pd.read_csv(csv_path, usecols=list(dtypes), dtype=dtypes, chunksize=chunk_rows):
+        positions = np.arange(start, start + len(chunk), dtype=np.uint64)
+        start += len(chunk)
+        complete = chunk.notna().all(axis=1).to_numpy()
+        chunk = chunk[complete]
+        yield chunk[feature_columns], chunk[TARGET_COLUMN].to_numpy(), positions[complete]
+
+
+def holdout_mask(positions, test_size, seed=42):
+    """Pick holdout rows by a hash of their CSV position, independent of chunk size and row order"""
+    # SplitMix64 finalizer; array arithmetic in uint64 wraps as intended
+    z = positions + np.uint64(seed * 0x9E3779B97F4A7C15 % (1 << 64))
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53) < test_size
+
+
+def scan_dataset(csv_path, feature_columns, categorical_columns, chunk_rows=CHUNK_ROWS):
+    """First pass: category vocabularies, complete row count and category combination counts"""
+    vocabularies = {col: set() for col in categorical_columns}
+    combinations = Counter()
+    rows = 0
+    chunks = 0
+    for X, _, _ in iter_csv_chunks(csv_path, feature_columns, categorical_columns, chunk_rows):
+        for col in categorical_columns:
+            vocabularies[col].update(X[col].unique())
+        combinations.update(X.groupby(list(categorical_columns), observed=True).size().to_dict())
+        rows += len(X)
+        chunks += 1
+    classes = {col: np.array(sorted(values), dtype=object) for col, values in vocabularies.items()}
+    return {'classes': classes, 'combinations': combinations, 'rows': rows, 'chunks': chunks}
+
+
+def encode_chunk(X, classes, categorical_columns):
+    """Float32 feature matrix of a chunk, categoricals as codes in the full sorted vocabulary"""
+    X = X.copy()
+    for col in categorical_columns:
+        X[col] = pd.Categorical(X[col], categories=classes[col]).codes
+    # float32 is what the compiled engine and sklearn's trees compare against their thresholds
+    return X.to_numpy(dtype=np.float32)
+
+
+class SpilledDataset:
+    """Encoded training and holdout rows written to disk, reopened as read-only memory maps"""
+
+    def __init__(self, work_dir, n_features):
+        self.work_dir = work_dir
+        self.n_features = n_features
+        self._files = {name: open(self.path(name), 'wb') for name in ['X_train', 'y_train', 'X_test', 'y_test']}
+
+    def path(self, name):
+        return os.path.join(self.work_dir, f'{name}.bin')
+
+    def append(self, X, y, holdout):
+        for suffix, rows in [('train', ~holdout), ('test', holdout)]:
+            self._files[f'X_{suffix}'].write(np.ascontiguousarray(X[rows]).tobytes())
+            self._files[f'y_{suffix}'].write(np.ascontiguousarray(y[rows], dtype=np.float64).tobytes())
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self.X_train, self.y_train = self._open('X_train', np.float32), self._open('y_train', np.float64)
+        self.X_test, self.y_test = self._open('X_test', np.float32), self._open('y_test', np.float64)
+
+    def _open(self, name, dtype):
+        size = os.path.getsize(self.path(name))
+        if size == 0:
+            return np.empty((0, self.n_features) if name.startswith('X') else 0, dtype=dtype)
+        array = np.memmap(self.path(name), dtype=dtype, mode='r')
+        return array.reshape(-1, self.n_features) if name.startswith('X') else array
+
+
+def spill_dataset(csv_path, feature_columns, categorical_columns, classes, work_dir, chunk_rows=CHUNK_ROWS,
+                  test_size=0.2, seed=42):
+    """Second pass: encode every chunk and append it to the training or holdout file"""
+    spilled = SpilledDataset(work_dir, len(feature_columns))
+    try:
+        for X, y, positions in iter_csv_chunks(csv_path, feature_columns, categorical_columns, chunk_rows):
+            spilled.append(encode_chunk(X, classes, categorical_columns), y, holdout_mask(positions, test_size, seed))
+    finally:
+        spilled.close()
+    return spilled
+
+
+def iter_blocks(n_rows, block_rows=BLOCK_ROWS):
+    for start in range(0, n_rows, block_rows):
+        yield start, min(start + block_rows, n_rows)
+
+
+def sample_rows(X, y, n_rows, seed=42):
+    """Rows drawn at random, with replacement, from memory-mapped arrays"""
+    if len(y) == 0:
+        return X[:0], y[:0]
+    index = np.sort(np.random.RandomState(seed).randint(0, len(y), min(n_rows, len(y))))
+    return np.asarray(X[index]), np.asarray(y[index])
+
+
+def fit_rows(X, y, n_rows, seed=42):
+    """Every row when there are at most n_rows, else a sample of n_rows, in memory"""
+    if len(y) <= n_rows:
+        return np.asarray(X), np.asarray(y)
+    return sample_rows(X, y, n_rows, seed)
+
+
+def bin_edges(sample, max_bins=MAX_BINS):
+    """Per-feature split candidates: midpoints of the distinct values, or sample quantiles when there are more"""
+    edges = []
+    for column in np.asarray(sample, dtype=np.float64).T:
+        values = np.unique(column)
+        if len(values) <= max_bins:
+            edges.append((values[:-1] + values[1:]) / 2)
+        else:
+            quantiles = np.quantile(column, np.linspace(0, 1, max_bins + 1)[1:-1], method='lower')
+            edges.append(np.unique(quantiles))
+    return edges
+
+
+def bin_features(X, edges):
+    """uint8 bin of every value; bin b holds the values above edge b-1 and at most edge b"""
+    X = np.asarray(X, dtype=np.float64)
+    bins = np.empty(X.shape, dtype=np.uint8)
+    for f, feature_edges in enumerate(edges):
+        bins[:, f] = np.searchsorted(feature_edges, X[:, f], side='left')
+    return bins
+
+
+def bin_dataset(X, edges, path, block_rows=BLOCK_ROWS):
+    """Write the bins of a memory-mapped feature matrix to a memory-mapped uint8 matrix, block by block"""
+    bins = np.memmap(path, dtype=np.uint8, mode='w+', shape=X.shape) if len(X) else np.empty(X.shape, np.uint8)
+    for start, stop in iter_blocks(len(X), block_rows):
+        bins[start:stop] = bin_features(X[start:stop], edges)
+    return bins
+
+
+class StreamingMetrics:
+    """R2, MAE and RMSE accumulated over batches of targets and predictions"""
+
+    def __init__(self):
+        self.n = 0
+        self.shift = None
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.squared_error = 0.0
+        self.absolute_error = 0.0
+
+    def update(self, y, predictions):
+        if len(y) == 0:
+            return
+        y = np.asarray(y, dtype=np.float64)
+        errors = y - predictions
+        # Sums of squares around an early target mean keep the variance free of cancellation
+        if self.shift is None:
+            self.shift = float(y.mean())
+        self.n += len(y)
+        self.sum += float((y - self.shift).sum())
+        self.sum_squares += float(np.square(y - self.shift).sum())
+        self.squared_error += float(np.square(errors).sum())
+        self.absolute_error += float(np.abs(errors).sum())
+
+    def report(self):
+        if self.n == 0:
+            return {'r2': float('nan'), 'mae': float('nan'), 'rmse': float('nan')}
+        total = self.sum_squares - self.sum ** 2 / self.n
+        return {
+            'r2': 1.0 - self.squared_error / total if total > 0 else float('nan'),
+            'mae': self.absolute_error / self.n,
+            'rmse': float(np.sqrt(self.squared_error / self.n))
+        }
+
+
+class BinnedBoostingRegressor:
+    """Least-squares gradient boosting of depth-limited trees grown on histograms of uint8 feature bins"""
+
+    def __init__(self, n_trees=100, learning_rate=0.1, max_depth=6, min_samples_leaf=20, l2=1.0,
+                 block_rows=BLOCK_ROWS):
+        self.n_trees = n_trees
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.min_samples_leaf = max(int(min_samples_leaf), 1)
+        self.l2 = l2
+        self.block_rows = block_rows
+        self.forest_ = None
+
+    def fit_binned(self, bins, y, edges, work_dir, progress=None):
+        """Boost on a (memory-mapped) bin matrix, keeping per-row predictions and nodes in files under work_dir"""
+        n_rows, n_features = bins.shape
+        if n_rows == 0:
+            raise ValueError('No training rows to boost on')
+        self.base_ = float(sum(float(np.sum(y[start:stop], dtype=np.float64))
+                               for start, stop in iter_blocks(n_rows, self.block_rows)) / n_rows)
+        predictions = np.memmap(os.path.join(work_dir, 'predictions.bin'), dtype=np.float64, mode='w+',
+                                shape=n_rows)
+        nodes = np.memmap(os.path.join(work_dir, 'nodes.bin'), dtype=np.int32, mode='w+', shape=n_rows)
+        predictions[:] = self.base_
+
+        trees = []
+        for t in range(self.n_trees):
+            if progress and t % 10 == 0:
+                progress(f'Boosting tree {t + 1} of {self.n_trees}')
+            trees.append(self._grow_tree(bins, y, predictions, nodes))
+        self.forest_ = self._compile(trees, edges, n_features)
+        self.n_features_in_ = n_features
+        return self
+
+    def _grow_tree(self, bins, y, predictions, nodes):
+        """One tree in breadth-first node arrays; leaves point at themselves and hold their shrunken value"""
+        tree = {'feature': [0], 'bin': [0], 'left': [0], 'right': [0], 'gradient': [0.0], 'rows': [0]}
+        level = [0]
+        for depth in range(self.max_depth):
+            gradients, counts = self._route_and_histogram(tree, level, depth, bins, y, predictions, nodes)
+            if depth == 0:
+                tree['gradient'][0], tree['rows'][0] = float(gradients[0, 0].sum()), int(counts[0, 0].sum())
+            level = self._split_level(tree, level, gradients, counts)
+            if not level:
+                break
+
+        # The last pass moves rows into the newest leaves and adds the tree to their predictions
+        rows = np.asarray(tree['rows'], dtype=np.float64)
+        tree['value'] = self.learning_rate * np.asarray(tree['gradient']) / (rows + self.l2)
+        for start, stop in iter_blocks(len(y), self.block_rows):
+            predictions[start:stop] += tree['value'][self._route(tree, bins, nodes, start, stop)]
+        return tree
+
+    def _route(self, tree, bins, nodes, start, stop):
+        """Move the rows of a block one level down the tree as it stands"""
+        feature, split = np.asarray(tree['feature']), np.asarray(tree['bin'])
+        left, right = np.asarray(tree['left']), np.asarray(tree['right'])
+        ids = nodes[start:stop]
+        block = bins[start:stop]
+        go_left = block[np.arange(stop - start), feature[ids]] <= split[ids]
+        ids = np.where(go_left, left[ids], right[ids]).astype(np.int32)
+        nodes[start:stop] = ids
+        return ids
+
+    def _route_and_histogram(self, tree, level, depth, bins, y, predictions, nodes):
+        """One pass: route every row to its node on this level, and sum residuals and rows per node, feature and bin"""
+        n_features = bins.shape[1]
+        slot = np.full(len(tree['feature']), -1, dtype=np.int64)
+        slot[level] = np.arange(len(level))
+        size = len(level) * n_features * MAX_BINS
+        gradients = np.zeros(size)
+        counts = np.zeros(size)
+        offsets = np.arange(n_features, dtype=np.int64) * MAX_BINS
+
+        for start, stop in iter_blocks(len(y), self.block_rows):
+            if depth == 0:
+                nodes[start:stop] = 0
+                ids = nodes[start:stop]
+            else:
+                ids = self._route(tree, bins, nodes, start, stop)
+            slots = slot[ids]
+            active = slots >= 0
+            if not active.any():
+                continue
+            residuals = (y[start:stop] - predictions[start:stop])[active]
+            index = (slots[active, None] * n_features * MAX_BINS + offsets + bins[start:stop][active]).ravel()
+            gradients += np.bincount(index, weights=np.repeat(residuals, n_features), minlength=size)
+            counts += np.bincount(index, minlength=size)
+
+        shape = (len(level), n_features, MAX_BINS)
+        return gradients.reshape(shape), counts.reshape(shape)
+
+    def _split_level(self, tree, level, gradients, counts):
+        """Give every node of the level its best split, returns the children that may split further"""
+        left_gradient = np.cumsum(gradients, axis=2)[:, :, :-1]
+        left_rows = np.cumsum(counts, axis=2)[:, :, :-1]
+        children = []
+        for i, node in enumerate(level):
+            total_gradient, total_rows = tree['gradient'][node], tree['rows'][node]
+            right_gradient = total_gradient - left_gradient[i]
+            right_rows = total_rows - left_rows[i]
+            gain = (np.square(left_gradient[i]) / (left_rows[i] + self.l2)
+                    + np.square(right_gradient) / (right_rows + self.l2)
+                    - total_gradient ** 2 / (total_rows + self.l2))
+            gain[(left_rows[i] < self.min_samples_leaf) | (right_rows < self.min_samples_leaf)] = -np.inf
+            feature, split = np.unravel_index(np.argmax(gain), gain.shape)
+            if not gain[feature, split] > 0:
+                continue
+
+            ids = [len(tree['feature']), len(tree['feature']) + 1]
+            tree['feature'][node], tree['bin'][node] = int(feature), int(split)
+            tree['left'][node], tree['right'][node] = ids
+            for child, g, n in zip(ids, [left_gradient[i, feature, split], right_gradient[feature, split]],
+                                   [left_rows[i, feature, split], right_rows[feature, split]]):
+                for key, value in [('feature', 0), ('bin', 0), ('left', child), ('right', child),
+                                   ('gradient', float(g)), ('rows', int(n))]:
+                    tree[key].append(value)
+            children.extend(ids)
+        return children
+
+    def _compile(self, trees, edges, n_features):
+        """Node arrays whose per-tree average equals base + the sum of the shrunken leaf values"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for tree in trees:
+            feature, split = np.asarray(tree['feature']), np.asarray(tree['bin'])
+            left, right = np.asarray(tree['left']), np.asarray(tree['right'])
+            is_leaf = left == np.arange(len(left))
+            threshold = np.array([edges[f][b] if not leaf else 0.0 for f, b, leaf in zip(feature, split, is_leaf)])
+
+            features.append(feature.astype(np.int32))
+            thresholds.append(threshold)
+            lefts.append((left + offset).astype(np.int32))
+            rights.append((right + offset).astype(np.int32))
+            values.append(np.where(is_leaf, self.base_ + len(trees) * tree['value'], 0.0))
+            roots.append(offset)
+            offset += len(left)
+            max_depth = max(max_depth, _depth(left, right))
+
+        return CompiledForest(
+            feature=np.concatenate(features), threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts), right=np.concatenate(rights), value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32), max_depth=max_depth, n_features=n_features
+        )
+
+    def to_forest(self, dtype=np.float64):
+        """The fitted trees as compiled engine node arrays"""
+        forest = self.forest_
+        if dtype == forest.dtype:
+            return forest
+        return CompiledForest(forest.feature, forest.threshold.astype(dtype), forest.left, forest.right,
+                              forest.value.astype(dtype), forest.roots, forest.max_depth, forest.n_features)
+
+    def predict(self, X):
+        return self.forest_.predict(np.asarray(X, dtype=np.float32))
+
+
+def _depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    # Children always follow their parent in breadth-first order
+    for node in range(len(left)):
+        if left[node] != node:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def fit_sgd_linear(X, y, sample_X, sample_y, feature_columns, epochs=5, block_rows=BLOCK_ROWS, seed=42):
+    """SGDRegressor trained with partial_fit over shuffled blocks, returned with coefficients on raw features"""
+    from sklearn.linear_model import SGDRegressor
+
+    mean, scale = sample_X.mean(axis=0, dtype=np.float64), sample_X.std(axis=0, dtype=np.float64)
+    scale[scale == 0] = 1.0
+    y_mean, y_scale = float(sample_y.mean()), float(sample_y.std()) or 1.0
+
+    model = SGDRegressor(penalty='l2', alpha=1e-4, learning_rate='invscaling', eta0=0.01, random_state=seed)
+    rng = np.random.RandomState(seed)
+    blocks = list(iter_blocks(len(y), block_rows))
+    for _ in range(epochs):
+        for i in rng.permutation(len(blocks)):
+            start, stop = blocks[i]
+            order = rng.permutation(stop - start)
+            features = (np.asarray(X[start:stop], dtype=np.float64)[order] - mean) / scale
+            model.partial_fit(pd.DataFrame(features, columns=feature_columns),
+                              (np.asarray(y[start:stop])[order] - y_mean) / y_scale)
+
+    # Fold the standardization into the model, so it predicts prices from raw encoded features
+    coef = model.coef_ * y_scale / scale
+    model.intercept_ = np.array([y_mean + y_scale * (model.intercept_[0] - float(np.sum(model.coef_ * mean / scale)))])
+    model.coef_ = coef
+    return model
+
+
+def evaluate_streaming(model, X, y, block_rows=BLOCK_ROWS, feature_columns=None):
+    """Holdout metrics and predict time of a fitted model, scored block by block"""
+    metrics = StreamingMetrics()
+    predict_seconds = 0.0
+    for start, stop in iter_blocks(len(y), block_rows):
+        block = np.asarray(X[start:stop])
+        if feature_columns is not None:
+            block = pd.DataFrame(block, columns=feature_columns)
+        started = time.perf_counter()
+        predictions = model.predict(block)
+        predict_seconds += time.perf_counter() - started
+        metrics.update(y[start:stop], predictions)
+    return dict(metrics.report(), predict_seconds=predict_seconds)
+
+
+def top_combinations(counts, categorical_columns, limit=100):
+    """Most common category combinations as raw values with their row counts, like frequent_combinations"""
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [{'values': [str(value) for value in (key if isinstance(key, tuple) else (key,))], 'rows': int(rows)}
+            for key, rows in ranked]
+
+
+def train_out_of_core(csv_path, feature_columns, categorical_columns, work_dir='.', chunk_rows=CHUNK_ROWS,
+                      block_rows=BLOCK_ROWS, test_size=0.2, boosting=None, epochs=5, seed=42, progress=None,
+                      sampled_models=None):
+    """Train the out-of-core candidates from a CSV, returns ({name: (model, report)}, details of the run)
+
+    sampled_models are unfitted in-memory candidates, fitted on at most SAMPLED_FIT_ROWS training rows.
+    """
+    progress = progress or (lambda message: None)
+    started = time.perf_counter()
+    feature_columns = list(feature_columns)
+    workspace = tempfile.mkdtemp(prefix='.out_of_core_', dir=work_dir)
+    try:
+        progress('Scanning the dataset for category vocabularies')
+        scan = scan_dataset(csv_path, feature_columns, categorical_columns, chunk_rows)
+        scan_seconds = time.perf_counter() - started
+
+        progress(f"Encoding {scan['rows']} rows to disk in {scan['chunks']} chunks")
+        data = spill_dataset(csv_path, feature_columns, categorical_columns, scan['classes'], workspace,
+                             chunk_rows, test_size, seed)
+        if len(data.y_train) == 0 or len(data.y_test) == 0:
+            raise ValueError(f'Too few complete rows in {csv_path} to train and evaluate out of core')
+        sample_X, sample_y = sample_rows(data.X_train, data.y_train, SAMPLE_ROWS, seed)
+        spill_seconds = time.perf_counter() - started - scan_seconds
+
+        results = {}
+        progress('Training SGDLinear')
+        fit_started = time.perf_counter()
+        linear = fit_sgd_linear(data.X_train, data.y_train, sample_X, sample_y, feature_columns, epochs,
+                                block_rows, seed)
+        results['SGDLinear'] = (linear, _report(linear, data, fit_started, block_rows, feature_columns))
+
+        progress('Binning features for BinnedBoosting')
+        fit_started = time.perf_counter()
+        edges = bin_edges(sample_X)
+        bins = bin_dataset(data.X_train, edges, os.path.join(workspace, 'bins.bin'), block_rows)
+        boosted = BinnedBoostingRegressor(block_rows=block_rows, **(boosting or {}))
+        boosted.fit_binned(bins, data.y_train, edges, workspace, progress=progress)
+        results['BinnedBoosting'] = (boosted, _report(boosted, data, fit_started, block_rows))
+
+        fit_X, fit_y = fit_rows(data.X_train, data.y_train, SAMPLED_FIT_ROWS, seed) if sampled_models else (None, None)
+        for name, model in (sampled_models or {}).items():
+            progress(f'Training {name} on {len(fit_y)} sampled rows')
+            fit_started = time.perf_counter()
+            model.fit(pd.DataFrame(fit_X, columns=feature_columns), fit_y)
+            results[name] = (model, _report(model, data, fit_started, block_rows, feature_columns))
+
+        measure_X, measure_y = sample_rows(data.X_test, data.y_test, MEASURE_ROWS, seed)
+        details = {
+            'classes': scan['classes'],
+            'category_combinations': top_combinations(scan['combinations'], categorical_columns),
+            'measure_X': pd.DataFrame(measure_X, columns=feature_columns),
+            'measure_y': pd.Series(measure_y),
+            # What the sampled models were fitted on, and are refitted on to meet serving budgets
+            'fit_X': None if fit_X is None else pd.DataFrame(fit_X, columns=feature_columns),
+            'fit_y': None if fit_y is None else pd.Series(fit_y),
+            'rows': scan['rows'],
+            'report': {
+                'chunks': scan['chunks'],
+                'chunk_rows': chunk_rows,
+                'block_rows': block_rows,
+                'train_rows': len(data.y_train),
+                'holdout_rows': len(data.y_test),
+                'sampled_fit_rows': 0 if fit_y is None else len(fit_y),
+                'spilled_mb': _directory_bytes(workspace) / (1024 * 1024),
+                'bins': [len(e) + 1 for e in edges],
+                'scan_seconds': scan_seconds,
+                'spill_seconds': spill_seconds
+            }
+        }
+        return results, details
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def _directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def _report(model, data, fit_started, block_rows, feature_columns=None):
+    fit_seconds = time.perf_counter() - fit_started
+    report = evaluate_streaming(model, data.X_test, data.y_test, block_rows, feature_columns)
+    return dict(report, status='trained', fit_seconds=fit_seconds)
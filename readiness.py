@@ -0,0 +1,89 @@
+"""
+Startup timing and readiness state.
+
+Imported first by app.py, so IMPORT_STARTED is taken before Flask, pandas and
+the rest of the serving stack load. The model then loads on a background
+thread; Readiness records the stage it is in and how long each step took,
+and flips to ready only after a warm-up prediction succeeds.
+"""
+import os
+import threading
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
+STARTING = 'starting'
+LOADING = 'loading'
+WARMING_UP = 'warming_up'
+READY = 'ready'
+FAILED = 'failed'
+
+
+def process_age():
+    """Seconds since this process started, from /proc on Linux, None elsewhere"""
+    try:
+        with open('/proc/self/stat') as f:
+            # The command name may contain spaces, so count fields after its closing parenthesis
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class Readiness:
+    """Stage, timings and error of the model load that makes a process ready to serve
+
+    The load runs once, but a process whose load failed becomes ready when a retrain replaces the model.
+    """
+
+    def __init__(self, started=IMPORT_STARTED):
+        self.started = started
+        self.stage = STARTING
+        self.error = None
+        self.timings = {}
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def begin(self):
+        """Claim the load, returns False if it was already started in this process or its parent"""
+        with self._lock:
+            if self.stage != STARTING:
+                return False
+            self.stage = LOADING
+            return True
+
+    def enter(self, stage):
+        self.stage = stage
+
+    def mark(self, name, seconds):
+        self.timings[name] = seconds
+
+    def set_ready(self):
+        self.timings['time_to_ready_seconds'] = time.perf_counter() - self.started
+        age = process_age()
+        if age is not None:
+            self.timings['process_to_ready_seconds'] = age
+        self.stage = READY
+        self.error = None
+        self._ready.set()
+        self._done.set()
+
+    def fail(self, error):
+        self.error = str(error)
+        self.stage = FAILED
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Block until the load finished or failed, returns whether the process is ready"""
+        self._done.wait(timeout)
+        return self.ready
+
+    def report(self):
+        return {'stage': self.stage, 'error': self.error, 'timings': dict(self.timings)}
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Production pre-fork server.
+
+The master process imports app.py and forks a first set of workers at once,
+so the port answers /health, and /ready with 503, while the master loads the
+model. It then moves every object it holds into the permanent GC generation
+with gc.freeze() and forks the workers that serve it, retiring the first set.
+The workers share the model's pages copy-on-write, and since the collector
+never touches frozen objects, their refcount-free pages stay shared instead
+of being copied into N private forests.
+
+Every worker accepts connections from the same listening socket. A worker
+exits after serving its request limit and the master forks a fresh one.
+SIGHUP makes the master load the model from disk, fork a new generation of
+workers and let the old ones finish their current request before exiting.
+SIGTERM or SIGINT stop the server gracefully.
+
+Workers write their metrics to a shared directory at most every
+METRICS_FLUSH_INTERVAL seconds and when they exit, so /metrics on any worker
+reports the whole server; the master folds in the metrics of exited workers.
+
+Workers only queue /retrain jobs in the shared job file. The master runs each
+one in a training process forked for it and, once the job completed, reloads
+as on SIGHUP, so retraining never holds up or outlives a worker.
+
+    python serve.py --workers 4 --port 5000
+"""
+import argparse
+import gc
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+# How often workers check whether they were asked to stop, and the master checks its workers
+POLL_INTERVAL = 0.5
+
+DEFAULT_WORKERS = int(os.environ.get('SERVE_WORKERS', os.cpu_count() or 1))
+DEFAULT_MAX_REQUESTS = int(os.environ.get('SERVE_MAX_REQUESTS', 10000))
+DEFAULT_GRACEFUL_TIMEOUT = float(os.environ.get('SERVE_GRACEFUL_TIMEOUT', 30))
+# Longest a worker's requests go unreported to /metrics answered by other workers
+METRICS_FLUSH_INTERVAL = 1.0
+
+
+class WorkerRequestHandler(WSGIRequestHandler):
+    """One request per connection, so a stopping worker never waits on an idle keep-alive client"""
+    protocol_version = 'HTTP/1.0'
+
+
+def log(message):
+    print(f"[serve {os.getpid()}] {message}", flush=True)
+
+
+def create_listener(host, port, backlog=2048):
+    """Bind the listening socket once in the master so every worker accepts from it"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def freeze_heap():
+    """Collect garbage, then exempt everything left from future collections"""
+    gc.collect()
+    gc.freeze()
+
+
+def run_worker(sock, app_module, max_requests, threaded=False):
+    """Serve requests from the shared socket until recycled or told to stop, then exit"""
+    state = {'stopping': False, 'handled': 0}
+
+    def stop(signum, frame):
+        state['stopping'] = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    # Ctrl-C reaches the whole process group; let the master decide how to shut down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Queued jobs are left to the master, which polls the job file
+    app_module.retrain_launcher = lambda job: None
+
+    def counted(environ, start_response):
+        state['handled'] += 1
+        return app_module.app(environ, start_response)
+
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, counted, threaded=threaded, request_handler=WorkerRequestHandler,
+                         fd=sock.fileno())
+    # Workers race to accept; the losers must return to the loop instead of blocking in accept()
+    server.socket.setblocking(False)
+    server.timeout = POLL_INTERVAL
+
+    store = app_module.metrics_store
+    flushed = {'handled': 0, 'at': time.monotonic()}
+
+    def flush_metrics(force=False):
+        if store is None or state['handled'] == flushed['handled']:
+            return
+        if force or time.monotonic() - flushed['at'] >= METRICS_FLUSH_INTERVAL:
+            store.write(app_module.metrics_registry)
+            flushed.update(handled=state['handled'], at=time.monotonic())
+
+    while not state['stopping'] and (not max_requests or state['handled'] < max_requests):
+        server.handle_request()
+        flush_metrics()
+
+    server.server_close()
+    flush_metrics(force=True)
+    return 0
+
+
+def run_trainer(sock, app_module, job):
+    """Run one retraining job to the end in a process of its own, then exit"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sock.close()
+    app_module.run_retrain_job(job)
+    return 0 if job['status'] == 'completed' else 1
+
+
+class Master:
+    """Forks and supervises the workers and training processes, reloading the workers onto a new model"""
+
+    def __init__(self, sock, workers, max_requests=DEFAULT_MAX_REQUESTS, max_requests_jitter=None,
+                 graceful_timeout=DEFAULT_GRACEFUL_TIMEOUT, threaded=False):
+        self.sock = sock
+        self.threaded = threaded
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests // 10 if max_requests_jitter is None else max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.generation = 0
+        self.children = {}
+        # (pid, job id) of the process running a retraining job
+        self.trainer = None
+        self.reload_requested = False
+        self.stop_requested = False
+        self.app = None
+        self.metrics_dir = None
+
+    def preload(self):
+        """Import the application without loading the model"""
+        import app
+        from metrics import MultiprocessStore
+        self.app = app
+        self.metrics_dir = tempfile.mkdtemp(prefix='house_price_metrics_')
+        app.metrics_store = MultiprocessStore(self.metrics_dir)
+        # Claimed before forking, so workers report not ready instead of loading a private copy
+        app.startup.begin()
+
+    def load(self):
+        """Load and warm up the model, then replace the workers with ones forked from the loaded heap"""
+        # Loaded on this thread rather than in the background so no worker is forked mid-load;
+        # workers that exit meanwhile are replaced once it is done
+        self.app.load_and_warm_up()
+        if self.app.model_data is None:
+            # Workers forked now report the failure and still accept /retrain, which can repair the model
+            log(f"Model failed to load, serving 503 until a retrain succeeds: {self.app.startup.error}")
+            self.rollover()
+            return False
+
+        freeze_heap()
+        timings = self.app.startup.timings
+        log(f"Loaded {self.app.model_data['model_name']} (version {self.app.model_data['version']}), "
+            f"ready {timings['time_to_ready_seconds']:.2f}s after import")
+        self.rollover()
+        return True
+
+    def spawn(self):
+        # Spread recycling out so the workers do not all restart at once
+        limit = self.max_requests
+        if limit and self.max_requests_jitter:
+            limit += random.randint(0, self.max_requests_jitter)
+
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = run_worker(self.sock, self.app, limit, threaded=self.threaded)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        self.children[pid] = self.generation
+        return pid
+
+    def start_trainer(self):
+        """Fork a training process for the oldest queued retraining job, unless one is running"""
+        if self.trainer is not None:
+            return
+        job = next((job for job in self.app.retrain_jobs.jobs() if job['status'] == 'queued'), None)
+        if job is None:
+            return
+
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = run_trainer(self.sock, self.app, job)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        self.trainer = (pid, job['job_id'])
+        log(f"Retraining job {job['job_id']} ({job['mode']}) started in process {pid}")
+
+    def trainer_exited(self, status):
+        pid, job_id = self.trainer
+        self.trainer = None
+        # A trainer that died mid-job left it 'running' without the run lock, which the store reports as failed
+        job = self.app.retrain_jobs.get(job_id) or {'status': 'lost'}
+        log(f"Retraining job {job_id} {job['status']} (process {pid} exited with status "
+            f"{os.waitstatus_to_exitcode(status)})")
+        if job['status'] == 'completed':
+            self.reload_requested = True
+
+    def reap(self):
+        while self.children or self.trainer:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                self.trainer = None
+                return
+            if pid == 0:
+                return
+            if self.trainer and pid == self.trainer[0]:
+                self.trainer_exited(status)
+                continue
+            generation = self.children.pop(pid, None)
+            if generation is not None and self.app.metrics_store:
+                self.app.metrics_store.retire(pid)
+            if generation == self.generation and not self.stop_requested:
+                log(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, replacing it")
+
+    def reload(self):
+        """Load the model from disk and replace every worker with one forked from the new heap"""
+        self.reload_requested = False
+        gc.unfreeze()
+        try:
+            new_model_data = self.app.load_model()
+            self.app.smoke_test_model(new_model_data)
+        except Exception as e:
+            freeze_heap()
+            log(f"Reload failed, workers keep serving the current model: {e}")
+            return
+
+        self.app.model_data = new_model_data
+        self.app.prediction_cache.clear()
+        self.app.publish_model_metrics(new_model_data)
+        if not self.app.startup.ready:
+            self.app.mark_ready()
+        freeze_heap()
+
+        old = self.rollover()
+        log(f"Reloaded {new_model_data['model_name']} (version {new_model_data['version']}), "
+            f"{len(old)} old workers finishing their requests")
+
+    def rollover(self):
+        """Fork a new generation of workers and let the previous one finish its requests, returns the old pids"""
+        old = [pid for pid, generation in self.children.items() if generation == self.generation]
+        self.generation += 1
+        for _ in range(self.workers):
+            self.spawn()
+        self.signal_workers(signal.SIGTERM, old)
+        return old
+
+    def signal_workers(self, signum, pids=None):
+        for pid in list(self.children if pids is None else pids):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def stop(self):
+        """Let workers finish their current request, killing any still running after the timeout"""
+        # A retraining job cannot finish in time; it is reported failed and the served model is untouched
+        if self.trainer:
+            self.signal_workers(signal.SIGTERM, [self.trainer[0]])
+        self.signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while (self.children or self.trainer) and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        self.signal_workers(signal.SIGKILL, list(self.children) + ([self.trainer[0]] if self.trainer else []))
+        self.reap()
+        if self.metrics_dir:
+            shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+    def run(self):
+        self.preload()
+
+        def request_reload(signum, frame):
+            self.reload_requested = True
+
+        def request_stop(signum, frame):
+            self.stop_requested = True
+
+        signal.signal(signal.SIGHUP, request_reload)
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        host, port = self.sock.getsockname()[:2]
+        log(f"Serving on http://{host}:{port} with {self.workers} workers, loading the model")
+        try:
+            for _ in range(self.workers):
+                self.spawn()
+            self.load()
+
+            while not self.stop_requested:
+                self.reap()
+                if self.reload_requested:
+                    self.reload()
+                self.start_trainer()
+                current = sum(1 for generation in self.children.values() if generation == self.generation)
+                for _ in range(self.workers - current):
+                    self.spawn()
+                time.sleep(POLL_INTERVAL)
+        finally:
+            self.stop()
+            log("Stopped")
+        return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='worker processes (default: all cores)')
+    parser.add_argument('--max-requests', type=int, default=DEFAULT_MAX_REQUESTS,
+                        help='requests a worker serves before it is replaced, 0 to never recycle')
+    parser.add_argument('--max-requests-jitter', type=int,
+                        help='random extra requests per worker (default: 10%% of --max-requests)')
+    parser.add_argument('--graceful-timeout', type=float, default=DEFAULT_GRACEFUL_TIMEOUT,
+                        help='seconds workers get to finish on shutdown')
+    parser.add_argument('--threaded', action='store_true', default=os.environ.get('SERVE_THREADED') == '1',
+                        help='handle each request of a worker on its own thread, e.g. for MICRO_BATCHING')
+    args = parser.parse_args(argv)
+
+    sock = create_listener(args.host, args.port)
+    master = Master(sock, args.workers, max_requests=args.max_requests,
+                    max_requests_jitter=args.max_requests_jitter, graceful_timeout=args.graceful_timeout,
+                    threaded=args.threaded)
+    return master.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,61 +2,168 @@
 """
 Script to split large pickle file into smaller parts for GitHub upload
 and reconstruct them when needed.
+
+Files are streamed in fixed-size buffers so memory use does not depend on the
+model size. Parts can optionally be compressed with zlib or lzma, one worker
+thread per part (both libraries release the GIL while compressing).
+model_parts.info records a SHA-256 for every part and for the whole file, and
+reconstruction refuses to produce a file whose checksums do not match.
 """
+import hashlib
+import lzma
 import os
 import pickle
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+MODEL_FILE = 'house_price_model.pkl'
+INFO_FILE = 'model_parts.info'
+
+# Split into 80MB chunks to be safe (GitHub limit is 100MB)
+CHUNK_SIZE = 80 * 1024 * 1024
+BUFFER_SIZE = 1024 * 1024
+
+COMPRESSIONS = ['zlib', 'lzma']
+
+def _compressor(compression):
+    if compression == 'zlib':
+        return zlib.compressobj(6)
+    if compression == 'lzma':
+        return lzma.LZMACompressor()
+    return None
+
+def _decompressor(compression):
+    if compression == 'zlib':
+        return zlib.decompressobj()
+    if compression == 'lzma':
+        return lzma.LZMADecompressor()
+    return None
+
+def part_filename(model_file, index):
+    """Name of the 1-based part file for a model file"""
+    return f'{model_file}.part{index:02d}'
+
+def file_sha256(path):
+    """SHA-256 of a file, read in fixed-size buffers"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for buf in iter(lambda: f.read(BUFFER_SIZE), b''):
+            digest.update(buf)
+    return digest.hexdigest()
+
+def _write_part(model_file, index, start, length, compression):
+    """Stream one byte range of the model file into its part file"""
+    filename = part_filename(model_file, index)
+    compressor = _compressor(compression)
+    part_digest = hashlib.sha256()
+
+    with open(model_file, 'rb') as infile, open(filename, 'wb') as outfile:
+        infile.seek(start)
+        remaining = length
+        while remaining > 0:
+            buf = infile.read(min(BUFFER_SIZE, remaining))
+            if not buf:
+                raise IOError(f"{model_file} changed while splitting")
+            remaining -= len(buf)
+            if compressor is not None:
+                buf = compressor.compress(buf)
+            part_digest.update(buf)
+            outfile.write(buf)
+
+        if compressor is not None:
+            buf = compressor.flush()
+            part_digest.update(buf)
+            outfile.write(buf)
+
+    return {
+        'filename': filename,
+        'offset': start,
+        'original_size': length,
+        'size': os.path.getsize(filename),
+        'sha256': part_digest.hexdigest()
+    }
 
-def split_pickle_file():
+def split_pickle_file(model_file=MODEL_FILE, chunk_size=CHUNK_SIZE, compression=None, workers=None,
+                      info_file=INFO_FILE):
     """Split the large pickle file into parts under 100MB"""
-    model_file = 'house_price_model.pkl'
-
     if not os.path.exists(model_file):
         print(f"Model file {model_file} not found!")
         return
 
-    # Read the original pickle file
-    with open(model_file, 'rb') as f:
-        data = f.read()
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {COMPRESSIONS}")
 
-    # Split into 80MB chunks to be safe (GitHub limit is 100MB)
-    chunk_size = 80 * 1024 * 1024  # 80MB
-    total_size = len(data)
+    total_size = os.path.getsize(model_file)
     num_parts = (total_size + chunk_size - 1) // chunk_size
 
     print(f"Original file size: {total_size / (1024*1024):.1f}MB")
-    print(f"Splitting into {num_parts} parts...")
+    print(f"Splitting into {num_parts} parts{f' with {compression} compression' if compression else ''}...")
 
-    # Create parts
-    for i in range(num_parts):
-        start = i * chunk_size
-        end = min((i + 1) * chunk_size, total_size)
-        chunk = data[start:end]
+    ranges = [(i + 1, i * chunk_size, min(chunk_size, total_size - i * chunk_size)) for i in range(num_parts)]
 
-        part_filename = f'house_price_model.pkl.part{i+1:02d}'
-        with open(part_filename, 'wb') as f:
-            f.write(chunk)
+    # Raw parts are plain copies and gain nothing from threads; compressed parts do
+    workers = workers or (os.cpu_count() if compression else 1)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, num_parts or 1))) as pool:
+        parts = list(pool.map(lambda r: _write_part(model_file, r[0], r[1], r[2], compression), ranges))
 
-        part_size = len(chunk) / (1024*1024)
-        print(f"Created {part_filename}: {part_size:.1f}MB")
+    for part in parts:
+        print(f"Created {part['filename']}: {part['size'] / (1024*1024):.1f}MB")
 
     # Create info file
     info = {
         'original_filename': model_file,
         'total_parts': num_parts,
         'total_size': total_size,
-        'chunk_size': chunk_size
+        'chunk_size': chunk_size,
+        'compression': compression,
+        'sha256': file_sha256(model_file),
+        'parts': parts
     }
 
-    with open('model_parts.info', 'wb') as f:
+    with open(info_file, 'wb') as f:
         pickle.dump(info, f)
 
     print(f"\nSplit complete! Created {num_parts} parts and info file.")
     print("You can now safely delete the original large file.")
 
-def reconstruct_pickle_file():
+def _restore_part(part, output_file, compression):
+    """Verify one part file and stream its decoded bytes to their offset in the output"""
+    filename = part['filename']
+    decompressor = _decompressor(compression)
+    part_digest = hashlib.sha256()
+    written = 0
+
+    with open(filename, 'rb') as infile, open(output_file, 'r+b') as outfile:
+        outfile.seek(part['offset'])
+        for buf in iter(lambda: infile.read(BUFFER_SIZE), b''):
+            part_digest.update(buf)
+            if decompressor is not None:
+                buf = decompressor.decompress(buf)
+            outfile.write(buf)
+            written += len(buf)
+
+    if part.get('sha256') and part_digest.hexdigest() != part['sha256']:
+        raise ValueError(f"Checksum mismatch in {filename}")
+    if decompressor is not None and not decompressor.eof:
+        raise ValueError(f"Truncated compressed data in {filename}")
+    if written != part['original_size']:
+        raise ValueError(f"{filename} decoded to {written} bytes, expected {part['original_size']}")
+    return filename
+
+def _legacy_parts(info):
+    """Describe the parts of an info file written before checksums were recorded"""
+    parts = []
+    for i in range(info['total_parts']):
+        start = i * info['chunk_size']
+        parts.append({
+            'filename': part_filename(info['original_filename'], i + 1),
+            'offset': start,
+            'original_size': min(info['chunk_size'], info['total_size'] - start)
+        })
+    return parts
+
+def reconstruct_pickle_file(info_file=INFO_FILE, workers=None):
     """Reconstruct the original pickle file from parts"""
-    info_file = 'model_parts.info'
-
     if not os.path.exists(info_file):
         print("Info file not found! Cannot reconstruct.")
         return False
@@ -67,35 +174,58 @@ def reconstruct_pickle_file():
 
     original_filename = info['original_filename']
     total_parts = info['total_parts']
+    compression = info.get('compression')
+    parts = info.get('parts') or _legacy_parts(info)
 
     print(f"Reconstructing {original_filename} from {total_parts} parts...")
 
     # Check if all parts exist
-    missing_parts = []
-    for i in range(1, total_parts + 1):
-        part_filename = f'house_price_model.pkl.part{i:02d}'
-        if not os.path.exists(part_filename):
-            missing_parts.append(part_filename)
-
+    missing_parts = [part['filename'] for part in parts if not os.path.exists(part['filename'])]
     if missing_parts:
         print(f"Missing parts: {missing_parts}")
         return False
 
-    # Reconstruct file
-    with open(original_filename, 'wb') as outfile:
-        for i in range(1, total_parts + 1):
-            part_filename = f'house_price_model.pkl.part{i:02d}'
-            with open(part_filename, 'rb') as infile:
-                outfile.write(infile.read())
-            print(f"Added {part_filename}")
+    if 'sha256' not in info:
+        print("Info file has no checksums, parts will not be verified")
+
+    # Build into a temporary file so a failed reconstruction never leaves a corrupt model behind
+    tmp_filename = f'{original_filename}.tmp{os.getpid()}'
+    try:
+        with open(tmp_filename, 'wb') as outfile:
+            outfile.truncate(info['total_size'])
+
+        workers = workers or (os.cpu_count() if compression else 1)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(parts)))) as pool:
+            for filename in pool.map(lambda part: _restore_part(part, tmp_filename, compression), parts):
+                print(f"Added {filename}")
+
+        if os.path.getsize(tmp_filename) != info['total_size']:
+            raise ValueError(f"Reconstructed size {os.path.getsize(tmp_filename)} != {info['total_size']}")
+        if info.get('sha256') and file_sha256(tmp_filename) != info['sha256']:
+            raise ValueError("Checksum mismatch in reconstructed file")
+
+        os.replace(tmp_filename, original_filename)
+    except (IOError, OSError, ValueError, zlib.error, lzma.LZMAError) as e:
+        print(f"Reconstruction failed: {e}")
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        return False
 
     print(f"Reconstruction complete! Created {original_filename}")
     return True
 
 if __name__ == "__main__":
-    import sys
-
-    if len(sys.argv) > 1 and sys.argv[1] == 'reconstruct':
-        reconstruct_pickle_file()
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', nargs='?', default='split', choices=['split', 'reconstruct'])
+    parser.add_argument('--compression', choices=COMPRESSIONS, default=None,
+                        help='compress each part (split only)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of parts processed in parallel')
+    args = parser.parse_args()
+
+    if args.command == 'reconstruct':
+        reconstruct_pickle_file(workers=args.workers)
     else:
-        split_pickle_file()
\ No newline at end of file
+        split_pickle_file(compression=args.compression, workers=args.workers)
@@ -0,0 +1,60 @@
+"""Synthetic rows, a small fitted forest and a scratch training setup shared by the model tests"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from generate_dataset import generate_dataset
+from tree_engine import compile_model
+
+# Columns 0 and 2 are categorical codes, the rest numeric like baths, bedrooms and area
+CATEGORICAL = [0, 2]
+
+def make_rows(rng, n):
+    X = np.column_stack([rng.randint(0, 4, n), rng.randint(1, 8, n), rng.randint(0, 3, n),
+                         rng.randint(1, 8, n), rng.rand(n) * 40])
+    y = X[:, 4] * 1e5 * (1 + X[:, 0]) + X[:, 1] * 3e4 - X[:, 2] * 5e4 + rng.randn(n) * 1e4
+    return X, y
+
+class ForestTestCase(unittest.TestCase):
+    """Fits one forest per test class, and draws test rows from the same generator"""
+    n_rows = 1500
+    n_estimators = 15
+    n_test_rows = 2000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rng = np.random.RandomState(0)
+        X, y = make_rows(cls.rng, cls.n_rows)
+        cls.model = RandomForestRegressor(n_estimators=cls.n_estimators, random_state=0).fit(X, y)
+        cls.engine = compile_model(cls.model)
+        cls.X_test, cls.y_test = make_rows(cls.rng, cls.n_test_rows)
+
+class TrainingTestCase(unittest.TestCase):
+    """Points app's dataset, model and artifact files at a generated dataset in a temporary directory"""
+
+    def extra_patches(self):
+        """Further patches a test class needs while training"""
+        return []
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmpdir.name, 'House_dataset.csv')
+        generate_dataset(self.csv, 3000, seed=1, locations=100)
+        self.model_file = os.path.join(self.tmpdir.name, 'model.pkl')
+        self.artifact_file = os.path.join(self.tmpdir.name, 'model.bin')
+        self.patches = [
+            patch('app.DATASET_FILE', self.csv),
+            patch('app.MODEL_FILE', self.model_file),
+            patch('app.ARTIFACT_FILE', self.artifact_file),
+            patch('app.USE_DATASET_CACHE', False)
+        ] + self.extra_patches()
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmpdir.cleanup()
@@ -2,6 +2,9 @@ import unittest
 import json
 import sys
 import os
+import time
+import subprocess
+import tempfile
 import pandas as pd
 import numpy as np
 from unittest.mock import patch, MagicMock
@@ -10,7 +13,12 @@ from unittest.mock import patch, MagicMock
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import app modules after path modification
-from app import app, load_and_train_model  # noqa: E402
+from app import app, ensure_model_loaded, load_and_train_model  # noqa: E402
+from tests.forest_fixtures import TrainingTestCase  # noqa: E402
+
+def setUpModule():
+    # Importing app no longer loads the model; these tests need it serving
+    ensure_model_loaded()
 
 class TestHousePricePredictionAPI(unittest.TestCase):
 
@@ -26,6 +34,32 @@ class TestHousePricePredictionAPI(unittest.TestCase):
         self.assertIn(b'House Price Predictor', response.data)
         self.assertIn(b'html', response.data)
 
+    def test_home_page_cached_with_etag(self):
+        """Test the home page lists encoder classes, revalidates by ETag and is served gzipped"""
+        import gzip
+        import app as app_module
+
+        response = self.app.get('/')
+        cities = app_module.model_data['label_encoders']['city'].classes_
+        for city in cities:
+            self.assertIn(f'<option value="{city}">'.encode(), response.data)
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        etag = response.headers['ETag']
+
+        revalidated = self.app.get('/', headers={'If-None-Match': etag})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.data, b'')
+
+        compressed = self.app.get('/', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.data), response.data)
+        self.assertNotEqual(compressed.headers['ETag'], etag)
+
+        # A retrained model gets a new version, which rebuilds the cached page
+        with patch.dict(app_module.model_data, {'version': 'retrained'}):
+            self.assertEqual(self.app.get('/', headers={'If-None-Match': etag}).status_code, 304)
+            self.assertEqual(app_module.home_page_cache['page']['version'], 'retrained')
+
     def test_predict_endpoint_with_valid_data(self):
         """Test prediction endpoint with valid data"""
         sample_data = {
@@ -85,21 +119,293 @@ class TestHousePricePredictionAPI(unittest.TestCase):
             self.assertIn('success', data)
             self.assertFalse(data['success'])  # Should indicate failure
 
+    def test_predict_batch_endpoint(self):
+        """Test batch prediction matches single predictions and reports per-record errors"""
+        sample_data = {
+            'property_type': 'House',
+            'location': 'G-10',
+            'city': 'Islamabad',
+            'baths': 3,
+            'purpose': 'For Sale',
+            'bedrooms': 4,
+            'Area_in_Marla': 8.0
+        }
+        unknown_location = dict(sample_data, location='Unknown Town')
+        records = [sample_data, {'property_type': 'House'}, unknown_location, dict(sample_data, baths='abc')]
+
+        response = self.app.post('/predict/batch',
+                               data=json.dumps(records),
+                               content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['predicted'], 2)
+
+        results = data['results']
+        self.assertTrue(results[0]['success'])
+        self.assertFalse(results[1]['success'])
+        self.assertIn('error', results[1])
+        self.assertTrue(results[2]['success'])
+        self.assertFalse(results[3]['success'])
+
+        for record, result in [(sample_data, results[0]), (unknown_location, results[2])]:
+            single = json.loads(self.app.post('/predict',
+                                              data=json.dumps(record),
+                                              content_type='application/json').data)
+            self.assertAlmostEqual(single['predicted_price'], result['predicted_price'], places=2)
+
+    def test_predict_batch_endpoint_invalid_body(self):
+        """Test batch prediction rejects bodies that are not a list of records"""
+        response = self.app.post('/predict/batch',
+                               data=json.dumps({'property_type': 'House'}),
+                               content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(json.loads(response.data)['success'])
+
+    def test_predict_stream_endpoint(self):
+        """Test streamed NDJSON scoring across micro-batches with per-line errors"""
+        sample_data = {
+            'property_type': 'House',
+            'location': 'G-10',
+            'city': 'Islamabad',
+            'baths': 3,
+            'purpose': 'For Sale',
+            'bedrooms': 4,
+            'Area_in_Marla': 8.0
+        }
+        lines = [json.dumps(dict(sample_data, Area_in_Marla=5.0 + i)) for i in range(5)]
+        lines[1] = '{"property_type": "House",'
+        lines.insert(3, '')
+        body = '\n'.join(lines) + '\n'
+
+        with patch('app.STREAM_BATCH_SIZE', 2):
+            response = self.app.post('/predict/stream', data=body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        results = [json.loads(line) for line in response.data.decode().splitlines()]
+
+        summary = results.pop()
+        self.assertTrue(summary['done'])
+        self.assertEqual(summary['count'], 5)
+        self.assertEqual(summary['predicted'], 4)
+
+        self.assertEqual([r['line'] for r in results], [1, 2, 3, 5, 6])
+        self.assertFalse(results[1]['success'])
+        self.assertIn('Invalid JSON', results[1]['error'])
+
+        batch = json.loads(self.app.post('/predict/batch',
+                                         data=json.dumps([json.loads(lines[i]) for i in (0, 2, 4, 5)]),
+                                         content_type='application/json').data)
+        streamed = [r['predicted_price'] for r in results if r['success']]
+        self.assertEqual(streamed, [r['predicted_price'] for r in batch['results']])
+
+    def test_predict_stream_latency_covers_body(self):
+        """Test a streamed request's latency is recorded once its body was scored and sent, not at return"""
+        import app as app_module
+
+        score_records = app_module.score_records
+
+        def slow_score_records(*args, **kwargs):
+            time.sleep(0.2)
+            return score_records(*args, **kwargs)
+
+        body = json.dumps({'property_type': 'House'}) + '\n'
+        _, total_before, count_before = app_module.request_latency.snapshot(('predict_stream',))
+        errors_before = app_module.error_counter.value(('predict_stream',))
+        with patch('app.score_records', slow_score_records):
+            response = self.app.post('/predict/stream', data=body, content_type='application/x-ndjson')
+            self.assertEqual(app_module.request_latency.snapshot(('predict_stream',))[2], count_before)
+            response.get_data()
+            response.close()
+
+        _, total, count = app_module.request_latency.snapshot(('predict_stream',))
+        self.assertEqual(count, count_before + 1)
+        self.assertGreaterEqual(total - total_before, 0.2)
+        self.assertEqual(app_module.error_counter.value(('predict_stream',)), errors_before)
+
     def test_retrain_endpoint(self):
-        """Test the retrain endpoint"""
+        """Test the retrain endpoint starts a background job that can be polled"""
         response = self.app.post('/retrain')
 
-        self.assertEqual(response.status_code, 200)
+        self.assertIn(response.status_code, [202, 409])
         data = json.loads(response.data)
 
         self.assertIn('success', data)
-        if data['success']:
-            self.assertIn('message', data)
-            self.assertIn('model_name', data)
-            self.assertIn('accuracy', data)
-        else:
+        self.assertIn('job_id', data)
+        if response.status_code == 409:
             self.assertIn('error', data)
 
+        # Predictions keep being served while the job runs
+        sample_data = {
+            'property_type': 'House',
+            'location': 'G-10',
+            'city': 'Islamabad',
+            'baths': 3,
+            'purpose': 'For Sale',
+            'bedrooms': 4,
+            'Area_in_Marla': 8.0
+        }
+        response = self.app.post('/predict',
+                               data=json.dumps(sample_data),
+                               content_type='application/json')
+        self.assertTrue(json.loads(response.data)['success'])
+
+        status = self.wait_for_job(data['job_id'])
+        self.assertIn(status['status'], ['completed', 'failed'])
+        self.assertIn('total_seconds', status['timings'])
+        if status['status'] == 'completed':
+            self.assertIn('model_name', status)
+            self.assertIn('accuracy', status)
+            self.assertIn('training_seconds', status['timings'])
+        else:
+            self.assertIn('error', status)
+
+    def test_ready_gates_model_endpoints(self):
+        """Test /ready and the model endpoints answer 503 until a model is serving, /health stays up"""
+        with patch('app.model_data', None):
+            self.assertEqual(self.app.get('/ready').status_code, 503)
+            self.assertEqual(self.app.post('/predict', json={'baths': 3}).status_code, 503)
+            self.assertEqual(self.app.post('/predict/batch', json=[]).status_code, 503)
+            health = self.app.get('/health')
+            self.assertEqual(health.status_code, 200)
+            self.assertFalse(json.loads(health.data)['model_loaded'])
+
+        response = self.app.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        ready = json.loads(response.data)
+        self.assertTrue(ready['ready'])
+        self.assertEqual(ready['stage'], 'ready')
+        for key in ['import_seconds', 'load_seconds', 'warm_up_seconds', 'time_to_ready_seconds']:
+            self.assertGreaterEqual(ready['timings'][key], 0)
+
+        metrics = self.app.get('/metrics').get_data(as_text=True)
+        self.assertIn('house_price_import_seconds ', metrics)
+        self.assertIn('house_price_time_to_ready_seconds ', metrics)
+        self.assertIn('house_price_ready 1', metrics)
+
+    def test_import_skips_training_stack(self):
+        """Test importing the app loads neither sklearn nor the model, and serving from the artifact no sklearn"""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        # Written to stderr, since the loading thread logs to stdout meanwhile
+        script = ("import sys, app; print('sklearn' in sys.modules, app.model_data is None, app.startup.stage, "
+                  "file=sys.stderr); app.ensure_model_loaded(); "
+                  "print(app.model_data.get('artifact') is not None, 'sklearn' in sys.modules, file=sys.stderr)")
+        imported, loaded = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True,
+                                          check=True).stderr.splitlines()
+        self.assertEqual(imported.split(), ['False', 'True', 'starting'])
+        from_artifact, sklearn_loaded = loaded.split()
+        if from_artifact == 'False':
+            self.skipTest('The model was not loaded from the artifact')
+        self.assertEqual(sklearn_loaded, 'False')
+
+    def test_retrain_status_unknown_job(self):
+        """Test polling an unknown retraining job"""
+        response = self.app.get('/retrain/does-not-exist')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(json.loads(response.data)['success'])
+
+    def test_model_search_trace(self):
+        """Test /model/search returns the stored trace and /health only its summary"""
+        import app as app_module
+
+        with patch.dict(app_module.model_data, {'search': {}}):
+            self.assertEqual(self.app.get('/model/search').status_code, 404)
+
+        search = {'DecisionTree': {'best_params': {'max_depth': 8}, 'best_cv_r2': 0.7, 'rounds': [],
+                                   'trace': [{'iteration': 0, 'params': {'max_depth': 8}, 'mean_r2': 0.7}]}}
+        with patch.dict(app_module.model_data, {'search': search}):
+            trace = json.loads(self.app.get('/model/search').data)
+            health = json.loads(self.app.get('/health').data)
+
+        self.assertEqual(trace['search'], search)
+        self.assertEqual(health['search']['DecisionTree']['best_params'], {'max_depth': 8})
+        self.assertNotIn('trace', health['search']['DecisionTree'])
+
+        response = self.app.post('/retrain?mode=grid')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("'search'", json.loads(response.data)['error'])
+
+    def wait_for_job(self, job_id, timeout=600):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            status = json.loads(self.app.get(f'/retrain/{job_id}').data)
+            if status['status'] in ('completed', 'failed'):
+                return status
+            time.sleep(0.2)
+        self.fail(f"Retraining job {job_id} did not finish within {timeout}s")
+
+class TestRetrainPublish(TrainingTestCase):
+    """Test a retrained model only replaces the served files once it passed its smoke prediction"""
+
+    def extra_patches(self):
+        import app as app_module
+        from job_store import JobStore
+
+        return [
+            patch('app.retrain_jobs', JobStore(os.path.join(self.tmpdir.name, 'retrain_jobs.json'))),
+            # The job swaps the served model; restore the one the other tests use
+            patch('app.model_data', app_module.model_data)
+        ]
+
+    def setUp(self):
+        import app as app_module
+
+        self.app_module = app_module
+        super().setUp()
+        self.served = app_module.load_and_train_model()
+
+    def run_job(self):
+        job = {'job_id': 'test', 'mode': 'full', 'status': 'queued', 'timings': {}}
+        self.app_module.run_retrain_job(job)
+        return job
+
+    def test_failed_smoke_test_keeps_served_files(self):
+        """Test the model on disk is unchanged and nothing is left staged when the smoke prediction fails"""
+        with patch('app.smoke_test_model', side_effect=ValueError('Smoke prediction returned nan')):
+            job = self.run_job()
+
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(self.app_module.retrain_jobs.get('test')['status'], 'failed')
+        self.assertEqual(self.app_module.load_model()['version'], self.served['version'])
+        self.assertEqual([name for name in os.listdir(self.tmpdir.name) if '.staged' in name or '.tmp' in name], [])
+
+    def test_retrain_recovers_failed_startup(self):
+        """Test /retrain still runs after the startup load failed, and its model makes the process ready"""
+        from readiness import Readiness
+
+        startup = Readiness()
+        startup.begin()
+        startup.fail(ValueError('Model file is corrupt'))
+        with patch('app.startup', startup), patch('app.model_data', None), \
+                patch('app.retrain_launcher', self.app_module.run_retrain_job):
+            client = self.app_module.app.test_client()
+            self.assertEqual(client.get('/ready').status_code, 503)
+            self.assertEqual(client.post('/retrain').status_code, 202)
+
+            self.assertTrue(startup.ready)
+            self.assertIsNone(startup.error)
+            self.assertEqual(client.get('/ready').status_code, 200)
+            sample = {'property_type': 'House', 'location': 'G-10', 'city': 'Islamabad', 'baths': 3,
+                      'purpose': 'For Sale', 'bedrooms': 4, 'Area_in_Marla': 8.0}
+            self.assertEqual(client.post('/predict', json=sample).status_code, 200)
+
+    def test_completed_job_publishes_model(self):
+        """Test a completed job leaves the new model in the served files, loadable from the artifact"""
+        job = self.run_job()
+
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(self.app_module.retrain_jobs.get('test')['stage'], 'completed')
+        loaded = self.app_module.load_model()
+        self.assertEqual(loaded['version'], self.app_module.model_data['version'])
+        self.assertNotEqual(loaded['version'], self.served['version'])
+        if loaded.get('artifact'):
+            self.assertEqual(self.app_module.model_data['artifact'], self.artifact_file)
+        self.assertEqual([name for name in os.listdir(self.tmpdir.name) if '.staged' in name or '.tmp' in name], [])
+
 class TestModelFunctions(unittest.TestCase):
     """Test the core model functionality"""
 
@@ -227,6 +533,60 @@ class TestAPIEndpoints(unittest.TestCase):
         response = self.app.get('/')
         self.assertIn(response.status_code, [200, 404])  # 404 is also acceptable if no health endpoint
 
+    def test_prediction_cache_hits(self):
+        """Test repeated predictions are served from the cache with identical results"""
+        from app import prediction_cache
+
+        sample_data = {
+            'property_type': 'Flat',
+            'location': 'G-10',
+            'city': 'Lahore',
+            'baths': 2,
+            'purpose': 'For Sale',
+            'bedrooms': 2,
+            'Area_in_Marla': 5.5
+        }
+        prediction_cache.clear()
+        hits_before = prediction_cache.stats()['hits']
+
+        responses = [json.loads(self.app.post('/predict',
+                                              data=json.dumps(sample_data),
+                                              content_type='application/json').data) for _ in range(2)]
+
+        self.assertEqual(responses[0]['predicted_price'], responses[1]['predicted_price'])
+        self.assertEqual(prediction_cache.stats()['hits'], hits_before + 1)
+
+        health = json.loads(self.app.get('/health').data)
+        self.assertIn('hits', health['prediction_cache'])
+        self.assertIn('evictions', health['prediction_cache'])
+
+    def test_metrics_endpoint(self):
+        """Test /metrics exposes per-stage latency, counters and model info in Prometheus format"""
+        sample_data = {
+            'property_type': 'House',
+            'location': 'G-10',
+            'city': 'Islamabad',
+            'baths': 3,
+            'purpose': 'For Sale',
+            'bedrooms': 4,
+            'Area_in_Marla': 8.0
+        }
+        self.app.post('/predict', data=json.dumps(sample_data), content_type='application/json')
+        self.app.post('/predict', data='invalid json', content_type='application/json')
+
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+
+        body = response.data.decode('utf-8')
+        for stage in ['parse', 'frame', 'encode', 'predict', 'serialize']:
+            self.assertIn(f'house_price_stage_seconds_bucket{{endpoint="predict",stage="{stage}",le="+Inf"}}', body)
+        self.assertIn('house_price_requests_total{endpoint="predict"}', body)
+        self.assertIn('house_price_request_errors_total{endpoint="predict"}', body)
+        self.assertIn('house_price_model_info{model_name=', body)
+        self.assertIn('house_price_model_load_seconds', body)
+        self.assertIn('house_price_prediction_cache_hits_total', body)
+
     def test_prediction_validation(self):
         """Test input validation for predictions"""
         # Test with invalid property type
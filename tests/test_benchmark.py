@@ -0,0 +1,38 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the benchmark suite
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import compare, percentile_ms  # noqa: E402
+
+class TestBenchmarkComparison(unittest.TestCase):
+    """Test the baseline comparison of benchmark results"""
+
+    def test_latency_regression_detected(self):
+        """Test a slower duration beyond the threshold is a regression"""
+        rows, regressions = compare({'predict.single.p99_ms': 12.0}, {'predict.single.p99_ms': 10.0}, 0.10)
+        self.assertEqual(regressions, ['predict.single.p99_ms'])
+        self.assertAlmostEqual(rows[0][3], 0.2)
+
+    def test_throughput_direction(self):
+        """Test lower throughput is a regression and higher throughput is not"""
+        baseline = {'predict.batch.100.rows_per_second': 1000.0}
+        self.assertEqual(compare({'predict.batch.100.rows_per_second': 800.0}, baseline, 0.10)[1],
+                         ['predict.batch.100.rows_per_second'])
+        self.assertEqual(compare({'predict.batch.100.rows_per_second': 2000.0}, baseline, 0.10)[1], [])
+
+    def test_within_threshold_and_missing_metrics(self):
+        """Test small changes pass and metrics missing from either side are ignored"""
+        rows, regressions = compare({'load.artifact.load_model_seconds': 1.05, 'new_metric': 1.0},
+                                    {'load.artifact.load_model_seconds': 1.0, 'old_metric': 1.0}, 0.10)
+        self.assertEqual(regressions, [])
+        self.assertEqual([row[0] for row in rows], ['load.artifact.load_model_seconds'])
+
+    def test_percentile_ms(self):
+        """Test percentiles are reported in milliseconds"""
+        self.assertAlmostEqual(percentile_ms([0.001, 0.002, 0.003], 50), 2.0)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,75 @@
+import unittest
+import json
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import the bulk scoring CLI
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, ensure_model_loaded  # noqa: E402
+from bulk_score import load_model_data, main, score_file  # noqa: E402
+
+def setUpModule():
+    ensure_model_loaded()
+
+class TestBulkScore(unittest.TestCase):
+    """Test offline chunked scoring against the batch endpoint"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.tmpdir.name, 'listings.csv')
+        self.records = [
+            {'property_type': 'House', 'location': 'G-10', 'city': 'Islamabad', 'baths': 3,
+             'purpose': 'For Sale', 'bedrooms': 4, 'Area_in_Marla': 8.0},
+            {'property_type': 'Flat', 'location': 'Unknown Town', 'city': 'Lahore', 'baths': 2,
+             'purpose': 'For Rent', 'bedrooms': 2, 'Area_in_Marla': 5.0},
+            {'property_type': 'House', 'location': 'G-10', 'city': 'Islamabad', 'baths': 'abc',
+             'purpose': 'For Sale', 'bedrooms': 4, 'Area_in_Marla': 8.0},
+        ] * 7
+        frame = pd.DataFrame(self.records)
+        frame['listing_id'] = range(len(frame))
+        frame.to_csv(self.input, index=False)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def expected(self):
+        response = app.test_client().post('/predict/batch', json=self.records)
+        return [r.get('predicted_price') for r in response.get_json()['results']]
+
+    def test_csv_output_matches_batch_endpoint(self):
+        """Test chunked multi-process scoring matches /predict/batch row for row"""
+        output = os.path.join(self.tmpdir.name, 'scored.csv')
+        rows, scored = score_file(self.input, output, load_model_data(), chunk_size=4, workers=2, progress=False,
+                                  keep_columns=['listing_id'])
+
+        self.assertEqual(rows, len(self.records))
+        self.assertEqual(scored, 14)
+
+        result = pd.read_csv(output)
+        self.assertEqual(list(result.columns[-2:]), ['listing_id', 'predicted_price'])
+        self.assertEqual(result['listing_id'].tolist(), list(range(len(self.records))))
+        for actual, expected in zip(result['predicted_price'], self.expected()):
+            if expected is None:
+                self.assertTrue(np.isnan(actual))
+            else:
+                self.assertAlmostEqual(actual, expected, places=2)
+
+    def test_ndjson_output(self):
+        """Test the CLI writes one JSON object per row with null for unscorable rows"""
+        output = os.path.join(self.tmpdir.name, 'scored.ndjson')
+        self.assertEqual(main(['score', self.input, output, '--workers', '1', '--chunk-size', '5', '--quiet',
+                               '--keep-columns', 'listing_id']), 0)
+
+        with open(output) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), len(self.records))
+        self.assertIsNone(lines[2]['predicted_price'])
+        self.assertEqual([line['listing_id'] for line in lines], [str(i) for i in range(len(self.records))])
+        self.assertAlmostEqual(lines[0]['predicted_price'], self.expected()[0], places=2)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
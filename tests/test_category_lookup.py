@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+
+# Add the parent directory to the path so we can import the category lookup
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from category_lookup import CategoryLookup, NearestMatchIndex, normalize  # noqa: E402
+
+LOCATIONS = ['Askari', 'Bahria Town', 'Cantt', 'DHA Defence', 'F-7', 'G-10', 'G-11', 'Gulberg',
+             'Johar Town', 'Model Town', 'Sector 12']
+
+def encoder(values):
+    le = LabelEncoder()
+    le.fit(values)
+    return le
+
+class TestCategoryLookup(unittest.TestCase):
+    """Test exact, normalized and nearest-match encoding"""
+
+    def setUp(self):
+        self.encoders = {'location': encoder(LOCATIONS), 'city': encoder(['Islamabad', 'Karachi', 'Lahore'])}
+        self.lookup = CategoryLookup(self.encoders)
+
+    def test_exact_values_match_label_encoder(self):
+        """Test known values encode exactly like LabelEncoder.transform"""
+        for col, le in self.encoders.items():
+            values = np.array(le.classes_[::-1])
+            np.testing.assert_array_equal(self.lookup.encode(col, values), le.transform(values))
+
+    def test_variant_locations_resolve_to_nearest(self):
+        """Test misspelled and reformatted locations resolve to the intended known location"""
+        cases = {
+            'dha  defence': ('DHA Defence', 'normalized'),
+            'G 10': ('G-10', 'normalized'),
+            'Bahria Twn': ('Bahria Town', 'nearest'),
+            'Gulbrg': ('Gulberg', 'nearest'),
+            'Johar Town ': ('Johar Town', 'normalized'),
+            'G-10': ('G-10', 'exact')
+        }
+        for value, (expected, kind) in cases.items():
+            code, matched, match_kind = self.lookup.lookup('location', value)
+            self.assertEqual((matched, match_kind), (expected, kind), value)
+            self.assertEqual(code, LOCATIONS.index(expected))
+
+    def test_unrelated_location_falls_back(self):
+        """Test a location sharing nothing with the known ones keeps the classes_[0] fallback"""
+        self.assertEqual(self.lookup.lookup('location', 'Xyzzy'), (0, 'Askari', 'fallback'))
+
+    def test_unknown_city_falls_back_without_index(self):
+        """Test columns without an index fall back to code 0 like the encoder path"""
+        np.testing.assert_array_equal(self.lookup.encode('city', np.array(['Lahore', 'Quetta'])), [2, 0])
+
+    def test_resolution_is_cached(self):
+        """Test repeated unknown values are answered from the resolve cache"""
+        index = NearestMatchIndex(LOCATIONS)
+        first = index.resolve('Bahria Twn')
+        self.assertIn('Bahria Twn', index._cache)
+        self.assertEqual(index.resolve('Bahria Twn'), first)
+
+    def test_resolve_cache_evicts_least_recently_used(self):
+        """Test a cached spelling that keeps being asked for outlives newer ones asked for once"""
+        index = NearestMatchIndex(LOCATIONS)
+        with patch('category_lookup.RESOLVE_CACHE_SIZE', 2):
+            index.resolve('Bahria Twn')
+            index.resolve('Gulberg 3')
+            index.resolve('Bahria Twn')
+            index.resolve('Askari 10')
+        self.assertEqual(list(index._cache), ['Bahria Twn', 'Askari 10'])
+
+    def test_normalize(self):
+        self.assertEqual(normalize('  DHA-Phase_2, Lahore '), 'dha phase 2 lahore')
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
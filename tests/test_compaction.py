@@ -0,0 +1,148 @@
+import unittest
+import sys
+import os
+import pickle
+import tempfile
+from unittest.mock import patch
+import numpy as np
+from sklearn.tree import DecisionTreeRegressor
+
+# Add the parent directory to the path so we can import the compaction stage
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from compaction import compact_engine, compact_model, floor_float32  # noqa: E402
+from out_of_core import BinnedBoostingRegressor, bin_edges, bin_features  # noqa: E402
+from tests.forest_fixtures import ForestTestCase, TrainingTestCase, make_rows  # noqa: E402
+from tree_engine import CompiledForest  # noqa: E402
+
+class TestCompaction(ForestTestCase):
+    """Test each compaction step against the uncompacted engine"""
+    n_rows = 2000
+    n_estimators = 20
+
+    def test_lossless_settings_keep_predictions(self):
+        """Test float32 nodes alone reach the same leaves, leaving only float32 rounding of values"""
+        compacted, removed = compact_engine(self.engine, tolerance=0.0)
+
+        self.assertEqual(removed['bypassed_splits'], 0)
+        self.assertEqual(compacted.n_trees, self.engine.n_trees)
+        self.assertEqual(compacted.feature.dtype, np.uint8)
+        self.assertEqual(compacted.value.dtype, np.float32)
+        np.testing.assert_allclose(compacted.predict(self.X_test), self.engine.predict(self.X_test), rtol=1e-6)
+
+    def test_floor_float32_keeps_comparisons(self):
+        """Test float32 inputs compare the same against rounded-down thresholds"""
+        thresholds = np.array([2.5000001, 0.1, -3.3, 7.0, 1e10 + 0.3])
+        rounded = floor_float32(thresholds)
+        x = np.concatenate([rounded, np.nextafter(rounded, np.float32(np.inf)),
+                            np.nextafter(rounded, np.float32(-np.inf))]).astype(np.float64)
+        # The float64 engine widens float32 inputs before comparing, the float32 engine compares in float32
+        for t, t32 in zip(thresholds, rounded):
+            np.testing.assert_array_equal(x <= t, x <= np.float64(t32))
+            np.testing.assert_array_equal(x <= t, x.astype(np.float32) <= t32)
+
+    def test_merges_close_leaves(self):
+        """Test merging shrinks the trees and moves no prediction by more than the tolerance per level"""
+        tolerance = 0.02 * np.std(self.y_test)
+        compacted, removed = compact_engine(self.engine, tolerance=tolerance)
+
+        self.assertGreater(removed['merged_leaves'], 0)
+        self.assertLess(compacted.n_nodes, self.engine.n_nodes - removed['merged_leaves'])
+        shift = np.abs(compacted.predict(self.X_test) - self.engine.predict(self.X_test))
+        self.assertLessEqual(shift.max(), tolerance * self.engine.max_depth)
+
+    def test_merges_boosted_leaves(self):
+        """Test merged leaves take their value from the leaves, as boosted trees store none in internal nodes"""
+        X, y = self.X_test.astype(np.float32), self.y_test
+        edges = bin_edges(X)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            model = BinnedBoostingRegressor(n_trees=10, max_depth=4, block_rows=500)
+            model.fit_binned(bin_features(X, edges), y, edges, tmpdir)
+        tolerance = 0.25 * np.std(y)
+        compacted, removed = compact_engine(model.forest_, tolerance=tolerance)
+
+        self.assertGreater(removed['merged_leaves'], 0)
+        shift = np.abs(compacted.predict(X) - model.predict(X))
+        self.assertLessEqual(shift.max(), tolerance * model.forest_.max_depth)
+
+    def test_bypasses_decided_splits(self):
+        """Test a split its ancestor already decides is removed along with the branch no row reaches"""
+        # x0 <= 5 then x0 <= 7 (always true), whose right leaf is unreachable
+        engine = CompiledForest(
+            feature=np.array([0, 0, 0, 0, 0, 0, 0], dtype=np.int32),
+            threshold=np.array([5.0, 7.0, 2.0, 0.0, 0.0, 0.0, 0.0]),
+            left=np.array([1, 2, 3, 3, 4, 5, 6], dtype=np.int32),
+            right=np.array([6, 5, 4, 3, 4, 5, 6], dtype=np.int32),
+            value=np.array([0.0, 0.0, 0.0, 10.0, 20.0, 99.0, 30.0]),
+            roots=np.array([0], dtype=np.int32), max_depth=3, n_features=1
+        )
+        compacted, removed = compact_engine(engine)
+
+        self.assertEqual(removed['bypassed_splits'], 1)
+        self.assertEqual(compacted.n_nodes, 5)
+        self.assertEqual(compacted.max_depth, 2)
+        X = np.array([[1.0], [2.0], [3.0], [5.0], [6.0], [100.0]])
+        np.testing.assert_array_equal(compacted.predict(X), engine.predict(X))
+
+    def test_top_k_and_r2_bound(self):
+        """Test top-k keeps that many trees, reports the trade-off and is refused past the R2 bound"""
+        compacted, report = compact_model(self.model, self.X_test, self.y_test, tolerance=0.0, top_k=5,
+                                          max_r2_loss=1.0)
+        self.assertTrue(report['accepted'])
+        self.assertEqual((report['trees_before'], compacted.n_trees), (20, 5))
+        self.assertLess(report['artifact_mb_after'], report['artifact_mb_before'] / 4)
+        self.assertLess(report['size_mb_after'], report['size_mb_before'])
+        self.assertEqual(report['evaluation_rows'], 1000)
+        for key in ['r2_before', 'r2_after', 'p99_predict_ms_before', 'p99_predict_ms_after']:
+            self.assertIn(key, report)
+
+        refused, report = compact_model(self.model, self.X_test, self.y_test, tolerance=0.0, top_k=1,
+                                        max_r2_loss=0.0)
+        self.assertIsNone(refused)
+        self.assertFalse(report['accepted'])
+        self.assertIn('exceeds the bound', report['reason'])
+
+    def test_single_tree(self):
+        """Test a decision tree compacts to one tree with the same predictions"""
+        X, y = make_rows(np.random.RandomState(1), 500)
+        tree = DecisionTreeRegressor(random_state=0).fit(X, y)
+        compacted, report = compact_model(tree, self.X_test, self.y_test, tolerance=0.0)
+        self.assertEqual(compacted.n_trees, 1)
+        np.testing.assert_allclose(compacted.predict(self.X_test), tree.predict(self.X_test), rtol=1e-6)
+
+class TestCompactionTraining(TrainingTestCase):
+    """Test the compacted forest is what training saves and serves"""
+
+    def extra_patches(self):
+        # Selection would otherwise be free to pick a model compaction leaves alone
+        forest = app.candidate_models()['RandomForest']
+        return [patch('app.candidate_models', lambda parallel=False: {'RandomForest': forest}),
+                patch('app.COMPACT_FOREST', True),
+                patch('app.COMPACT_MAX_R2_LOSS', 1.0)]
+
+    def test_training_saves_compacted_forest(self):
+        """Test the pickle and artifact hold the compacted node arrays and /health reports the trade-off"""
+        trained = app.load_and_train_model()
+
+        self.assertTrue(trained['compaction']['accepted'])
+        self.assertIsInstance(trained['model'], CompiledForest)
+        with open(app.MODEL_FILE, 'rb') as f:
+            self.assertIsInstance(pickle.load(f)['model'], CompiledForest)
+
+        loaded = app.load_model()
+        self.assertEqual(loaded.get('artifact'), app.ARTIFACT_FILE)
+        self.assertEqual(loaded['engine'].value.dtype, np.float32)
+        self.assertEqual(loaded['compaction']['nodes_after'], loaded['engine'].n_nodes)
+        app.smoke_test_model(loaded)
+
+        with patch('app.model_data', loaded):
+            health = app.app.test_client().get('/health').get_json()
+        self.assertEqual(health['compaction']['trees_after'], loaded['engine'].n_trees)
+
+        # A compacted forest has no sklearn trees left to grow
+        base, reason = app.load_incremental_base()
+        self.assertIn('compacted', reason)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
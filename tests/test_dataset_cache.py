@@ -0,0 +1,127 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from sklearn.preprocessing import LabelEncoder
+
+# Add the parent directory to the path so we can import the dataset cache
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset_cache  # noqa: E402
+from dataset_cache import load_training_data  # noqa: E402
+
+FEATURES = ['property_type', 'location', 'city', 'baths', 'purpose', 'bedrooms', 'Area_in_Marla']
+CATEGORICAL = ['property_type', 'location', 'city', 'purpose']
+
+class TestDatasetCache(unittest.TestCase):
+    """Test the typed columnar dataset cache"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmpdir.name, 'House_dataset.csv')
+        self.cache_dir = os.path.join(self.tmpdir.name, 'cache')
+
+        rng = np.random.RandomState(0)
+        n = 200
+        df = pd.DataFrame({
+            'property_type': rng.choice(['House', 'Flat', 'Penthouse'], n),
+            'location': rng.choice(['G-10', 'DHA Defence', 'Bahria Town', 'F-7'], n),
+            'city': rng.choice(['Islamabad', 'Lahore', 'Karachi'], n),
+            'baths': rng.randint(1, 6, n).astype(float),
+            'purpose': rng.choice(['For Sale', 'For Rent'], n),
+            'bedrooms': rng.randint(1, 7, n),
+            'Area_in_Marla': rng.rand(n) * 20,
+            'price': rng.rand(n) * 1e7
+        })
+        df.loc[[3, 50, 120], 'baths'] = np.nan
+        df.loc[[7], 'location'] = np.nan
+        df.to_csv(self.csv_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def load(self):
+        return load_training_data(FEATURES, CATEGORICAL, self.csv_path, self.cache_dir)
+
+    def reference(self):
+        """The original read_csv + dropna + LabelEncoder pipeline"""
+        df = pd.read_csv(self.csv_path)
+        df = df.drop(df.columns[0], axis=1).dropna()
+        X = df[FEATURES].copy()
+        encoders = {}
+        for col in CATEGORICAL:
+            le = LabelEncoder()
+            X[col] = le.fit_transform(X[col].astype(str))
+            encoders[col] = le
+        return X, df['price'], encoders
+
+    def assert_matches_reference(self, X, y, encoders, reference=None):
+        X_ref, y_ref, encoders_ref = reference or self.reference()
+        self.assertEqual(list(X.columns), FEATURES)
+        np.testing.assert_array_equal(X.to_numpy(dtype=float), X_ref.to_numpy(dtype=float))
+        np.testing.assert_array_equal(y.to_numpy(), y_ref.to_numpy())
+        for col in CATEGORICAL:
+            np.testing.assert_array_equal(encoders[col].classes_, encoders_ref[col].classes_)
+
+    def test_parse_matches_original_pipeline(self):
+        """Test the typed parse encodes exactly like the original pipeline"""
+        self.assert_matches_reference(*self.load())
+
+    def test_cache_reused_without_parsing(self):
+        """Test a second load is served from the cache"""
+        self.load()
+        reference = self.reference()
+        with patch.object(dataset_cache.pd, 'read_csv', side_effect=AssertionError('CSV was reparsed')):
+            X, y, encoders = self.load()
+        self.assert_matches_reference(X, y, encoders, reference)
+
+    def test_touched_file_reuses_cache_by_hash(self):
+        """Test an unchanged CSV with a new mtime is matched by its content hash"""
+        self.load()
+        os.utime(self.csv_path, (time.time() + 10, time.time() + 10))
+        with patch.object(dataset_cache.pd, 'read_csv', side_effect=AssertionError('CSV was reparsed')):
+            self.load()
+
+    def test_changed_file_invalidates_cache(self):
+        """Test appending rows to the CSV triggers a reparse"""
+        self.load()
+        df = pd.read_csv(self.csv_path, index_col=0)
+        pd.concat([df, df.head(5)], ignore_index=True).to_csv(self.csv_path)
+
+        X, y, encoders = self.load()
+        self.assertEqual(len(X), len(self.reference()[0]))
+        self.assert_matches_reference(X, y, encoders)
+
+    def test_appended_rows_and_extended_encoders(self):
+        """Test only appended rows are read and encoded without renumbering known categories"""
+        source = dataset_cache.csv_fingerprint(self.csv_path)
+        X, _, encoders = self.load()
+
+        with open(self.csv_path, 'a') as f:
+            f.write('200,House,Blue Area,Islamabad,2.0,For Sale,3,5.0,1000000.0\n')
+            f.write('201,Flat,G-10,Lahore,1.0,For Rent,1,2.0,50000.0\n')
+        self.assertTrue(dataset_cache.is_appended(self.csv_path, source))
+
+        X_new, y_new = dataset_cache.read_appended_rows(self.csv_path, source['size'], FEATURES, CATEGORICAL)
+        self.assertEqual(list(y_new), [1000000.0, 50000.0])
+
+        X_new, extended = dataset_cache.extend_encoders(X_new, encoders, CATEGORICAL)
+        locations = list(extended['location'].classes_)
+        self.assertEqual(locations[:-1], list(encoders['location'].classes_))
+        self.assertEqual(locations[-1], 'Blue Area')
+        self.assertEqual(list(X_new['location']), [len(locations) - 1, locations.index('G-10')])
+
+        # Rewriting an existing row is not an append
+        with open(self.csv_path, 'r+b') as f:
+            f.seek(source['size'] // 2)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(b'8' if byte == b'9' else b'9')
+        self.assertFalse(dataset_cache.is_appended(self.csv_path, source))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
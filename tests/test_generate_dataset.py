@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import the generator
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_dataset import COLUMNS, generate_dataset, iter_chunks  # noqa: E402
+from dataset_cache import load_training_data  # noqa: E402
+
+class TestGenerateDataset(unittest.TestCase):
+    """Test the synthetic dataset generator"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmpdir.name, 'House_dataset.csv')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_csv_matches_schema(self):
+        """Test the CSV has the real columns, an unnamed index and some missing values"""
+        rows = generate_dataset(self.csv_path, 5000, seed=1, chunk_size=1000, nan_fraction=0.02)
+        df = pd.read_csv(self.csv_path)
+
+        self.assertEqual(rows, 5000)
+        self.assertEqual(len(df), 5000)
+        self.assertEqual(df.columns[0], 'Unnamed: 0')
+        self.assertEqual(list(df.columns[1:]), COLUMNS)
+        self.assertEqual(list(df['Unnamed: 0']), list(range(5000)))
+        self.assertTrue(df['baths'].isna().any())
+        self.assertTrue(df['location'].isna().any())
+        self.assertTrue(set(df['purpose']) <= {'For Sale', 'For Rent'})
+        self.assertTrue(pd.api.types.is_numeric_dtype(df['price']))
+
+        X, y, encoders = load_training_data(COLUMNS[:-1], ['property_type', 'location', 'city', 'purpose'],
+                                            self.csv_path, use_cache=False)
+        self.assertGreater(len(X), 4000)
+
+    def test_seeded_output_is_reproducible(self):
+        """Test the same seed gives identical data and a different seed does not"""
+        first = pd.concat(chunk for _, chunk in iter_chunks(3000, seed=7, chunk_size=1000))
+        second = pd.concat(chunk for _, chunk in iter_chunks(3000, seed=7, chunk_size=1000))
+        other = pd.concat(chunk for _, chunk in iter_chunks(3000, seed=8, chunk_size=1000))
+
+        pd.testing.assert_frame_equal(first, second)
+        self.assertFalse(first['price'].equals(other['price']))
+
+    def test_location_popularity_is_skewed(self):
+        """Test the Zipf distribution concentrates listings on the top locations"""
+        chunk = next(iter_chunks(20000, seed=3, locations=1000, zipf_a=1.2, nan_fraction=0, chunk_size=20000))[1]
+        counts = chunk['location'].value_counts()
+
+        self.assertEqual(counts.index[0], 'DHA Defence')
+        self.assertGreater(counts.iloc[0], 20 * counts.median())
+
+    def test_columnar_output(self):
+        """Test the columnar format writes one .npy per column and a manifest"""
+        path = os.path.join(self.tmpdir.name, 'columns')
+        generate_dataset(path, 2500, fmt='columnar', seed=2, chunk_size=1000)
+
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest['rows'], 2500)
+        self.assertEqual(sorted(manifest['columns']), sorted(COLUMNS))
+
+        price = np.load(os.path.join(path, 'price.npy'))
+        city = np.load(os.path.join(path, 'city.npy'))
+        self.assertEqual(price.shape, (2500,))
+        self.assertIn(city[0], ['Islamabad', 'Lahore', 'Karachi', 'Rawalpindi', 'Faisalabad'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
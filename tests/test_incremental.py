@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import pickle
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from generate_dataset import generate_dataset, iter_chunks  # noqa: E402
+from tests.forest_fixtures import TrainingTestCase  # noqa: E402
+
+def append_rows(path, rows, start, seed, locations):
+    """Append synthetic rows to a generated CSV, continuing its index column"""
+    with open(path, 'a', newline='') as f:
+        for offset, chunk in iter_chunks(rows, seed=seed, locations=locations):
+            chunk.index = range(start + offset, start + offset + len(chunk))
+            chunk.to_csv(f, header=False)
+
+class TestIncrementalRetrain(TrainingTestCase):
+    """Test growing the saved forest on appended rows"""
+
+    def setUp(self):
+        super().setUp()
+        self.base = app.load_and_train_model()
+
+    def test_grows_forest_and_extends_encoders(self):
+        """Test new trees are added, existing codes kept and unseen categories appended"""
+        if self.base['model_name'] != 'RandomForest':
+            self.skipTest('RandomForest was not selected on this data')
+        trees = len(self.base['model'].estimators_)
+        append_rows(self.csv, 300, start=3000, seed=2, locations=150)
+
+        # The appended rows come from a differently seeded location table, so allow any drift here
+        with patch('app.INCREMENTAL_DRIFT_THRESHOLD', float('inf')):
+            updated = app.incremental_train_model()
+
+        self.assertEqual(updated['training']['mode'], 'incremental')
+        self.assertNotEqual(updated['version'], self.base['version'])
+        self.assertGreater(len(updated['model'].estimators_), trees)
+
+        update = updated['incremental'][-1]
+        self.assertEqual(update['total_trees'], len(updated['model'].estimators_))
+        self.assertLess(update['total_seconds'], self.base['training']['total_seconds'])
+
+        for col, le in self.base['label_encoders'].items():
+            new_classes = list(updated['label_encoders'][col].classes_)
+            self.assertEqual(new_classes[:len(le.classes_)], list(le.classes_))
+        self.assertGreater(update['new_categories']['location'], 0)
+
+        with open(app.MODEL_FILE, 'rb') as f:
+            self.assertEqual(pickle.load(f)['version'], updated['version'])
+
+        # Appended categories are served with their appended codes
+        prepared = app.prepare_model(dict(updated))
+        new_location = updated['label_encoders']['location'].classes_[-1]
+        code, matched, kind = prepared['category_lookup'].lookup('location', new_location)
+        self.assertEqual((code, kind), (len(updated['label_encoders']['location'].classes_) - 1, 'exact'))
+
+        # Nothing appended since: the saved model is kept as is
+        self.assertEqual(app.incremental_train_model()['version'], updated['version'])
+
+    def test_drift_falls_back_to_full_retrain(self):
+        """Test a drop in R2 on the appended rows beyond the threshold triggers a full retrain"""
+        if self.base['model_name'] != 'RandomForest':
+            self.skipTest('RandomForest was not selected on this data')
+        append_rows(self.csv, 300, start=3000, seed=2, locations=150)
+
+        with patch('app.INCREMENTAL_DRIFT_THRESHOLD', -1.0):
+            retrained = app.incremental_train_model()
+        self.assertEqual(retrained['training']['mode'], 'full')
+        self.assertIn('R2 on new rows', retrained['training']['incremental_fallback'])
+
+    def test_modified_dataset_falls_back_to_full_retrain(self):
+        """Test rewriting existing rows triggers a full retrain instead of an incremental one"""
+        generate_dataset(self.csv, 3000, seed=5, locations=100)
+
+        retrained = app.incremental_train_model()
+        self.assertEqual(retrained['training']['mode'], 'full')
+        self.assertIn('modified', retrained['training']['incremental_fallback'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
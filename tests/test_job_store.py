@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+import subprocess
+import tempfile
+
+# Add the parent directory to the path so we can import the job store
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_store import JobStore  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def queued(job_id):
+    return {'job_id': job_id, 'mode': 'full', 'status': 'queued', 'timings': {}}
+
+class TestJobStore(unittest.TestCase):
+    """Test job records and the one-job-at-a-time rule across processes"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.tmpdir.name, 'jobs.json'), max_jobs=3)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_one_active_job(self):
+        """Test a second job is refused while one is queued, and accepted once it finished"""
+        self.assertIsNone(self.store.create(queued('a')))
+        self.assertEqual(self.store.create(queued('b'))['job_id'], 'a')
+
+        job = self.store.get('a')
+        job['status'] = 'completed'
+        self.store.save(job)
+        self.assertIsNone(self.store.create(queued('b')))
+        self.assertEqual([job['job_id'] for job in self.store.jobs()], ['a', 'b'])
+
+    def test_keeps_newest_jobs(self):
+        """Test finished jobs past max_jobs are dropped oldest first"""
+        for job_id in 'abcde':
+            self.assertIsNone(self.store.create(queued(job_id)))
+            job = self.store.get(job_id)
+            job['status'] = 'failed'
+            self.store.save(job)
+        self.assertEqual([job['job_id'] for job in self.store.jobs()], ['c', 'd', 'e'])
+
+    def test_other_process_holds_run_lock(self):
+        """Test the run lock held by another process is seen here, and a job it left behind fails on exit"""
+        self.store.create(queued('a'))
+        script = ("import sys; from job_store import JobStore; store = JobStore(sys.argv[1]); "
+                  "handle = store.claim(); job = store.get('a'); job['status'] = 'running'; store.save(job); "
+                  "print(handle is not None, flush=True); sys.stdin.read()")
+        process = subprocess.Popen([sys.executable, '-c', script, self.store.path], cwd=ROOT, text=True,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        try:
+            self.assertEqual(process.stdout.readline().strip(), 'True')
+            self.assertIsNone(self.store.claim())
+            self.assertEqual(self.store.get('a')['status'], 'running')
+            self.assertEqual(self.store.create(queued('b'))['job_id'], 'a')
+        finally:
+            # Exits without marking the job finished, as a killed training process would
+            process.stdin.close()
+            process.wait()
+            process.stdout.close()
+
+        self.assertEqual(self.store.get('a')['status'], 'failed')
+        self.assertIsNone(self.store.create(queued('b')))
+        handle = self.store.claim()
+        self.assertIsNotNone(handle)
+        self.store.release(handle)
+
+    def test_stale_queued_job(self):
+        """Test a job nobody picked up stops blocking new ones"""
+        self.store.queued_timeout = 0.0
+        self.store.create(queued('a'))
+        self.assertEqual(self.store.get('a')['status'], 'failed')
+        self.assertIsNone(self.store.create(queued('b')))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
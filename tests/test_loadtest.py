@@ -0,0 +1,132 @@
+import unittest
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from werkzeug.serving import make_server
+
+# Add the parent directory to the path so we can import the load generator
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, ensure_model_loaded  # noqa: E402
+from loadtest import (HTTPConnection, HTTPTarget, InProcessTarget, LoadRun, load_payloads, run_load,  # noqa: E402
+                      summarize, synthetic_payloads)
+
+def setUpModule():
+    ensure_model_loaded()
+
+class TestLoadTest(unittest.TestCase):
+    """Test payload sources, both targets and the report"""
+
+    def test_synthetic_payloads_match_schema(self):
+        """Test generated payloads carry every feature and no target"""
+        payloads = synthetic_payloads(20, seed=1)
+        self.assertEqual(len(payloads), 20)
+        self.assertEqual(set(payloads[0]), {'property_type', 'location', 'city', 'baths',
+                                            'purpose', 'bedrooms', 'Area_in_Marla'})
+
+    def test_replay_in_process(self):
+        """Test replaying a JSONL file through the test client counts successes and failures"""
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write(json.dumps(synthetic_payloads(1)[0]) + '\n\n')
+            f.write(json.dumps({'property_type': 'House'}) + '\n')
+        try:
+            payloads = load_payloads(f.name)
+        finally:
+            os.remove(f.name)
+
+        report = run_load(InProcessTarget(app), payloads, concurrency=3, requests=20)
+        self.assertEqual(report['requests'], 20)
+        self.assertEqual(report['errors'], 10)
+        self.assertAlmostEqual(report['error_rate'], 0.5)
+        self.assertLessEqual(report['p50_ms'], report['p99_ms'])
+        self.assertEqual(sum(point['requests'] for point in report['series']), 20)
+
+    def test_open_loop_against_server(self):
+        """Test the asyncio HTTP client drives a real server at a target rate"""
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            target = HTTPTarget(f'http://127.0.0.1:{server.server_port}')
+            report = run_load(target, synthetic_payloads(10), rate=100, requests=30)
+        finally:
+            server.shutdown()
+
+        self.assertEqual(report['requests'], 30)
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(report['statuses'], {'200': 30})
+        self.assertGreaterEqual(report['elapsed_seconds'], 0.29)
+
+    def test_reconnects_after_idle_close(self):
+        """Test a keep-alive connection the server closed while idle is reopened instead of failing the request"""
+        async def scenario():
+            connections = []
+
+            async def answer_once(reader, writer):
+                # Answers one request with keep-alive, then drops the connection as an idle timeout would
+                connections.append(writer)
+                await reader.readuntil(b'\r\n\r\n')
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+                await writer.drain()
+                writer.close()
+
+            server = await asyncio.start_server(answer_once, '127.0.0.1', 0)
+            connection = HTTPConnection('127.0.0.1', server.sockets[0].getsockname()[1])
+            try:
+                first = await connection.request('GET', '/')
+                await asyncio.sleep(0.05)
+                second = await connection.request('GET', '/')
+            finally:
+                await connection.close()
+                server.close()
+                await server.wait_closed()
+            return first, second, len(connections)
+
+        first, second, connections = asyncio.run(scenario())
+        self.assertEqual(first, (200, b'ok'))
+        self.assertEqual(second, (200, b'ok'))
+        self.assertEqual(connections, 2)
+
+    def test_summarize_series(self):
+        """Test samples are bucketed into the latency series by start time"""
+        samples = [(0.1, 0.010, 0.005, 200, True), (0.5, 0.020, 0.020, 200, True), (1.2, 0.030, 0.010, 500, False)]
+        report = summarize(samples, elapsed=1.5, interval=1.0)
+
+        self.assertEqual(report['requests'], 3)
+        self.assertEqual(report['errors'], 1)
+        self.assertEqual(report['statuses'], {'200': 2, '500': 1})
+        self.assertEqual([point['requests'] for point in report['series']], [2, 1])
+        self.assertEqual(report['series'][1]['errors'], 1)
+        self.assertAlmostEqual(report['requests_per_second'], 2.0)
+        self.assertAlmostEqual(report['max_ms'], 30.0)
+        self.assertAlmostEqual(report['service']['max_ms'], 20.0)
+
+    def test_open_loop_counts_queueing(self):
+        """Test open-loop latency runs from when a request was due, so a stalled schedule is not omitted"""
+        class SlowTarget:
+            async def send(self, payload):
+                await asyncio.sleep(0.05)
+                return 200, b'{}'
+
+            async def close(self):
+                pass
+
+        async def scenario():
+            # One request in flight at 100 req/s against a 50 ms server falls further behind each time
+            load.started = time.perf_counter()
+            await load.open_loop(rate=100, requests=10, max_in_flight=1)
+
+        load = LoadRun(SlowTarget(), [{}])
+        asyncio.run(scenario())
+        report = summarize(load.samples, elapsed=time.perf_counter() - load.started)
+
+        self.assertEqual(report['requests'], 10)
+        self.assertLess(report['service']['max_ms'], 200)
+        self.assertGreater(report['max_ms'], 300)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
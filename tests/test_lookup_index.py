@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+import itertools
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+from sklearn.tree import DecisionTreeRegressor
+
+# Add the parent directory to the path so we can import the lookup index
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lookup_index import LookupIndex, frequent_combinations  # noqa: E402
+from tests.forest_fixtures import CATEGORICAL, ForestTestCase, make_rows  # noqa: E402
+from tree_engine import compile_model  # noqa: E402
+
+class TestLookupIndex(ForestTestCase):
+    """Test exact parity between the lookup index and the compiled engine"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.combinations = list(itertools.product(range(4), range(3)))
+
+        # Random rows plus rows sitting exactly on split thresholds and just past them
+        splits = (cls.engine.left != np.arange(cls.engine.n_nodes)) & (cls.engine.feature == 4)
+        thresholds = cls.rng.choice(cls.engine.threshold[splits], 1000).astype(np.float32)
+        edges = np.vstack([cls.X_test[:1000], cls.X_test[:1000]])
+        edges[:, 4] = np.concatenate([thresholds, np.nextafter(thresholds, np.float32(np.inf))])
+        cls.X_test = np.vstack([cls.X_test, edges]).astype(np.float32)
+
+    def assert_parity(self, engine, index, X):
+        predictions = index.predict(X, engine.predict)
+        np.testing.assert_array_equal(predictions, engine.predict(X))
+        for row in X[:200]:
+            self.assertEqual(index.predict(row[None], engine.predict)[0], engine.predict(row[None])[0])
+
+    def test_forest_parity(self):
+        """Test every indexed row equals the engine prediction bit for bit, and all rows are indexed"""
+        index = LookupIndex.build(self.engine, CATEGORICAL, self.combinations, 64 * 1024 * 1024)
+        self.assertEqual(len(index.tables), len(self.combinations))
+
+        self.assert_parity(self.engine, index, self.X_test)
+        self.assertEqual(index.misses, 0)
+        np.testing.assert_allclose(index.predict(self.X_test, self.engine.predict),
+                                   self.model.predict(self.X_test), rtol=1e-9)
+
+    def test_float32_engine_and_single_tree(self):
+        """Test parity holds for float32 nodes and for a decision tree"""
+        X, y = make_rows(np.random.RandomState(1), 800)
+        for engine in [compile_model(self.model, dtype=np.float32),
+                       compile_model(DecisionTreeRegressor(random_state=0).fit(X, y))]:
+            index = LookupIndex.build(engine, CATEGORICAL, self.combinations, 64 * 1024 * 1024)
+            self.assert_parity(engine, index, self.X_test)
+
+    def test_unindexed_rows_fall_back(self):
+        """Test other combinations and NaN values are scored by the fallback"""
+        index = LookupIndex.build(self.engine, CATEGORICAL, [(1, 2)], 64 * 1024 * 1024)
+        X = self.X_test[:100].copy()
+        X[:50, 0], X[:50, 2] = 1, 2
+        X[50:, 0] = 0
+        X[0, 3] = np.nan
+
+        self.assert_parity(self.engine, index, X)
+        self.assertIsNone(index.lookup(X[0].tolist()))
+        self.assertIsNotNone(index.lookup(X[1].tolist()))
+        self.assertIsNone(index.lookup(X[50].tolist()))
+        # Every row is scored once batched and once on its own
+        self.assertEqual(index.misses, 2 * (1 + 50))
+
+    def test_memory_cap(self):
+        """Test tables that would exceed the cap are skipped and the cap is never exceeded"""
+        full = LookupIndex.build(self.engine, CATEGORICAL, self.combinations, 64 * 1024 * 1024)
+        cap = full.nbytes // 3
+        index = LookupIndex.build(self.engine, CATEGORICAL, self.combinations, cap)
+
+        self.assertLessEqual(index.nbytes, cap)
+        self.assertGreater(index.skipped, 0)
+        self.assertEqual(len(index.tables) + index.skipped, len(self.combinations))
+        self.assert_parity(self.engine, index, self.X_test)
+        self.assertGreater(index.misses, 0)
+
+    def test_frequent_combinations(self):
+        """Test combinations are decoded to raw values, most frequent first"""
+        encoders = {'type': LabelEncoder().fit(['Flat', 'House']), 'city': LabelEncoder().fit(['Karachi', 'Lahore'])}
+        X = pd.DataFrame({'type': [1, 1, 0, 1, 0], 'city': [0, 0, 1, 0, 0], 'area': [1, 2, 3, 4, 5]})
+
+        combinations = frequent_combinations(X, ['type', 'city'], encoders, limit=2)
+        self.assertEqual(combinations, [{'values': ['House', 'Karachi'], 'rows': 3},
+                                        {'values': ['Flat', 'Karachi'], 'rows': 1}])
+
+class TestLookupIndexServing(unittest.TestCase):
+    """Test /predict answers from the lookup index with the engine's predictions"""
+
+    def test_predict_matches_engine(self):
+        """Test served predictions are unchanged when the index is enabled"""
+        import app
+
+        current = app.ensure_model_loaded()
+        if current['engine'] is None:
+            self.skipTest('Serving model has no compiled engine')
+
+        values = [str(current['label_encoders'][col].classes_[-1]) for col in app.CATEGORICAL_COLUMNS]
+        records = [dict(zip(app.CATEGORICAL_COLUMNS, values), baths=b, bedrooms=b + 1, Area_in_Marla=3.5 * b)
+                   for b in range(1, 8)]
+        client = app.app.test_client()
+        expected = client.post('/predict/batch', json=records).get_json()['results']
+
+        with patch('app.USE_LOOKUP_INDEX', True), patch('app.LOOKUP_INDEX_COMBINATIONS', 1), \
+                patch.object(app.prediction_cache, 'maxsize', 0):
+            indexed = app.prepare_model(dict(current, category_combinations=[{'values': values, 'rows': 1}]))
+            with patch('app.model_data', indexed):
+                batch = client.post('/predict/batch', json=records).get_json()['results']
+                single = [client.post('/predict', json=r).get_json() for r in records]
+                health = client.get('/health').get_json()
+
+        self.assertEqual([r['predicted_price'] for r in batch], [r['predicted_price'] for r in expected])
+        self.assertEqual([r['predicted_price'] for r in single], [r['predicted_price'] for r in expected])
+        self.assertEqual(health['lookup_index']['combinations'], 1)
+        self.assertEqual(indexed['lookup_index'].misses, 0)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the parent directory to the path so we can import the metrics module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Counter, MultiprocessStore, Registry, StageTimer  # noqa: E402
+
+class TestMetrics(unittest.TestCase):
+    """Test the Prometheus metric families"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets, sum and count"""
+        registry = Registry()
+        histogram = registry.histogram('latency_seconds', 'Latency', ['stage'], buckets=(0.1, 1.0))
+        for value in [0.05, 0.5, 0.5, 5.0]:
+            histogram.observe(value, ('encode',))
+
+        cumulative, total, count = histogram.snapshot(('encode',))
+        self.assertEqual(cumulative, [1, 3, 4])
+        self.assertAlmostEqual(total, 6.05)
+        self.assertEqual(count, 4)
+
+        body = registry.render()
+        self.assertIn('# TYPE latency_seconds histogram', body)
+        self.assertIn('latency_seconds_bucket{stage="encode",le="0.1"} 1', body)
+        self.assertIn('latency_seconds_bucket{stage="encode",le="+Inf"} 4', body)
+        self.assertIn('latency_seconds_count{stage="encode"} 4', body)
+
+    def test_counter_gauge_and_collector(self):
+        """Test counters, gauges with escaped labels and scrape-time collectors"""
+        registry = Registry()
+        counter = registry.counter('requests_total', 'Requests', ['endpoint'])
+        counter.inc(('predict',))
+        counter.inc(('predict',), amount=2)
+        gauge = registry.gauge('model_info', 'Model', ['model_name'])
+        gauge.set(1, ('Random "Forest"',))
+        registry.add_collector(lambda: [Counter('cache_hits_total', 'Cache hits')])
+
+        body = registry.render()
+        self.assertIn('requests_total{endpoint="predict"} 3', body)
+        self.assertIn('model_info{model_name="Random \\"Forest\\""} 1', body)
+        self.assertIn('# TYPE cache_hits_total counter', body)
+
+    def test_stage_timer(self):
+        """Test a stage timer records one observation per mark"""
+        registry = Registry()
+        histogram = registry.histogram('stage_seconds', 'Stages', ['endpoint', 'stage'])
+        timer = StageTimer(histogram, 'predict')
+        timer.mark('parse')
+        timer.mark('predict')
+
+        self.assertEqual(histogram.snapshot(('predict', 'parse'))[2], 1)
+        self.assertEqual(histogram.snapshot(('predict', 'predict'))[2], 1)
+        self.assertGreaterEqual(timer.elapsed(), 0)
+
+    def test_multiprocess_store(self):
+        """Test a scrape sums every process's counters and histograms, and keeps those of exited ones"""
+        def registry_with(requests, latency, ready):
+            registry = Registry()
+            registry.counter('requests_total', 'Requests', ['endpoint']).inc(('predict',), requests)
+            registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)).observe(latency)
+            registry.gauge('ready', 'Ready').set(ready)
+            return registry
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = MultiprocessStore(directory)
+            store.write(registry_with(2, 0.05, 0), pid=101)
+            store.write(registry_with(3, 0.5, 0), pid=102)
+            store.retire(101)
+            self.assertEqual(sorted(os.listdir(directory)), ['.lock', '102.json', 'exited.json'])
+
+            own = registry_with(1, 5.0, 1)
+            body = store.render(own)
+            self.assertIn('requests_total{endpoint="predict"} 6', body)
+            self.assertIn('latency_seconds_bucket{le="0.1"} 1', body)
+            self.assertIn('latency_seconds_bucket{le="1.0"} 2', body)
+            self.assertIn('latency_seconds_count 3', body)
+            self.assertIn('ready 1', body)
+            # Rendering never adds other processes' values to the live registry
+            self.assertIn('requests_total{endpoint="predict"} 1', own.render())
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
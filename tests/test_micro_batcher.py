@@ -0,0 +1,89 @@
+import unittest
+import sys
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the micro-batcher
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from micro_batcher import MicroBatcher  # noqa: E402
+
+class TestMicroBatcher(unittest.TestCase):
+    """Test batching, result routing and error propagation"""
+
+    def test_concurrent_calls_share_batches(self):
+        """Test concurrent submits are grouped and every caller gets its own result"""
+        batches = []
+        observed = []
+        release = threading.Event()
+
+        def handler(items):
+            # Hold the first batch so the remaining submits queue up behind it
+            release.wait(5)
+            batches.append(len(items))
+            return [item * 10 for item in items]
+
+        batcher = MicroBatcher(handler, max_batch_size=8, max_wait=0.05,
+                               observer=lambda size, waits: observed.append((size, len(waits))))
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            futures = [pool.submit(batcher.submit, i) for i in range(20)]
+            release.set()
+            results = [f.result(timeout=10) for f in futures]
+
+        self.assertEqual(results, [i * 10 for i in range(20)])
+        self.assertEqual(sum(batches), 20)
+        self.assertLessEqual(max(batches), 8)
+        self.assertGreater(max(batches), 1)
+        self.assertEqual([size for size, _ in observed], batches)
+        self.assertTrue(all(size == waits for size, waits in observed))
+
+    def test_single_call_waits_at_most_max_wait(self):
+        """Test a lone call is scored after max_wait instead of waiting for a full batch"""
+        batcher = MicroBatcher(lambda items: [sum(items)], max_batch_size=64, max_wait=0.01)
+        self.assertEqual(batcher.submit(5, timeout=2), 5)
+
+    def test_handler_errors_reach_every_caller(self):
+        """Test an exception in the handler is raised in each waiting caller"""
+        def handler(items):
+            raise ValueError('model failed')
+
+        batcher = MicroBatcher(handler, max_wait=0.01)
+        with self.assertRaises(ValueError):
+            batcher.submit(1, timeout=2)
+        with self.assertRaises(ValueError):
+            batcher.submit(2, timeout=2)
+
+class TestMicroBatchedPredict(unittest.TestCase):
+    """Test /predict through the micro-batcher matches the direct path"""
+
+    def test_predict_matches_unbatched(self):
+        """Test concurrent micro-batched predictions equal single predictions and are measured"""
+        import app
+        app.ensure_model_loaded()
+
+        records = [{'property_type': 'House', 'location': 'G-10', 'city': 'Islamabad', 'baths': 3,
+                    'purpose': 'For Sale', 'bedrooms': 4, 'Area_in_Marla': 5.0 + i} for i in range(12)]
+        client = app.app.test_client()
+        expected = [client.post('/predict', json=r).get_json()['predicted_price'] for r in records]
+
+        def post(record):
+            return app.app.test_client().post('/predict', json=record).get_json()
+
+        with patch('app.USE_MICRO_BATCHING', True), patch.object(app.prediction_cache, 'maxsize', 0):
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                responses = list(pool.map(post, records))
+            invalid = post({'property_type': 'House'})
+
+        self.assertEqual([r['predicted_price'] for r in responses], expected)
+        self.assertFalse(invalid['success'])
+        self.assertIn('Missing fields', invalid['error'])
+
+        metrics = client.get('/metrics').get_data(as_text=True)
+        self.assertIn('house_price_micro_batch_size_count', metrics)
+        self.assertIn('house_price_micro_batch_wait_seconds_bucket', metrics)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
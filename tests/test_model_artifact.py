@@ -0,0 +1,89 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import LabelEncoder
+
+# Add the parent directory to the path so we can import the artifact module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_artifact import ALIGNMENT, is_artifact_current, load_artifact, read_header, save_artifact  # noqa: E402
+
+class TestModelArtifact(unittest.TestCase):
+    """Test the memory-mappable model artifact"""
+
+    def setUp(self):
+        rng = np.random.RandomState(1)
+        self.X = rng.rand(300, 3) * [3, 10, 50]
+        self.y = self.X[:, 2] * 1000 + self.X[:, 1] * 10
+
+        le = LabelEncoder()
+        le.fit(['Islamabad', 'Karachi', 'Lahore'])
+        self.model_data = {
+            'model': RandomForestRegressor(n_estimators=5, random_state=0).fit(self.X, self.y),
+            'label_encoders': {'city': le},
+            'feature_columns': ['city', 'baths', 'Area_in_Marla'],
+            'model_name': 'RandomForest',
+            'r2_score': 0.9
+        }
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'model.bin')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip(self):
+        """Test a saved artifact maps back to identical predictions and encoders"""
+        self.assertTrue(save_artifact(self.model_data, self.path))
+        loaded = load_artifact(self.path)
+
+        self.assertIsInstance(loaded['engine'].threshold, np.memmap)
+        self.assertEqual(loaded['model_name'], 'RandomForest')
+        self.assertEqual(loaded['feature_columns'], self.model_data['feature_columns'])
+        self.assertEqual(list(loaded['label_encoders']['city'].classes_), ['Islamabad', 'Karachi', 'Lahore'])
+        self.assertEqual(loaded['label_encoders']['city'].transform(['Lahore'])[0], 2)
+        np.testing.assert_allclose(loaded['model'].predict(self.X), self.model_data['model'].predict(self.X),
+                                   rtol=1e-9)
+
+    def test_arrays_are_aligned(self):
+        """Test every array starts on an aligned file offset"""
+        save_artifact(self.model_data, self.path)
+        header, data_start = read_header(self.path)
+
+        self.assertEqual(data_start % ALIGNMENT, 0)
+        for spec in header['arrays'].values():
+            self.assertEqual(spec['offset'] % ALIGNMENT, 0)
+
+    def test_non_tree_model_is_not_saved(self):
+        """Test models without node arrays fall back to the pickle"""
+        self.model_data['model'] = LinearRegression().fit(self.X, self.y)
+        self.assertFalse(save_artifact(self.model_data, self.path))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_invalid_file_rejected(self):
+        """Test files that are not artifacts are rejected"""
+        with open(self.path, 'wb') as f:
+            f.write(b'not an artifact')
+        with self.assertRaises(ValueError):
+            load_artifact(self.path)
+
+    def test_stale_artifact_detected(self):
+        """Test an artifact older than the pickle is not preferred"""
+        pickle_path = os.path.join(self.tmpdir.name, 'model.pkl')
+        save_artifact(self.model_data, self.path)
+        with open(pickle_path, 'wb') as f:
+            f.write(b'newer')
+        os.utime(self.path, (0, 0))
+
+        self.assertFalse(is_artifact_current(self.path, pickle_path))
+        os.utime(self.path, None)
+        os.utime(pickle_path, (0, 0))
+        self.assertTrue(is_artifact_current(self.path, pickle_path))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,150 @@
+import unittest
+import sys
+import os
+import tempfile
+import tracemalloc
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+# Add the parent directory to the path so we can import the out-of-core trainer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from dataset_cache import encode_dataset, read_dataset  # noqa: E402
+from generate_dataset import generate_dataset  # noqa: E402
+from lookup_index import frequent_combinations  # noqa: E402
+from out_of_core import (BinnedBoostingRegressor, StreamingMetrics, bin_edges, bin_features,  # noqa: E402
+                         scan_dataset, spill_dataset, top_combinations, train_out_of_core)
+from tests.forest_fixtures import TrainingTestCase  # noqa: E402
+from tree_engine import compile_model  # noqa: E402
+
+class TestOutOfCore(unittest.TestCase):
+    """Test the chunked passes, the streaming holdout and the binned boosting model"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmpdir.name, 'House_dataset.csv')
+        generate_dataset(self.csv, 3000, seed=1, locations=100)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_scan_matches_in_memory_encoding(self):
+        """Test chunked vocabularies and combinations equal those of the whole-file path"""
+        X, _ = read_dataset(self.csv, app.FEATURE_COLUMNS, app.CATEGORICAL_COLUMNS)
+        X, encoders = encode_dataset(X, app.CATEGORICAL_COLUMNS)
+        scan = scan_dataset(self.csv, app.FEATURE_COLUMNS, app.CATEGORICAL_COLUMNS, chunk_rows=400)
+
+        self.assertEqual(scan['rows'], len(X))
+        self.assertEqual(scan['chunks'], 8)
+        for col in app.CATEGORICAL_COLUMNS:
+            self.assertEqual(list(scan['classes'][col]), list(encoders[col].classes_))
+        self.assertEqual(top_combinations(scan['combinations'], app.CATEGORICAL_COLUMNS, limit=20),
+                         frequent_combinations(X, app.CATEGORICAL_COLUMNS, encoders, limit=20))
+
+    def test_holdout_does_not_depend_on_chunk_size(self):
+        """Test every row lands in the same split whatever the chunk size"""
+        scan = scan_dataset(self.csv, app.FEATURE_COLUMNS, app.CATEGORICAL_COLUMNS)
+        splits = []
+        for chunk_rows in [300, 5000]:
+            work_dir = tempfile.mkdtemp(dir=self.tmpdir.name)
+            splits.append(spill_dataset(self.csv, app.FEATURE_COLUMNS, app.CATEGORICAL_COLUMNS, scan['classes'],
+                                        work_dir, chunk_rows=chunk_rows))
+
+        np.testing.assert_array_equal(splits[0].X_test, splits[1].X_test)
+        np.testing.assert_array_equal(splits[0].y_train, splits[1].y_train)
+        self.assertAlmostEqual(len(splits[0].y_test) / scan['rows'], 0.2, delta=0.03)
+
+    def test_streaming_metrics_match_sklearn(self):
+        """Test metrics accumulated over batches equal sklearn's on the whole holdout"""
+        rng = np.random.RandomState(0)
+        y = rng.lognormal(15, 1, 1000)
+        predictions = y * rng.normal(1, 0.2, 1000)
+
+        metrics = StreamingMetrics()
+        for start in range(0, 1000, 128):
+            metrics.update(y[start:start + 128], predictions[start:start + 128])
+        report = metrics.report()
+
+        self.assertAlmostEqual(report['r2'], r2_score(y, predictions), places=9)
+        self.assertAlmostEqual(report['mae'] / mean_absolute_error(y, predictions), 1.0, places=9)
+        self.assertAlmostEqual(report['rmse'] / np.sqrt(mean_squared_error(y, predictions)), 1.0, places=9)
+
+    def test_boosting_serves_training_predictions(self):
+        """Test the compiled trees reproduce the binned predictions made while boosting"""
+        X, y = read_dataset(self.csv, app.FEATURE_COLUMNS, app.CATEGORICAL_COLUMNS)
+        X, _ = encode_dataset(X, app.CATEGORICAL_COLUMNS)
+        X, y = X.to_numpy(dtype=np.float32), y.to_numpy()
+        edges = bin_edges(X)
+
+        model = BinnedBoostingRegressor(n_trees=20, max_depth=4, block_rows=500)
+        model.fit_binned(bin_features(X, edges), y, edges, self.tmpdir.name)
+        boosted = np.fromfile(os.path.join(self.tmpdir.name, 'predictions.bin'), dtype=np.float64)
+
+        np.testing.assert_allclose(model.predict(X), boosted, rtol=1e-9)
+        self.assertGreater(r2_score(y, boosted), 0.5)
+        self.assertLessEqual(model.forest_.max_depth, 4)
+        self.assertIs(compile_model(model), model.forest_)
+        self.assertEqual(compile_model(model, dtype=np.float32).dtype, np.float32)
+
+    def test_peak_memory_does_not_grow_with_rows(self):
+        """Test training on four times the rows keeps the same peak of traced allocations"""
+        peaks = []
+        for rows in [10000, 40000]:
+            csv = os.path.join(self.tmpdir.name, f'{rows}.csv')
+            generate_dataset(csv, rows, seed=2, locations=20)
+            # Row samples and trees are full-sized at either row count, so only per-row growth would show
+            with patch('out_of_core.SAMPLE_ROWS', 500), patch('out_of_core.MEASURE_ROWS', 100):
+                tracemalloc.start()
+                try:
+                    results, details = train_out_of_core(csv, app.FEATURE_COLUMNS, app.CATEGORICAL_COLUMNS,
+                                                         work_dir=self.tmpdir.name, chunk_rows=1000,
+                                                         block_rows=1000, boosting={'n_trees': 3}, epochs=1)
+                    peaks.append(tracemalloc.get_traced_memory()[1])
+                finally:
+                    tracemalloc.stop()
+            self.assertEqual(set(results), {'SGDLinear', 'BinnedBoosting'})
+            self.assertEqual(details['report']['chunks'], rows // 1000)
+
+        self.assertLess(peaks[1], peaks[0] * 1.15)
+        # The workspace with the spilled arrays is removed afterwards
+        self.assertEqual([name for name in os.listdir(self.tmpdir.name) if name.startswith('.out_of_core_')], [])
+
+class TestOutOfCoreTraining(TrainingTestCase):
+    """Test the out-of-core candidates go through selection and serving like the others"""
+
+    def extra_patches(self):
+        return [patch('app.OUT_OF_CORE_DIR', self.tmpdir.name), patch('app.OUT_OF_CORE_CHUNK_ROWS', 500)]
+
+    def test_train_select_and_serve(self):
+        """Test the chosen model is saved, reloaded and served with the predictions it was scored with"""
+        trained = app.load_and_train_model(out_of_core=True)
+
+        self.assertEqual(trained['training']['mode'], 'out_of_core')
+        self.assertEqual(trained['training']['out_of_core']['chunks'], 6)
+        # The in-memory candidates are fitted on a row sample and compete on the same holdout
+        self.assertEqual(set(trained['candidates']), {'SGDLinear', 'BinnedBoosting', 'RandomForest',
+                                                      'LinearRegression', 'DecisionTree'})
+        self.assertEqual(trained['training']['out_of_core']['sampled_fit_rows'],
+                         trained['training']['out_of_core']['train_rows'])
+        self.assertIn(trained['model_name'], trained['candidates'])
+        self.assertEqual(trained['r2_score'], trained['candidates'][trained['model_name']]['r2'])
+        self.assertTrue(trained['category_combinations'])
+
+        loaded = app.load_model()
+        app.smoke_test_model(loaded)
+        X, _ = read_dataset(self.csv, app.FEATURE_COLUMNS, app.CATEGORICAL_COLUMNS)
+        records = X.head(50).reset_index(drop=True)
+        encoded = app.encode_categoricals(records.copy(), loaded['label_encoders'], loaded['category_lookup'])
+        np.testing.assert_allclose(app.predict_frame(loaded, encoded),
+                                   trained['model'].predict(pd.DataFrame(encoded, columns=app.FEATURE_COLUMNS)),
+                                   rtol=1e-9)
+
+        # The boosted trees are served from the memory-mapped artifact like a forest
+        if trained['model_name'] == 'BinnedBoosting':
+            self.assertEqual(loaded.get('artifact'), app.ARTIFACT_FILE)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the prediction cache
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prediction_cache import PredictionCache  # noqa: E402
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestPredictionCache(unittest.TestCase):
+    """Test the LRU prediction cache"""
+
+    def test_hit_and_miss_counters(self):
+        """Test lookups are counted as hits and misses"""
+        cache = PredictionCache(maxsize=10)
+        self.assertIsNone(cache.get(('v1', 1.0)))
+        cache.put(('v1', 1.0), 42.0)
+        self.assertEqual(cache.get(('v1', 1.0)), 42.0)
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 1)
+        self.assertAlmostEqual(stats['hit_rate'], 0.5)
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used entry is evicted first"""
+        cache = PredictionCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        """Test entries are not returned after their TTL"""
+        clock = FakeClock()
+        cache = PredictionCache(maxsize=10, ttl=5, clock=clock)
+        cache.put('a', 1)
+        clock.now = 4.9
+        self.assertEqual(cache.get('a'), 1)
+        clock.now = 5.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_clear_and_disabled(self):
+        """Test clearing empties the cache and a zero-size cache stores nothing"""
+        cache = PredictionCache(maxsize=10)
+        cache.put('a', 1)
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+
+        disabled = PredictionCache(maxsize=0)
+        self.assertFalse(disabled.enabled)
+        disabled.put('a', 1)
+        self.assertEqual(disabled.stats()['size'], 0)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,137 @@
+import unittest
+import sys
+import os
+import json
+import signal
+import socket
+import subprocess
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = {
+    'property_type': 'House',
+    'location': 'G-10',
+    'city': 'Islamabad',
+    'baths': 3,
+    'purpose': 'For Sale',
+    'bedrooms': 4,
+    'Area_in_Marla': 8.0
+}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'pre-fork serving needs os.fork')
+class TestPreforkServer(unittest.TestCase):
+    """Test the pre-fork server end to end in a subprocess"""
+
+    def setUp(self):
+        self.port = free_port()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        env = dict(os.environ, RETRAIN_JOBS_FILE=os.path.join(self.tmpdir.name, 'retrain_jobs.json'))
+        self.process = subprocess.Popen(
+            [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(self.port), '--workers', '2',
+             '--max-requests', '5', '--max-requests-jitter', '0', '--graceful-timeout', '5'],
+            cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        # /ready answers 503, raised as an HTTPError, until the model has loaded and warmed up
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            try:
+                self.get('/ready')
+                return
+            except OSError:
+                time.sleep(0.2)
+        self.process.kill()
+        self.fail('Server did not start')
+
+    def tearDown(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        self.process.stdout.close()
+        self.tmpdir.cleanup()
+
+    def get(self, path):
+        with urllib.request.urlopen(f'http://127.0.0.1:{self.port}{path}', timeout=10) as response:
+            return json.loads(response.read())
+
+    def post(self, path):
+        request = urllib.request.Request(f'http://127.0.0.1:{self.port}{path}', data=b'', method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def requests_total(self):
+        with urllib.request.urlopen(f'http://127.0.0.1:{self.port}/metrics', timeout=10) as response:
+            body = response.read().decode()
+        return sum(float(line.rsplit(' ', 1)[1]) for line in body.splitlines()
+                   if line.startswith('house_price_requests_total{'))
+
+    def predict(self):
+        request = urllib.request.Request(f'http://127.0.0.1:{self.port}/predict', data=json.dumps(SAMPLE).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.loads(response.read())
+
+    def test_recycle_reload_and_stop(self):
+        """Test workers are recycled and reloaded without failed requests, then stop cleanly"""
+        prices = {self.predict()['predicted_price'] for _ in range(25)}
+        self.assertEqual(len(prices), 1)
+
+        # Any worker's /metrics counts the requests of all of them, recycled ones included
+        deadline = time.time() + 10
+        while self.requests_total() < 25 and time.time() < deadline:
+            time.sleep(0.2)
+        self.assertEqual(self.requests_total(), 25)
+
+        self.process.send_signal(signal.SIGHUP)
+        time.sleep(1)
+        prices |= {self.predict()['predicted_price'] for _ in range(10)}
+        self.assertEqual(len(prices), 1)
+
+        self.process.send_signal(signal.SIGTERM)
+        self.assertEqual(self.process.wait(timeout=30), 0)
+
+        log = self.process.stdout.read()
+        self.assertIn('replacing it', log)
+        self.assertIn('Reloaded', log)
+        self.assertIn('Stopped', log)
+
+    def test_retrain_runs_in_master(self):
+        """Test a job queued by one worker is run once by the master, reported by every worker and reloads them"""
+        status, started = self.post('/retrain?mode=incremental')
+        self.assertEqual(status, 202)
+        status, refused = self.post('/retrain')
+        self.assertEqual((status, refused['job_id']), (409, started['job_id']))
+
+        # Workers recycle every 5 requests, so the polls below are answered by many different processes
+        deadline = time.time() + 600
+        while time.time() < deadline:
+            job = self.get(f"/retrain/{started['job_id']}")
+            if job['status'] in ('completed', 'failed'):
+                break
+            time.sleep(0.2)
+        self.assertEqual(job['status'], 'completed', job.get('error'))
+        self.assertFalse(self.get('/health')['retraining'])
+
+        # The reload is forked after the trainer exits; wait for it before stopping
+        time.sleep(2)
+        self.assertEqual(self.predict()['success'], True)
+        self.process.send_signal(signal.SIGTERM)
+        self.assertEqual(self.process.wait(timeout=30), 0)
+
+        log = self.process.stdout.read()
+        self.assertEqual(log.count('started in process'), 1)
+        self.assertIn(f"Retraining job {started['job_id']} completed", log)
+        self.assertIn('Reloaded', log)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+import unittest
+import sys
+import os
+import pickle
+import tempfile
+
+# Add the parent directory to the path so we can import split_model
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from split_model import file_sha256, part_filename, reconstruct_pickle_file, split_pickle_file  # noqa: E402
+
+class TestSplitReconstruct(unittest.TestCase):
+    """Test streaming, checksummed split and reconstruction of the model file"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.model_file = os.path.join(self.tmpdir.name, 'model.pkl')
+        self.info_file = os.path.join(self.tmpdir.name, 'model_parts.info')
+        self.content = pickle.dumps({'weights': list(range(20000)), 'blob': os.urandom(5000)})
+        with open(self.model_file, 'wb') as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def split_and_remove(self, **kwargs):
+        split_pickle_file(self.model_file, chunk_size=16 * 1024, info_file=self.info_file, **kwargs)
+        os.remove(self.model_file)
+
+    def read_model(self):
+        with open(self.model_file, 'rb') as f:
+            return f.read()
+
+    def test_round_trip(self):
+        """Test split followed by reconstruct restores identical bytes, with and without compression"""
+        for compression in [None, 'zlib', 'lzma']:
+            with self.subTest(compression=compression):
+                self.split_and_remove(compression=compression, workers=3)
+
+                with open(self.info_file, 'rb') as f:
+                    info = pickle.load(f)
+                self.assertEqual(info['compression'], compression)
+                self.assertEqual(len(info['parts']), info['total_parts'])
+                self.assertGreater(info['total_parts'], 1)
+
+                self.assertTrue(reconstruct_pickle_file(self.info_file, workers=3))
+                self.assertEqual(self.read_model(), self.content)
+                self.assertEqual(file_sha256(self.model_file), info['sha256'])
+
+    def test_corrupted_part_detected(self):
+        """Test a modified part fails verification and leaves no model file behind"""
+        self.split_and_remove()
+        with open(part_filename(self.model_file, 2), 'r+b') as f:
+            f.write(b'\x00corrupt')
+
+        self.assertFalse(reconstruct_pickle_file(self.info_file))
+        self.assertFalse(os.path.exists(self.model_file))
+
+    def test_truncated_compressed_part_detected(self):
+        """Test a truncated compressed part fails verification"""
+        self.split_and_remove(compression='zlib')
+        filename = part_filename(self.model_file, 1)
+        with open(filename, 'r+b') as f:
+            f.truncate(os.path.getsize(filename) // 2)
+
+        self.assertFalse(reconstruct_pickle_file(self.info_file))
+        self.assertFalse(os.path.exists(self.model_file))
+
+    def test_missing_part(self):
+        """Test reconstruction reports missing parts"""
+        self.split_and_remove()
+        os.remove(part_filename(self.model_file, 1))
+        self.assertFalse(reconstruct_pickle_file(self.info_file))
+
+    def test_legacy_info_file(self):
+        """Test info files written before checksums existed still reconstruct"""
+        self.split_and_remove()
+        with open(self.info_file, 'rb') as f:
+            info = pickle.load(f)
+        legacy = {key: info[key] for key in ['original_filename', 'total_parts', 'total_size', 'chunk_size']}
+        with open(self.info_file, 'wb') as f:
+            pickle.dump(legacy, f)
+
+        self.assertTrue(reconstruct_pickle_file(self.info_file))
+        self.assertEqual(self.read_model(), self.content)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,167 @@
+import unittest
+import sys
+import os
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+
+# Add the parent directory to the path so we can import the training helpers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from training import (apply_budgets, budget_violations, constraint_steps, measure_candidate,  # noqa: E402
+                      search_candidates, train_candidates)
+
+class TestTrainCandidates(unittest.TestCase):
+    """Test sequential and parallel candidate training"""
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.rand(2000, 5)
+        self.y = self.X @ [3.0, 1.0, 0.5, 2.0, 0.0] + rng.randn(2000) * 0.1
+        self.split = (self.X[:1600], self.y[:1600], self.X[1600:], self.y[1600:])
+
+    def make_models(self):
+        return {
+            'RandomForest': RandomForestRegressor(n_estimators=10, random_state=42),
+            'LinearRegression': LinearRegression(),
+            'DecisionTree': DecisionTreeRegressor(random_state=42)
+        }
+
+    def test_parallel_matches_sequential(self):
+        """Test both modes fit the same models and report timings and metrics"""
+        sequential = train_candidates(self.make_models(), *self.split)
+        parallel = train_candidates(self.make_models(), *self.split, parallel=True, processes=3)
+
+        self.assertEqual(list(sequential), list(parallel))
+        for name in sequential:
+            model, report = parallel[name]
+            self.assertIsNotNone(model)
+            self.assertEqual(report['status'], 'trained')
+            for key in ['r2', 'mae', 'rmse', 'fit_seconds', 'predict_seconds']:
+                self.assertIn(key, report)
+            self.assertAlmostEqual(report['r2'], sequential[name][1]['r2'], places=9)
+
+    def test_parallel_budget_drops_slow_candidates(self):
+        """Test a candidate that cannot finish within the budget is dropped"""
+        X = np.random.RandomState(1).rand(20000, 5)
+        y = X.sum(axis=1)
+        models = {
+            'Slow': RandomForestRegressor(n_estimators=500, random_state=0),
+            'LinearRegression': LinearRegression()
+        }
+
+        results = train_candidates(models, X[:16000], y[:16000], X[16000:], y[16000:],
+                                   parallel=True, time_budget=1.0, processes=2)
+
+        self.assertIsNone(results['Slow'][0])
+        self.assertEqual(results['Slow'][1]['status'], 'dropped')
+        self.assertIsNotNone(results['LinearRegression'][0])
+
+    def test_exhausted_budget_raises(self):
+        """Test training fails when no candidate can run within the budget"""
+        with self.assertRaises(RuntimeError):
+            train_candidates(self.make_models(), *self.split, time_budget=0)
+
+class TestServingBudgets(unittest.TestCase):
+    """Test size and latency measurements and budget enforcement"""
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        X = rng.rand(3000, 5)
+        y = X @ [3.0, 1.0, 0.5, 2.0, 0.0] + rng.randn(3000) * 0.1
+        self.split = (X[:2400], y[:2400], X[2400:], y[2400:])
+
+    def test_measure_candidate(self):
+        """Test a fitted model reports size, load memory and latency percentiles"""
+        model = DecisionTreeRegressor(random_state=0).fit(self.split[0], self.split[1])
+        measurements = measure_candidate(model, self.split[2], latency_rows=50)
+
+        self.assertGreater(measurements['size_mb'], 0)
+        self.assertGreater(measurements['memory_mb'], 0)
+        self.assertLessEqual(measurements['p50_predict_ms'], measurements['p99_predict_ms'])
+
+    def test_budget_violations(self):
+        """Test only the exceeded budgets are reported"""
+        measurements = {'size_mb': 5.0, 'p99_predict_ms': 1.0, 'memory_mb': 20.0}
+        violations = budget_violations(measurements, {'max_size_mb': 2, 'max_p99_predict_ms': None,
+                                                      'max_memory_mb': 50})
+        self.assertEqual(len(violations), 1)
+        self.assertTrue(violations[0].startswith('size_mb'))
+
+    def test_over_budget_tree_is_constrained(self):
+        """Test an oversized tree is refitted within the size budget and others are rejected"""
+        models = {
+            'DecisionTree': DecisionTreeRegressor(random_state=0),
+            'LinearRegression': LinearRegression()
+        }
+        results = train_candidates(models, *self.split)
+        full_size = measure_candidate(results['DecisionTree'][0], self.split[2], latency_rows=1)['size_mb']
+
+        budgets = {'max_size_mb': full_size / 4}
+        results = apply_budgets(results, *self.split, budgets)
+
+        tree, report = results['DecisionTree']
+        self.assertEqual(report['status'], 'constrained')
+        self.assertLessEqual(report['size_mb'], budgets['max_size_mb'])
+        self.assertGreater(tree.get_params()['min_samples_leaf'], 1)
+        self.assertTrue(report['attempts'])
+        self.assertEqual(results['LinearRegression'][1]['status'], 'trained')
+
+        results = apply_budgets(train_candidates(models, *self.split), *self.split, {'max_size_mb': 0})
+        for name, (model, report) in results.items():
+            self.assertIsNone(model)
+            self.assertEqual(report['status'], 'rejected')
+
+    def test_constraints_never_loosen_tuned_limits(self):
+        """Test a tree tuned with tight limits is only refitted with tighter ones"""
+        tuned = DecisionTreeRegressor(max_depth=10, min_samples_leaf=10, random_state=0)
+        steps = constraint_steps(tuned)
+        self.assertEqual(steps, [{'min_samples_leaf': 20, 'max_depth': 10}, {'min_samples_leaf': 50, 'max_depth': 10}])
+
+        results = train_candidates({'DecisionTree': tuned}, *self.split)
+        full_size = measure_candidate(results['DecisionTree'][0], self.split[2], latency_rows=1)['size_mb']
+        results = apply_budgets(results, *self.split, {'max_size_mb': full_size / 4})
+
+        tree, report = results['DecisionTree']
+        self.assertTrue(report['attempts'])
+        for attempt in report['attempts']:
+            self.assertGreaterEqual(attempt['constraint']['min_samples_leaf'], 10)
+            self.assertLessEqual(attempt['constraint']['max_depth'], 10)
+        if tree is not None:
+            self.assertGreaterEqual(tree.get_params()['min_samples_leaf'], 10)
+            self.assertLessEqual(tree.get_params()['max_depth'], 10)
+
+class TestHyperparameterSearch(unittest.TestCase):
+    """Test successive-halving search and its trace"""
+
+    def test_search_halves_candidates_and_grows_resources(self):
+        """Test each round keeps fewer configurations on more rows, ending on all training rows"""
+        rng = np.random.RandomState(0)
+        X = rng.rand(600, 4)
+        y = X @ [3.0, 1.0, 0.5, 2.0] + rng.randn(600) * 0.1
+        spaces = {'DecisionTree': {'max_depth': [2, 4, 8, None], 'min_samples_leaf': [1, 5, 20]}}
+        models = {'DecisionTree': DecisionTreeRegressor(random_state=0), 'LinearRegression': LinearRegression()}
+
+        tuned, reports = search_candidates(models, X, y, spaces=spaces, n_candidates=9, folds=3, factor=3, n_jobs=2)
+
+        self.assertIs(tuned['LinearRegression'], models['LinearRegression'])
+        self.assertNotIn('LinearRegression', reports)
+
+        report = reports['DecisionTree']
+        rounds = report['rounds']
+        self.assertEqual([r['n_candidates'] for r in rounds], [9, 3, 1])
+        self.assertEqual([r['n_resources'] for r in rounds], [66, 198, 594])
+        self.assertEqual(report['configurations'], 13)
+        self.assertEqual(report['fits'], 39)
+        self.assertEqual(len(report['trace']), 13)
+
+        # The returned model carries the best configuration, unfitted and ready for the holdout fit
+        best = report['best_params']
+        self.assertEqual({key: tuned['DecisionTree'].get_params()[key] for key in best}, best)
+        self.assertFalse(hasattr(tuned['DecisionTree'], 'tree_'))
+        final = [entry for entry in report['trace'] if entry['iteration'] == len(rounds) - 1]
+        self.assertEqual(max(entry['mean_r2'] for entry in final), report['best_cv_r2'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,138 @@
+import unittest
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+
+# Add the parent directory to the path so we can import the engine
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tree_engine import CompiledForest, compile_model  # noqa: E402
+
+class TestCompiledForest(unittest.TestCase):
+    """Test parity between the compiled engine and sklearn"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.RandomState(0)
+        cls.X = rng.rand(500, 7) * [4, 200, 4, 8, 2, 8, 40]
+        cls.y = cls.X[:, 6] * 1e5 + cls.X[:, 1] * 1e3 + rng.randn(500) * 1e4
+        cls.X_test = rng.rand(200, 7) * [4, 200, 4, 8, 2, 8, 40]
+
+    def test_random_forest_parity(self):
+        """Test the compiled forest matches RandomForestRegressor.predict"""
+        model = RandomForestRegressor(n_estimators=20, random_state=42).fit(self.X, self.y)
+        engine = CompiledForest.from_sklearn(model)
+
+        self.assertEqual(engine.n_trees, 20)
+        np.testing.assert_allclose(engine.predict(self.X_test), model.predict(self.X_test), rtol=1e-9)
+
+    def test_decision_tree_parity(self):
+        """Test the compiled tree matches DecisionTreeRegressor.predict, row by row and batched"""
+        model = DecisionTreeRegressor(random_state=42).fit(self.X, self.y)
+        engine = CompiledForest.from_sklearn(model)
+
+        np.testing.assert_allclose(engine.predict(self.X_test), model.predict(self.X_test), rtol=1e-9)
+        for row in self.X_test[:10]:
+            self.assertAlmostEqual(engine.predict(row)[0], model.predict(row.reshape(1, -1))[0], places=4)
+
+    def test_float32_nodes(self):
+        """Test float32 nodes stay within tolerance of sklearn"""
+        model = RandomForestRegressor(n_estimators=10, random_state=0).fit(self.X, self.y)
+        engine = CompiledForest.from_sklearn(model, dtype=np.float32)
+
+        self.assertEqual(engine.threshold.dtype, np.float32)
+        np.testing.assert_allclose(engine.predict(self.X_test), model.predict(self.X_test), rtol=1e-3)
+
+    def test_unsupported_model(self):
+        """Test non-tree models are left to sklearn"""
+        model = LinearRegression().fit(self.X, self.y)
+        self.assertIsNone(compile_model(model))
+        with self.assertRaises(TypeError):
+            CompiledForest.from_sklearn(model)
+
+    def test_wrong_feature_count(self):
+        """Test inputs with the wrong number of features are rejected"""
+        engine = compile_model(DecisionTreeRegressor(max_depth=3).fit(self.X, self.y))
+        with self.assertRaises(ValueError):
+            engine.predict(self.X_test[:, :3])
+
+class TestServedModelParity(unittest.TestCase):
+    """Test the engine attached to the served model matches the sklearn model"""
+
+    def test_served_model_parity(self):
+        """Test predictions through the app engine match the underlying model"""
+        try:
+            from app import encode_categoricals, ensure_model_loaded
+            import pandas as pd
+            model_data = ensure_model_loaded()
+        except (FileNotFoundError, RuntimeError):
+            self.skipTest("Dataset file not found - skipping served model parity test")
+
+        if model_data.get('engine') is None:
+            self.skipTest("Served model is not a tree model")
+
+        frame = pd.DataFrame([
+            {'property_type': 'House', 'location': 'G-10', 'city': 'Islamabad',
+             'baths': baths, 'purpose': 'For Sale', 'bedrooms': bedrooms, 'Area_in_Marla': area}
+            for baths in (1, 3, 5) for bedrooms in (2, 4) for area in (3.5, 8.0, 20.0)
+        ])
+        encode_categoricals(frame, model_data['label_encoders'])
+        features = frame[model_data['feature_columns']]
+
+        np.testing.assert_allclose(model_data['engine'].predict(features), model_data['model'].predict(features),
+                                   rtol=1e-6)
+
+def best_seconds(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+class TestThroughput(unittest.TestCase):
+    """Test batch scoring keeps up with sklearn on a forest shaped like the served one"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.RandomState(0)
+        n = 6000
+        # Skewed codes and areas like the listings data, so fully grown trees have leaves at very different depths
+        X = pd.DataFrame({
+            'f0': rng.randint(0, 3, n), 'f1': np.minimum(rng.zipf(1.3, n), 2000), 'f2': rng.randint(0, 4, n),
+            'f3': rng.randint(1, 8, n), 'f4': rng.randint(0, 2, n), 'f5': rng.randint(1, 8, n),
+            'f6': rng.lognormal(2, 0.8, n)
+        }).astype(float)
+        y = X['f6'] * 1e5 * (1 + X['f0']) + X['f1'] * 1e3 + rng.lognormal(10, 1.5, n)
+        cls.model = RandomForestRegressor(n_estimators=100, random_state=0, n_jobs=-1).fit(X, y)
+        cls.model.set_params(n_jobs=None)
+        cls.engine = compile_model(cls.model)
+        cls.X_test = X.sample(1000, random_state=1).reset_index(drop=True)
+
+    def test_small_batches_beat_sklearn(self):
+        """Test the engine scores a small batch faster than sklearn's predict"""
+        frame = self.X_test.head(20)
+        rows = frame.to_numpy(dtype=np.float32)
+        self.assertLess(best_seconds(lambda: self.engine.predict(rows)), best_seconds(lambda: self.model.predict(frame)))
+
+    def test_large_batches_keep_up_with_sklearn(self):
+        """Test a large batch is scored about as fast as sklearn, by the engine alone within a small factor"""
+        from app import COMPILED_ENGINE_MAX_ROWS, predict_frame
+
+        model_data = {'model': self.model, 'engine': self.engine, 'feature_columns': list(self.X_test.columns)}
+        self.assertGreater(len(self.X_test), COMPILED_ENGINE_MAX_ROWS)
+        sklearn_seconds = best_seconds(lambda: self.model.predict(self.X_test))
+        np.testing.assert_allclose(predict_frame(model_data, self.X_test), self.model.predict(self.X_test), rtol=1e-9)
+        self.assertLess(best_seconds(lambda: predict_frame(model_data, self.X_test)), sklearn_seconds * 1.5)
+
+        # Models loaded from the artifact have only the engine; rows stop at their leaf instead of walking max_depth
+        rows = self.X_test.to_numpy(dtype=np.float32)
+        self.assertLess(best_seconds(lambda: self.engine.predict(rows)), sklearn_seconds * 2.5)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,363 @@
+"""
+Candidate model training helpers.
+
+Fits the candidate regressors either one after another or in parallel across
+a process pool, under an optional wall-clock budget, and reports how long each
+candidate spent fitting and predicting next to its holdout metrics.
+
+In search mode each candidate's hyperparameters are first tuned by k-fold
+cross-validation with successive halving: many sampled configurations are
+scored on small subsets of the training rows, and only the best third of each
+round moves on to three times as many rows. Folds and configurations run
+across a process pool.
+
+Trained candidates can also be measured for serving cost (serialized size,
+memory needed to load them and single-row p99 latency) and held to budgets:
+tree models over budget are refitted with tighter leaf and depth limits, and
+anything that still does not fit is rejected.
+"""
+import multiprocessing
+import os
+import pickle
+import time
+import tracemalloc
+
+import numpy as np
+from joblib import parallel_backend
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, KFold
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.tree import DecisionTreeRegressor
+
+from tree_engine import compile_model
+
+# Progressively tighter limits tried on tree models that exceed a budget, never looser than the model's own
+CONSTRAINT_STEPS = [
+    {'min_samples_leaf': 2},
+    {'min_samples_leaf': 5},
+    {'min_samples_leaf': 10, 'max_depth': 20},
+    {'min_samples_leaf': 20, 'max_depth': 15},
+    {'min_samples_leaf': 50, 'max_depth': 12}
+]
+
+# Hyperparameters explored per candidate by the search mode; candidates without a space keep their settings
+SEARCH_SPACES = {
+    'RandomForest': {
+        'n_estimators': [25, 50, 100, 200],
+        'max_depth': [None, 10, 15, 20, 30],
+        'min_samples_leaf': [1, 2, 5, 10],
+        'max_features': [1.0, 0.7, 0.5, 'sqrt']
+    },
+    'DecisionTree': {
+        'max_depth': [None, 8, 12, 16, 24],
+        'min_samples_leaf': [1, 2, 5, 10, 20],
+        'max_features': [None, 0.7, 0.5]
+    }
+}
+
+BUDGET_KEYS = {
+    'max_size_mb': 'size_mb',
+    'max_p99_predict_ms': 'p99_predict_ms',
+    'max_memory_mb': 'memory_mb'
+}
+
+
+def evaluate_candidate(name, model, X_train, y_train, X_test, y_test):
+    """Fit one candidate and measure fit time, predict time and holdout metrics"""
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    predict_seconds = time.perf_counter() - start
+
+    report = {
+        'status': 'trained',
+        'r2': float(r2_score(y_test, y_pred)),
+        'mae': float(mean_absolute_error(y_test, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds
+    }
+    return name, model, report
+
+
+def _evaluate_in_worker(*args):
+    # Pool workers are daemonic and cannot start loky processes, so the forest uses threads
+    with parallel_backend('threading'):
+        return evaluate_candidate(*args)
+
+
+def _dropped(reason):
+    return {'status': 'dropped', 'reason': reason}
+
+
+def train_candidates(models, X_train, y_train, X_test, y_test, parallel=False, time_budget=None,
+                     processes=None, progress=None):
+    """Train every candidate, returns {name: (fitted model or None, report)} in candidate order"""
+    if parallel:
+        results = _train_parallel(models, X_train, y_train, X_test, y_test, time_budget, processes, progress)
+    else:
+        results = _train_sequential(models, X_train, y_train, X_test, y_test, time_budget, progress)
+
+    if not any(model is not None for model, _ in results.values()):
+        raise RuntimeError(f"No candidate model finished within the time budget of {time_budget}s")
+    return results
+
+
+def _train_sequential(models, X_train, y_train, X_test, y_test, time_budget, progress):
+    results = {}
+    started = time.perf_counter()
+
+    for name, model in models.items():
+        # Once the budget is spent the remaining candidates are not started at all
+        if time_budget is not None and time.perf_counter() - started >= time_budget:
+            results[name] = (None, _dropped('time budget exhausted before start'))
+            continue
+
+        if progress:
+            progress(f"Training {name}")
+        _, fitted, report = evaluate_candidate(name, model, X_train, y_train, X_test, y_test)
+        results[name] = (fitted, report)
+
+    return results
+
+
+def _train_parallel(models, X_train, y_train, X_test, y_test, time_budget, processes, progress):
+    if progress:
+        progress(f"Training {', '.join(models)} in parallel")
+
+    processes = processes or min(len(models), os.cpu_count() or 1)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    results = {}
+
+    # multiprocessing.Pool rather than concurrent.futures so over-budget fits can be terminated
+    pool = multiprocessing.Pool(processes=processes)
+    try:
+        pending = {
+            name: pool.apply_async(_evaluate_in_worker, (name, model, X_train, y_train, X_test, y_test))
+            for name, model in models.items()
+        }
+
+        for name, async_result in pending.items():
+            timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                _, fitted, report = async_result.get(timeout=timeout)
+                results[name] = (fitted, report)
+            except multiprocessing.TimeoutError:
+                results[name] = (None, _dropped('exceeded time budget'))
+    finally:
+        pool.terminate()
+        pool.join()
+
+    return {name: results[name] for name in models}
+
+
+def _score(value):
+    # Failed fits score NaN, which is not valid JSON for /health
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def search_candidate(model, space, X_train, y_train, n_candidates=60, folds=5, factor=3,
+                     n_jobs=-1, random_state=42):
+    """Tune one candidate with halving random search, returns (model with the best parameters, search report)"""
+    started = time.perf_counter()
+    # The search parallelizes across folds and configurations, so each fit stays single-threaded
+    estimator = clone(model)
+    if 'n_jobs' in estimator.get_params():
+        estimator.set_params(n_jobs=None)
+
+    # Start small enough that the last round scores its survivors on every training row
+    rounds = 1
+    while factor ** rounds <= n_candidates:
+        rounds += 1
+    min_resources = max(len(y_train) // factor ** (rounds - 1), 2 * folds)
+
+    search = HalvingRandomSearchCV(
+        estimator, space, n_candidates=n_candidates, factor=factor, resource='n_samples',
+        min_resources=min_resources,
+        cv=KFold(n_splits=folds, shuffle=True, random_state=random_state), scoring='r2',
+        refit=False, n_jobs=n_jobs, random_state=random_state
+    )
+    search.fit(X_train, y_train)
+
+    cv = search.cv_results_
+    trace = [
+        {
+            'iteration': int(cv['iter'][i]),
+            'n_resources': int(cv['n_resources'][i]),
+            'params': cv['params'][i],
+            'mean_r2': _score(cv['mean_test_score'][i]),
+            'std_r2': _score(cv['std_test_score'][i]),
+            'fit_seconds': float(cv['mean_fit_time'][i])
+        }
+        for i in range(len(cv['params']))
+    ]
+    rounds = [
+        {
+            'iteration': iteration,
+            'n_resources': int(search.n_resources_[iteration]),
+            'n_candidates': int(search.n_candidates_[iteration]),
+            'best_r2': max((entry['mean_r2'] for entry in trace
+                            if entry['iteration'] == iteration and entry['mean_r2'] is not None), default=None)
+        }
+        for iteration in range(search.n_iterations_)
+    ]
+
+    report = {
+        'best_params': search.best_params_,
+        'best_cv_r2': _score(search.best_score_),
+        'configurations': len(trace),
+        'fits': len(trace) * folds,
+        'folds': folds,
+        'factor': factor,
+        'search_seconds': time.perf_counter() - started,
+        'rounds': rounds,
+        'trace': trace
+    }
+    return clone(model).set_params(**search.best_params_), report
+
+
+def search_candidates(models, X_train, y_train, spaces=None, n_candidates=60, folds=5, factor=3,
+                      n_jobs=-1, progress=None):
+    """Tune every candidate that has a search space, returns ({name: model to train}, {name: search report})"""
+    spaces = SEARCH_SPACES if spaces is None else spaces
+    tuned = dict(models)
+    reports = {}
+
+    for name, model in models.items():
+        if name not in spaces:
+            continue
+        if progress:
+            progress(f"Searching {name} hyperparameters")
+        tuned[name], reports[name] = search_candidate(model, spaces[name], X_train, y_train,
+                                                      n_candidates=n_candidates, folds=folds, factor=factor,
+                                                      n_jobs=n_jobs)
+        report = reports[name]
+        print(f"{name}: searched {report['configurations']} configurations in {len(report['rounds'])} rounds "
+              f"({report['search_seconds']:.1f}s), best CV R2={report['best_cv_r2']:.4f} "
+              f"with {report['best_params']}")
+
+    return tuned, reports
+
+
+def constraint_steps(model):
+    """CONSTRAINT_STEPS combined with the model's own limits, keeping only steps that tighten them"""
+    params = model.get_params()
+    leaf, depth = params['min_samples_leaf'], params['max_depth']
+    steps = []
+    for step in CONSTRAINT_STEPS:
+        constraint = {}
+        # A fractional min_samples_leaf is not comparable with a row count and is left as tuned
+        if 'min_samples_leaf' in step and not isinstance(leaf, float) and step['min_samples_leaf'] > leaf:
+            constraint['min_samples_leaf'] = step['min_samples_leaf']
+        if 'max_depth' in step and (depth is None or step['max_depth'] < depth):
+            constraint['max_depth'] = step['max_depth']
+        if not constraint:
+            continue
+        constraint = {'min_samples_leaf': constraint.get('min_samples_leaf', leaf),
+                      'max_depth': constraint.get('max_depth', depth)}
+        if constraint not in steps:
+            steps.append(constraint)
+    return steps
+
+
+def measure_candidate(model, X_sample, compiled=True, latency_rows=200):
+    """Serving cost of a fitted model: pickle size, memory to load it and single-row latency"""
+    blob = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+    size = len(blob)
+    tracemalloc.start()
+    try:
+        pickle.loads(blob)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del blob
+
+    # Time the path that will serve the model: the compiled engine for trees when enabled
+    engine = compile_model(model) if compiled else None
+    sample = X_sample[:latency_rows]
+    if engine is not None:
+        rows = [row.reshape(1, -1) for row in np.asarray(sample, dtype=np.float32)]
+        predictor = engine
+    else:
+        rows = [sample.iloc[[i]] if hasattr(sample, 'iloc') else sample[i:i + 1] for i in range(len(sample))]
+        predictor = model
+
+    latencies = []
+    for row in rows:
+        started = time.perf_counter()
+        predictor.predict(row)
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        'size_mb': size / (1024 * 1024),
+        'memory_mb': peak / (1024 * 1024),
+        'p50_predict_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_predict_ms': float(np.percentile(latencies, 99) * 1000)
+    }
+
+
+def budget_violations(measurements, budgets):
+    """Human-readable list of the budgets a measured candidate exceeds"""
+    violations = []
+    for budget, key in BUDGET_KEYS.items():
+        limit = budgets.get(budget)
+        if limit is not None and measurements[key] > limit:
+            violations.append(f"{key} {measurements[key]:.2f} > {limit}")
+    return violations
+
+
+def apply_budgets(results, X_train, y_train, X_test, y_test, budgets, compiled=True, progress=None):
+    """Measure every trained candidate and constrain or reject those over budget, in place"""
+    for name, (model, report) in list(results.items()):
+        if model is None:
+            continue
+
+        if progress:
+            progress(f"Measuring {name}")
+        report.update(measure_candidate(model, X_test, compiled=compiled))
+        violations = budget_violations(report, budgets)
+        if not violations:
+            continue
+
+        report['violations'] = violations
+        report['attempts'] = []
+        print(f"{name} is over budget ({'; '.join(violations)})")
+
+        if isinstance(model, (RandomForestRegressor, DecisionTreeRegressor)):
+            for constraint in constraint_steps(model):
+                if progress:
+                    progress(f"Refitting {name} with {constraint}")
+                candidate = clone(model).set_params(**constraint)
+                _, fitted, attempt = evaluate_candidate(name, candidate, X_train, y_train, X_test, y_test)
+                attempt.update(measure_candidate(fitted, X_test, compiled=compiled))
+                attempt['constraint'] = constraint
+                attempt_violations = budget_violations(attempt, budgets)
+                report['attempts'].append(dict(attempt, violations=attempt_violations))
+
+                if not attempt_violations:
+                    attempts = report['attempts']
+                    report.clear()
+                    report.update(attempt, status='constrained', attempts=attempts, violations=violations)
+                    results[name] = (fitted, report)
+                    break
+
+        if report['status'] != 'constrained':
+            report['status'] = 'rejected'
+            results[name] = (None, report)
+
+    return results
+
+
+def grow_forest(forest, X_new, y_new, n_new_trees):
+    """Add n_new_trees trees fitted on new rows to a fitted forest, leaving existing trees untouched"""
+    started = time.perf_counter()
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_trees)
+    forest.fit(X_new, y_new)
+    forest.set_params(warm_start=False)
+    return time.perf_counter() - started
@@ -0,0 +1,154 @@
+"""
+Array-based inference engine for trained tree ensembles.
+
+Converts a fitted RandomForestRegressor or DecisionTreeRegressor (or any
+model that provides its own node arrays through to_forest) into flat NumPy
+node arrays and walks every tree for every row at once, avoiding sklearn's
+per-call validation and joblib dispatch. Rows leave the walk as soon as they
+reach a leaf, so shallow leaves cost fewer steps than the deepest one.
+"""
+import numpy as np
+
+# Rows are walked in blocks so the (rows x trees) index matrix stays small
+ROW_BLOCK_SIZE = 4096
+# Finished (row, tree) pairs are dropped from the walk once they are at least 1 in this many
+COMPACT_FRACTION = 8
+
+
+class CompiledForest:
+    """Flat node arrays for all trees of an ensemble, concatenated end to end"""
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def dtype(self):
+        return self.threshold.dtype
+
+    @classmethod
+    def from_sklearn(cls, model, dtype=np.float64):
+        """Build the node arrays from a fitted sklearn tree or forest"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.tree import DecisionTreeRegressor
+
+        if isinstance(model, RandomForestRegressor):
+            estimators = model.estimators_
+        elif isinstance(model, DecisionTreeRegressor):
+            estimators = [model]
+        else:
+            raise TypeError(f"Cannot compile model of type {type(model).__name__}")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in estimators:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point at themselves, which is how the walk recognises them
+            left = np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32)
+            right = np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32)
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.int32)
+
+            features.append(feature)
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds).astype(dtype),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values).astype(dtype),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=model.n_features_in_
+        )
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (rows, trees)"""
+        # sklearn compares float32 inputs against its thresholds, so do the same
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+        leaves = np.empty((X.shape[0], self.n_trees), dtype=np.int32)
+
+        for start in range(0, X.shape[0], ROW_BLOCK_SIZE):
+            block = X[start:start + ROW_BLOCK_SIZE]
+            self._walk(block, leaves[start:start + block.shape[0]].reshape(-1))
+
+        return leaves
+
+    def _walk(self, block, out):
+        """Walk every (row, tree) pair of a block down to its leaf, writing leaf ids row-major into out"""
+        n_rows, n_trees = block.shape[0], self.n_trees
+        # Pairs go tree by tree, so consecutive gathers stay within one tree's nodes
+        nodes = np.repeat(self.roots.astype(np.intp), n_rows)
+        offsets = np.tile(np.arange(n_rows, dtype=np.intp) * block.shape[1], n_trees)
+        positions = (np.arange(n_trees, dtype=np.intp)[:, None] + np.arange(n_rows, dtype=np.intp) * n_trees).ravel()
+        values = block.ravel()
+
+        while nodes.size:
+            lefts = self.left[nodes]
+            # Leaves point at themselves; pairs that reached one are written out and no longer walked.
+            # Stepping a finished pair again is harmless, so the arrays are only compacted once enough finished
+            done = lefts == nodes
+            if np.count_nonzero(done) * COMPACT_FRACTION >= nodes.size:
+                out[positions[done]] = nodes[done]
+                walking = ~done
+                nodes, lefts, offsets, positions = nodes[walking], lefts[walking], offsets[walking], positions[walking]
+            go_left = values[offsets + self.feature[nodes]] <= self.threshold[nodes]
+            # Node ids are kept as intp so the gathers above need no index conversion
+            nodes = np.where(go_left, lefts, self.right[nodes]).astype(np.intp)
+
+    def predict(self, X):
+        """Predict by averaging the leaf values of all trees"""
+        return self.predict_leaves(self.apply(X))
+
+    def predict_leaves(self, leaves):
+        """Average the values of a C-ordered (rows, trees) leaf index matrix"""
+        return self.value[leaves].mean(axis=1, dtype=np.float64)
+
+
+def compile_model(model, dtype=np.float64):
+    """Compile a supported model, or return None so callers fall back to sklearn"""
+    if isinstance(model, CompiledForest):
+        return model
+    # Models that grow their own node arrays, like the out-of-core boosting model
+    if hasattr(model, 'to_forest'):
+        return model.to_forest(dtype)
+    # A fitted sklearn model was unpickled or trained, so sklearn is already loaded by now
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.tree import DecisionTreeRegressor
+
+    if not isinstance(model, (RandomForestRegressor, DecisionTreeRegressor)):
+        return None
+    return CompiledForest.from_sklearn(model, dtype=dtype)